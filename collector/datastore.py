@@ -1,53 +1,432 @@
 import sqlite3
-from datetime import datetime
+import logging
+import threading
+import queue
+import time
+from datetime import datetime, timedelta
+
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch_ms(timestamp):
+    """
+    Convert a datetime to integer milliseconds since the epoch, naive
+    datetimes are in UTC, numbers are seconds since the epoch
+
+    """
+
+    if isinstance(timestamp, datetime):
+        if timestamp.tzinfo is None:
+            delta = timestamp - EPOCH
+        else:
+            delta = timestamp.replace(tzinfo=None) - timestamp.utcoffset() - EPOCH
+        return (delta.days * 86400 + delta.seconds) * 1000 + delta.microseconds // 1000
+    return int(round(timestamp * 1000))
+
+
+def from_epoch_ms(ms):
+    """
+    Convert integer milliseconds since the epoch to a naive UTC datetime
+
+    """
+
+    return EPOCH + timedelta(milliseconds=ms)
+
 
 class Event():
-    
+
     type = None
     name = None
     value = None
     timestamp = None
 
-    def __init__(self, event_type, name, value, timestamp = datetime.utcnow()):
+    def __init__(self, event_type, name, value, timestamp=None):
+        if timestamp is None:
+            timestamp = datetime.utcnow()
         self.name = name
         self.value = value
         self.timestamp = timestamp
         self.type = event_type
-        
+
 
 class DataStore(object):
 
     def __init__(self):
         pass
-    
+
     def record_data(self,event_id,value,timestamp=None):
         pass
-    
+
     def record_event(self, event):
         self.record_data(event.type+":"+event.name, event.value, event.timestamp)
-         
 
-    
+
+
 class SQLiteDatastore(DataStore):
-    
+    """
+    Datastore writing values to an SQLite database in batches
+
+    Values are stored in a valuelog table with an integer sensor id, the
+    timestamp in milliseconds since the epoch and the value. A covering
+    index on (sensor_id, ts, value) serves the time range queries. A
+    database with the untyped table of earlier versions is migrated when
+    it is opened.
+
+    Recorded values are put in a bounded queue and written by a background
+    thread with executemany, when batch_size values are queued or
+    flush_interval seconds have passed. The database uses the WAL journal
+    mode so a batch costs a single fsync.
+
+    Parameters
+    ----------
+    filename : string
+        the database file
+
+    batch_size : int
+        the number of values which triggers a write
+
+    flush_interval : float
+        the maximum time in seconds a value stays in the queue
+
+    max_queue : int
+        the maximum number of values in the queue
+
+    overflow : string
+        what to do when the queue is full, 'block' waits for free space,
+        'drop' discards the new value and 'raise' raises a queue.Full
+        exception
+
+    """
+
+    OVERFLOW_POLICIES = ('block', 'drop', 'raise')
+    SCHEMA_VERSION = 1
+
     conn = None
-    
-    def __init__(self, filename):
-        self.conn = sqlite3.connect(filename)
+
+    def __init__(self, filename, batch_size=500, flush_interval=1.0, max_queue=100000, overflow='block'):
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError('overflow must be one of {}'.format(', '.join(self.OVERFLOW_POLICIES)))
+
+        self.filename = filename
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.stats = {'recorded': 0, 'written': 0, 'dropped': 0, 'batches': 0}
+
+        self.conn = sqlite3.connect(filename, check_same_thread=False)
+        self.conn.execute("pragma journal_mode=wal")
+        self.conn.execute("pragma synchronous=normal")
         self.create_tables()
-            
+
+        # queries use their own connection so they do not wait for writes
+        if filename == ':memory:':
+            self._reader = self.conn
+        else:
+            self._reader = sqlite3.connect(filename, check_same_thread=False)
+        self._sensor_ids = {}
+
+        self._queue = queue.Queue(max_queue)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
     def create_tables(self):
-        try: 
-            cur = self.conn.cursor()
-            cur.execute("create table valuelog (sensor, timestamp, value)")
-        except Exception as e:
-            print(e)
-            
-    def record_data(self,event_id,value,timestamp=datetime.utcnow()):
-        cur = self.conn.cursor()
-        print(timestamp.isoformat())
-        cur.execute("insert into valuelog (sensor,timestamp,value) values (?, ?, ?)", 
-                    (event_id, timestamp.isoformat(),value))
-        self.conn.commit()
-        
-    
+        # DDL only takes part in a transaction which is begun explicitly
+        isolation_level = self.conn.isolation_level
+        self.conn.isolation_level = None
+        try:
+            self.conn.execute("begin immediate")
+            try:
+                self._migrate()
+            except:
+                self.conn.execute("rollback")
+                raise
+            self.conn.execute("commit")
+        finally:
+            self.conn.isolation_level = isolation_level
+
+    def _migrate(self):
+        version = self.conn.execute("pragma user_version").fetchone()[0]
+        if version == self.SCHEMA_VERSION:
+            return
+        elif version > self.SCHEMA_VERSION:
+            raise Exception('Unsupported database schema version {}'.format(version))
+
+        legacy = self.conn.execute("select 1 from sqlite_master where type = 'table' and name = 'valuelog'").fetchone()
+        if legacy:
+            self.conn.execute("alter table valuelog rename to valuelog_v0")
+
+        self.conn.execute("create table sensor (id integer primary key, name text not null unique)")
+        self.conn.execute("create table valuelog (sensor_id integer not null references sensor (id), "
+                          "ts integer not null, value real)")
+        self.conn.execute("create index valuelog_sensor_ts on valuelog (sensor_id, ts, value)")
+
+        if legacy:
+            logger.info('migrating the valuelog table to schema version {}'.format(self.SCHEMA_VERSION))
+            self.conn.execute("insert into sensor (name) select distinct sensor from valuelog_v0")
+            self.conn.execute("insert into valuelog (sensor_id, ts, value) "
+                              "select sensor.id, cast(round((julianday(v.timestamp) - 2440587.5) * 86400000) "
+                              "as integer), v.value from valuelog_v0 v join sensor on sensor.name = v.sensor")
+            self.conn.execute("drop table valuelog_v0")
+
+        self.conn.execute("pragma user_version = {}".format(self.SCHEMA_VERSION))
+
+    def record_data(self,event_id,value,timestamp=None):
+        """
+        Queue a value for writing
+
+        Parameters
+        ----------
+        event_id : string
+            the sensor name
+
+        value :
+            the value
+
+        timestamp : datetime
+            the time of the value, defaults to now
+
+        Returns
+        -------
+        queued : bool
+            False when the value was dropped because the queue is full
+
+        """
+
+        if self._closed:
+            raise RuntimeError('The datastore is closed')
+        if timestamp is None:
+            timestamp = datetime.utcnow()
+
+        row = (event_id, to_epoch_ms(timestamp), value)
+        try:
+            if self.overflow == 'block':
+                self._queue.put(row)
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            if self.overflow == 'raise':
+                raise
+            self.stats['dropped'] += 1
+            return False
+
+        self.stats['recorded'] += 1
+        return True
+
+    def flush(self):
+        """
+        Write all queued values to the database
+
+        """
+
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        """
+        Stop the background thread, write all queued values and close the
+        database
+
+        """
+
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+        rows = []
+        while True:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        self._write([row for row in rows if isinstance(row, tuple)])
+        self.conn.close()
+        if self._reader is not self.conn:
+            self._reader.close()
+
+    def sensors(self):
+        """
+        Returns a list of all sensor names
+
+        """
+
+        return [row[0] for row in self._query("select name from sensor order by name")]
+
+    def latest(self, sensor):
+        """
+        Returns the latest value of a sensor or None
+
+        Values which are still queued are not taken into account, call
+        flush first to include them.
+
+        Returns
+        -------
+        timestamp : datetime
+            the time of the value
+
+        value :
+            the value
+
+        """
+
+        row = next(iter(self._query("select valuelog.ts, valuelog.value from sensor "
+                                    "join valuelog on valuelog.sensor_id = sensor.id where sensor.name = ? "
+                                    "order by valuelog.ts desc limit 1", (sensor,))), None)
+        if row is None:
+            return None
+        return from_epoch_ms(row[0]), row[1]
+
+    def range(self, sensor, t0, t1):
+        """
+        Iterate over the values of a sensor with t0 <= timestamp < t1 in
+        chronological order, rows are fetched while iterating
+
+        Parameters
+        ----------
+        sensor : string
+            the sensor name
+
+        t0 : datetime or number
+            the start time, numbers are seconds since the epoch
+
+        t1 : datetime or number
+            the end time
+
+        Yields
+        ------
+        timestamp : datetime
+            the time of the value
+
+        value :
+            the value
+
+        """
+
+        cur = self._query("select valuelog.ts, valuelog.value from sensor "
+                          "join valuelog on valuelog.sensor_id = sensor.id "
+                          "where sensor.name = ? and valuelog.ts >= ? and valuelog.ts < ? "
+                          "order by valuelog.ts", (sensor, to_epoch_ms(t0), to_epoch_ms(t1)))
+        for ts, value in cur:
+            yield from_epoch_ms(ts), value
+
+    def downsample(self, sensor, t0, t1, bucket):
+        """
+        Iterate over aggregates of the values of a sensor per time bucket
+
+        Parameters
+        ----------
+        sensor : string
+            the sensor name
+
+        t0 : datetime or number
+            the start time, numbers are seconds since the epoch
+
+        t1 : datetime or number
+            the end time
+
+        bucket : timedelta or number
+            the bucket size, numbers are seconds
+
+        Yields
+        ------
+        timestamp : datetime
+            the start of the bucket
+
+        mean : float
+            the mean value in the bucket
+
+        minimum :
+            the minimum value in the bucket
+
+        maximum :
+            the maximum value in the bucket
+
+        """
+
+        if isinstance(bucket, timedelta):
+            bucket = bucket.total_seconds()
+        bucket = int(round(bucket * 1000))
+        if bucket <= 0:
+            raise ValueError('The bucket size must be positive')
+
+        start = to_epoch_ms(t0)
+        cur = self._query("select (valuelog.ts - ?) / ? as bucket, avg(valuelog.value), "
+                          "min(valuelog.value), max(valuelog.value) from sensor "
+                          "join valuelog on valuelog.sensor_id = sensor.id "
+                          "where sensor.name = ? and valuelog.ts >= ? and valuelog.ts < ? "
+                          "group by bucket order by bucket",
+                          (start, bucket, sensor, start, to_epoch_ms(t1)))
+        for index, mean, minimum, maximum in cur:
+            yield from_epoch_ms(start + index * bucket), mean, minimum, maximum
+
+    def _query(self, sql, parameters=()):
+        """
+        Returns a cursor over the rows of a query, all rows are fetched at
+        once when the connection is shared with the writer thread
+
+        """
+
+        if self._reader is self.conn:
+            # an in memory database has a single connection, it is serialized with the writes
+            with self._lock:
+                return self._reader.execute(sql, parameters).fetchall()
+        return self._reader.execute(sql, parameters)
+
+    def _sensor_id(self, name):
+        sensor_id = self._sensor_ids.get(name)
+        if sensor_id is None:
+            self.conn.execute("insert or ignore into sensor (name) values (?)", (name,))
+            sensor_id = self.conn.execute("select id from sensor where name = ?", (name,)).fetchone()[0]
+            self._sensor_ids[name] = sensor_id
+        return sensor_id
+
+    def _write(self, rows):
+        with self._lock:
+            if rows:
+                self.conn.executemany("insert into valuelog (sensor_id, ts, value) values (?, ?, ?)",
+                                      [(self._sensor_id(name), ts, value) for name, ts, value in rows])
+                self.conn.commit()
+                self.stats['written'] += len(rows)
+                self.stats['batches'] += 1
+
+    def _run(self):
+        rows = []
+        deadline = None
+        while True:
+            timeout = None
+            if deadline is not None:
+                timeout = max(0, deadline - time.monotonic())
+
+            try:
+                row = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                row = False
+
+            if isinstance(row, tuple):
+                if not rows:
+                    deadline = time.monotonic() + self.flush_interval
+                rows.append(row)
+                if len(rows) < self.batch_size:
+                    continue
+
+            try:
+                self._write(rows)
+            except Exception:
+                logger.exception('could not write {} values'.format(len(rows)))
+            rows = []
+            deadline = None
+
+            if row is None:
+                return
+            elif isinstance(row, threading.Event):
+                row.set()
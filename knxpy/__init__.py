@@ -3,4 +3,11 @@ from .__version__ import version as __version__
 from . import util
 from . import ip
 from . import ip_async
+from . import routing
 from . import knxd_async
+from . import scheduler
+from . import pipeline
+from . import cache
+from . import router
+from . import catalog
+from . import recorder
@@ -0,0 +1,242 @@
+import time
+import logging
+import threading
+
+from . import util
+
+
+logger = logging.getLogger(__name__)
+
+
+CMD_GROUP_WRITE = util.Message.CMD_GROUP_WRITE
+CMD_GROUP_RESPONSE = util.Message.CMD_GROUP_RESPONSE
+
+
+class Entry(object):
+    """
+    A cached group address value
+
+    """
+
+    __slots__ = ('data', 'timestamp', 'dpt', 'value')
+
+    def __init__(self, data, timestamp):
+        self.data = data
+        self.timestamp = timestamp
+        self.dpt = None
+        self.value = None
+
+    def decode(self, dpt):
+        if dpt is None:
+            return self.data
+        if dpt != self.dpt:
+            self.value = util.decode_dpt(self.data, dpt)
+            self.dpt = dpt
+        return self.value
+
+
+class StateCache(object):
+    """
+    Cache of the last value of each group address
+
+    The cache is a callable which is used as the callback of a client, it is
+    updated with every received write and response telegram and passes all
+    messages on to its own callback. :meth:`get` returns the cached value
+    when it is recent enough and reads it from the bus otherwise.
+
+    Parameters
+    ----------
+    client : object
+        the client used for reads, e.g. :class:`knxpy.ip.KNXIPTunnel`,
+        :class:`knxpy.knxd.KNXD` or one of the asyncio clients for
+        :meth:`get_async`
+
+    dpts : dict
+        data point types by group address, used to decode values when get
+        is called without dpt
+
+    callback : callable
+        called with each message after the cache is updated
+
+    read_timeout : float
+        the time in seconds to wait for a response from clients which do not
+        return the value from group_read
+
+    Examples
+    --------
+    >>> cache = StateCache(dpts={'1/1/71': '9'})
+    >>> tunnel = knxpy.ip.KNXIPTunnel('192.168.1.3', 3671, callback=cache)
+    >>> cache.client = tunnel
+    >>> tunnel.connect()
+    >>> cache.get('1/1/71', max_age=60)
+    22.64
+
+    """
+
+    def __init__(self, client=None, dpts=None, callback=None, read_timeout=0.5):
+        self.client = client
+        self.callback = callback
+        self.read_timeout = read_timeout
+
+        self.dpts = {}
+        for ga, dpt in (dpts or {}).items():
+            self.dpts[util.encode_ga(ga) if type(ga) is str else ga] = dpt
+
+        self.stats = {'hits': 0, 'misses': 0, 'updates': 0}
+
+        self._entries = {}
+        self._condition = threading.Condition()
+
+    def __call__(self, message):
+        if message.cmd in (CMD_GROUP_WRITE, CMD_GROUP_RESPONSE):
+            self.update(message.dst_addr, message.data)
+
+        if self.callback is not None:
+            self.callback(message)
+
+    def __contains__(self, ga):
+        return self._addr(ga) in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _addr(self, ga):
+        if type(ga) is str:
+            return util.encode_ga(ga)
+        return ga
+
+    def update(self, ga, data, timestamp=None):
+        """
+        Store the raw data of a group address
+
+        Parameters
+        ----------
+        ga : string or int
+            the group address as a string (e.g. '1/1/64') or an integer (0-65535)
+
+        data : int or bytes
+            the data as received, without the APCI bits
+
+        timestamp : float
+            the time of the value in seconds since the epoch, defaults to now
+
+        """
+
+        if isinstance(data, memoryview):
+            data = bytes(data)
+        if timestamp is None:
+            timestamp = time.time()
+
+        addr = self._addr(ga)
+        with self._condition:
+            self._entries[addr] = Entry(data, timestamp)
+            self.stats['updates'] += 1
+            self._condition.notify_all()
+
+    def invalidate(self, ga=None):
+        """
+        Remove a group address or, without ga, all group addresses from the
+        cache
+
+        """
+
+        with self._condition:
+            if ga is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self._addr(ga), None)
+
+    def peek(self, ga, dpt=None):
+        """
+        Returns the cached value and its timestamp without reading from the
+        bus, or None when the group address is not cached
+
+        """
+
+        addr = self._addr(ga)
+        with self._condition:
+            entry = self._entries.get(addr)
+            if entry is None:
+                return None
+            return entry.decode(dpt or self.dpts.get(addr)), entry.timestamp
+
+    def _fresh(self, addr, max_age, dpt):
+        entry = self._entries.get(addr)
+        if entry is not None and (max_age is None or time.time() - entry.timestamp <= max_age):
+            self.stats['hits'] += 1
+            return True, entry.decode(dpt)
+        return False, None
+
+    def get(self, ga, max_age=None, dpt=None):
+        """
+        Returns the value of a group address, reading it from the bus when
+        it is not cached or older than max_age
+
+        Parameters
+        ----------
+        ga : string or int
+            the group address as a string (e.g. '1/1/64') or an integer (0-65535)
+
+        max_age : float
+            the maximum age of the cached value in seconds, None accepts any
+            cached value
+
+        dpt : string
+            the data point type used to decode the value
+
+        Returns
+        -------
+        value :
+            the decoded value, None when the bus did not respond
+
+        """
+
+        addr = self._addr(ga)
+        dpt = dpt or self.dpts.get(addr)
+        with self._condition:
+            hit, value = self._fresh(addr, max_age, dpt)
+            if hit:
+                return value
+            self.stats['misses'] += 1
+            requested = time.time()
+
+        if hasattr(self.client, 'pending_reads'):
+            # the raw data, clients with a catalog would decode it
+            data = self.client.group_read(addr, raw=True)
+            if data is not None:
+                self.update(addr, data)
+        else:
+            # the client does not return responses, wait for the listener
+            self.client.group_read(addr)
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: addr in self._entries and self._entries[addr].timestamp >= requested,
+                    self.read_timeout)
+
+        with self._condition:
+            entry = self._entries.get(addr)
+            if entry is None or entry.timestamp < requested:
+                return None
+            return entry.decode(dpt)
+
+    async def get_async(self, ga, max_age=None, dpt=None):
+        """
+        Returns the value of a group address like :meth:`get`, reading it
+        with one of the asyncio clients
+
+        """
+
+        addr = self._addr(ga)
+        dpt = dpt or self.dpts.get(addr)
+        with self._condition:
+            hit, value = self._fresh(addr, max_age, dpt)
+            if hit:
+                return value
+            self.stats['misses'] += 1
+
+        data = await self.client.group_read(addr, raw=True)
+        if data is None:
+            return None
+        self.update(addr, data)
+        with self._condition:
+            return self._entries[addr].decode(dpt)
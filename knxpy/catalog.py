@@ -0,0 +1,320 @@
+import io
+import os
+import re
+import csv
+import json
+import array
+import logging
+import xml.etree.ElementTree as ElementTree
+
+from . import util
+from . import dpts
+
+
+logger = logging.getLogger(__name__)
+
+
+ADDRESS_COLUMNS = ('address', 'ga', 'group address')
+NAME_COLUMNS = ('name', 'group name')
+DPT_COLUMNS = ('dpt', 'datapointtype', 'datapoint type', 'dpts')
+
+
+def normalize_dpt(dpt):
+    """
+    Returns a data point type in the notation of the registry
+
+    ETS notations like 'DPST-9-1' and 'DPT-9' are converted to '9.001' and
+    '9', of a comma separated list only the first is used.
+
+    Examples
+    --------
+    >>> normalize_dpt('DPST-9-1')
+    '9.001'
+    >>> normalize_dpt('DPT-5')
+    '5'
+
+    """
+
+    if dpt is None:
+        return None
+    dpt = str(dpt).split(',')[0].strip()
+    if not dpt:
+        return None
+
+    match = re.match(r'^DPS?T-(\d+)(?:-(\d+))?$', dpt, re.IGNORECASE)
+    if match:
+        main, sub = match.groups()
+        if sub is None:
+            return main
+        return '{}.{:03d}'.format(main, int(sub))
+    return dpt
+
+
+class Catalog(object):
+    """
+    Group address catalog with the name and data point type of each group
+    address
+
+    The codec of each group address is looked up once when it is added. A
+    65536 entry array indexed by integer group address holds the index of
+    the codec, so encoding or decoding a value needs no dpt dispatch. Names
+    are mapped to addresses in a dict.
+
+    A catalog passed to a client with the catalog argument is used to
+    resolve names to addresses and to encode and decode values of group
+    addresses when no dpt is given.
+
+    Examples
+    --------
+    >>> catalog = Catalog.load('project.csv')
+    >>> catalog.address('Living room temperature')
+    2375
+    >>> tunnel = knxpy.ip.KNXIPTunnel('192.168.1.3', 3671, catalog=catalog)
+    >>> tunnel.connect()
+    >>> tunnel.group_read('Living room temperature')
+    22.64
+
+    """
+
+    def __init__(self):
+        self._index = array.array('H', bytes(2 * 0x10000))
+        self._codecs = [None]
+        self._dpts = [None]
+        self._slots = {}
+        self._names = {}
+        self._addresses = {}
+        self._members = set()
+
+    def __contains__(self, ga):
+        try:
+            return self.address(ga) in self._members
+        except KeyError:
+            return False
+
+    def __len__(self):
+        return len(self._members)
+
+    def __iter__(self):
+        return iter(sorted(self._members))
+
+    def add(self, ga, name=None, dpt=None):
+        """
+        Add or replace a group address
+
+        Parameters
+        ----------
+        ga : string or int
+            the group address as a string (e.g. '1/1/64') or an integer (0-65535)
+
+        name : string
+            the name of the group address
+
+        dpt : string
+            the data point type of the group address
+
+        """
+
+        addr = util.encode_ga(ga) if type(ga) is str else ga
+        dpt = normalize_dpt(dpt)
+
+        slot = 0
+        if dpt is not None:
+            slot = self._slots.get(dpt)
+            if slot is None:
+                codec = dpts.registry.get(dpt)
+                if codec is None:
+                    logger.warning('unknown data point type {} of {}'.format(dpt, util.decode_ga(addr)))
+                slot = len(self._codecs)
+                self._codecs.append(codec)
+                self._dpts.append(dpt)
+                self._slots[dpt] = slot
+        self._index[addr] = slot
+
+        old = self._names.pop(addr, None)
+        if old is not None and self._addresses.get(old) == addr:
+            del self._addresses[old]
+        if name:
+            self._names[addr] = name
+            if name in self._addresses:
+                logger.debug('duplicate group address name {}'.format(name))
+            else:
+                self._addresses[name] = addr
+
+        self._members.add(addr)
+
+    def address(self, ga):
+        """
+        Returns the integer group address of a name, a group address string
+        or an integer group address
+
+        Raises
+        ------
+        KeyError
+            when the name is not in the catalog
+
+        """
+
+        if type(ga) is str:
+            addr = self._addresses.get(ga)
+            if addr is None:
+                if '/' not in ga:
+                    raise KeyError(ga)
+                addr = util.encode_ga(ga)
+            return addr
+        return ga
+
+    def name(self, ga):
+        """
+        Returns the name of a group address or None
+
+        """
+
+        return self._names.get(self.address(ga))
+
+    def dpt(self, ga):
+        """
+        Returns the data point type of a group address or None
+
+        """
+
+        return self._dpts[self._index[self.address(ga)]]
+
+    def codec(self, ga):
+        """
+        Returns the :class:`knxpy.dpts.Codec` of a group address or None
+
+        """
+
+        return self._codecs[self._index[self.address(ga)]]
+
+    def encode(self, ga, value):
+        """
+        Encode a value with the codec of a group address, the value is
+        returned unchanged when the group address has no codec
+
+        """
+
+        codec = self._codecs[self._index[self.address(ga)]]
+        if codec is None:
+            return value
+        return codec.encode(value)
+
+    def decode(self, ga, data):
+        """
+        Decode data with the codec of a group address, the data is returned
+        unchanged when the group address has no codec
+
+        """
+
+        codec = self._codecs[self._index[self.address(ga)]]
+        if codec is None:
+            return data
+        return codec.decode(data)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Create a catalog from dicts with an address, name and dpt key, the
+        column names of an ETS export are also accepted
+
+        """
+
+        catalog = cls()
+        for row in rows:
+            row = {str(key).strip().lower(): value for key, value in row.items() if key is not None}
+            address = next((row[key] for key in ADDRESS_COLUMNS if row.get(key)), None)
+            if address is None:
+                continue
+            address = address.strip() if isinstance(address, str) else address
+            # ETS exports group ranges as addresses like '1/-/-'
+            if isinstance(address, str) and '-' in address:
+                continue
+            name = next((row[key] for key in NAME_COLUMNS if row.get(key)), None)
+            dpt = next((row[key] for key in DPT_COLUMNS if row.get(key)), None)
+            catalog.add(address, name=name, dpt=dpt)
+        return catalog
+
+    @classmethod
+    def from_csv(cls, f):
+        """
+        Create a catalog from a csv file with a header, e.g. an ETS group
+        address export in the CSV format with columns
+
+        Parameters
+        ----------
+        f : string or file
+            the filename or an open file
+
+        """
+
+        if isinstance(f, str):
+            with open(f, newline='', encoding='utf-8-sig') as fh:
+                return cls.from_csv(fh)
+
+        text = f.read()
+        try:
+            dialect = csv.Sniffer().sniff(text[:4096], delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        return cls.from_rows(csv.DictReader(io.StringIO(text), dialect=dialect))
+
+    @classmethod
+    def from_json(cls, f):
+        """
+        Create a catalog from a json file with a list of objects with an
+        address, name and dpt key or an object with the addresses as keys
+
+        Parameters
+        ----------
+        f : string or file
+            the filename or an open file
+
+        """
+
+        if isinstance(f, str):
+            with open(f, encoding='utf-8') as fh:
+                return cls.from_json(fh)
+
+        data = json.load(f)
+        if isinstance(data, dict):
+            data = [dict(value, address=address) if isinstance(value, dict) else {'address': address, 'dpt': value}
+                    for address, value in data.items()]
+        return cls.from_rows(data)
+
+    @classmethod
+    def from_ets(cls, f):
+        """
+        Create a catalog from an ETS group address export in the XML format
+
+        Parameters
+        ----------
+        f : string or file
+            the filename or an open file
+
+        """
+
+        catalog = cls()
+        for _event, element in ElementTree.iterparse(f):
+            # strip the namespace
+            if element.tag.rsplit('}', 1)[-1] == 'GroupAddress':
+                catalog.add(element.get('Address'), name=element.get('Name'),
+                            dpt=element.get('DPTs') or element.get('DatapointType'))
+                element.clear()
+        return catalog
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Create a catalog from a csv, json or ETS xml file, depending on the
+        extension
+
+        """
+
+        extension = os.path.splitext(filename)[1].lower()
+        if extension == '.csv':
+            return cls.from_csv(filename)
+        elif extension == '.json':
+            return cls.from_json(filename)
+        elif extension == '.xml':
+            return cls.from_ets(filename)
+        raise ValueError('Unsupported catalog file {}'.format(filename))
@@ -1,6 +1,32 @@
 from . import util
 
 
+def hpai(ip, port):
+    """
+    Returns a UDP host protocol address information structure
+
+    """
+
+    res = bytearray([0x08, 0x01])
+    res.extend(util.ip_to_array(ip))
+    res.extend(util.int_to_array(port, 2))
+    return res
+
+
+def parse_hpai(body, source):
+    """
+    Returns the address of a host protocol address information structure,
+    the source address is used when the structure contains no address (NAT)
+
+    """
+
+    ip = '{}.{}.{}.{}'.format(*body[2:6])
+    port = (body[6] << 8) | body[7]
+    if ip == '0.0.0.0' or port == 0:
+        return source
+    return (ip, port)
+
+
 class KNXIPFrame:
     SEARCH_REQUEST = 0x0201
     SEARCH_RESPONSE = 0x0202
@@ -18,6 +44,7 @@ class KNXIPFrame:
     TUNNELLING_ACK = 0x0421
     ROUTING_INDICATION = 0x0530
     ROUTING_LOST_MESSAGE = 0x0531
+    ROUTING_BUSY = 0x0532
 
     DEVICE_MGMT_CONNECTION = 0x03
     TUNNEL_CONNECTION = 0x04
@@ -37,20 +64,38 @@ class KNXIPFrame:
     E_KNX_CONNECTION = 0x27
     E_TUNNELING_LAYER = 0x28
 
-    body = None
+    __slots__ = ('service_type_id', 'body')
 
-    def __init__(self, service_type_id):
+    def __init__(self, service_type_id, body=None):
         self.service_type_id = service_type_id
+        self.body = body
 
     def to_frame(self):
         return self.header() + self.body
 
     @classmethod
     def from_frame(cls, frame):
-        # TODO: Check length
-        p = cls(frame[2] * 256 + frame[3])
-        p.body = frame[6:]
-        return p
+        """
+        Parse a KNXnet/IP frame
+
+        The body is a memoryview of the frame, no data is copied.
+
+        Parameters
+        ----------
+        frame : bytes-like
+            the received datagram
+
+        """
+
+        view = memoryview(frame)
+        if len(view) < 6:
+            raise ValueError('KNXnet/IP frame too short: {} bytes'.format(len(view)))
+
+        total_length = (view[4] << 8) | view[5]
+        if total_length > len(view):
+            raise ValueError('KNXnet/IP frame length should be {} but is {}'.format(total_length, len(view)))
+
+        return cls((view[2] << 8) | view[3], view[6:total_length])
 
     def total_length(self):
         return 6 + len(self.body)
@@ -66,21 +111,27 @@ class KNXIPFrame:
 
 
 class KNXTunnelingRequest:
-    seq = 0
-    cEmi = None
-    channel = 0
 
-    def __init__(self):
-        pass
+    __slots__ = ('channel', 'seq', 'cEmi')
+
+    def __init__(self, channel=0, seq=0, cEmi=None):
+        self.channel = channel
+        self.seq = seq
+        self.cEmi = cEmi
 
     @classmethod
     def from_body(cls, body):
-        # TODO: Check length
-        p = cls()
-        p.channel = body[1]
-        p.seq = body[2]
-        p.cEmi = body[4:]
-        return p
+        """
+        Parse the body of a TUNNELLING_REQUEST, cEmi is a view of body
+
+        """
+
+        if len(body) < 4 or len(body) < body[0]:
+            raise ValueError('Tunnelling request too short: {} bytes'.format(len(body)))
+        if not isinstance(body, memoryview):
+            body = memoryview(body)
+        # the first byte is the length of the connection header
+        return cls(body[1], body[2], body[body[0]:])
 
     def __str__(self):
         return ""
@@ -92,37 +143,48 @@ class CEMIMessage():
     CMD_GROUP_RESPONSE = 3
     CMD_UNKNOWN = 0xff
 
-    code = 0
-    ctl1 = 0
-    ctl2 = 0
-    src_addr = None
-    dst_addr = None
-    cmd = None
-    tpci_apci = 0
-    mpdu_len = 0
-    data = [0]
+    __slots__ = ('code', 'ctl1', 'ctl2', 'src_addr', 'dst_addr', 'cmd', 'tpci_apci', 'mpdu_len', 'data')
 
     def __init__(self):
-        pass
+        self.code = 0
+        self.ctl1 = 0
+        self.ctl2 = 0
+        self.src_addr = None
+        self.dst_addr = None
+        self.cmd = None
+        self.tpci_apci = 0
+        self.mpdu_len = 0
+        self.data = 0
 
     @classmethod
     def from_body(cls, cemi):
+        """
+        Parse a cEMI message
+
+        Data longer than 6 bits is a memoryview of cemi, no data is copied.
+
+        """
+
+        if not isinstance(cemi, memoryview):
+            cemi = memoryview(cemi)
 
-        # TODO: check that length matches
         m = cls()
         m.code = cemi[0]
         offset = cemi[1]
 
+        if len(cemi) < 11 + offset:
+            raise ValueError('cEMI message too short: {} bytes'.format(len(cemi)))
+
         m.ctl1 = cemi[2 + offset]
         m.ctl2 = cemi[3 + offset]
 
-        m.src_addr = cemi[4 + offset] * 256 + cemi[5 + offset]
-        m.dst_addr = cemi[6 + offset] * 256 + cemi[7 + offset]
+        m.src_addr = (cemi[4 + offset] << 8) | cemi[5 + offset]
+        m.dst_addr = (cemi[6 + offset] << 8) | cemi[7 + offset]
 
         m.mpdu_len = cemi[8 + offset]
 
-        tpci_apci = cemi[9 + offset] * 256 + cemi[10 + offset]
-        apci = tpci_apci & 0x3ff
+        m.tpci_apci = (cemi[9 + offset] << 8) | cemi[10 + offset]
+        apci = m.tpci_apci & 0x3ff
 
         # for APCI codes see KNX Standard 03/03/07 Application layer 
         # table Application Layer control field
@@ -134,19 +196,34 @@ class CEMIMessage():
         elif (apci & 0x40):
             m.cmd = CEMIMessage.CMD_GROUP_RESPONSE
         else:
-            m.cmd = CEMIMessage.CMD_NOT_IMPLEMENTED
+            m.cmd = CEMIMessage.CMD_UNKNOWN
 
-        apdu = cemi[10 + offset:]
-        if len(apdu) != m.mpdu_len:
-            raise Exception("APDU LEN should be {} but is {}".format(m.mpdu_len, len(apdu)))
+        apdu_len = len(cemi) - 10 - offset
+        if apdu_len != m.mpdu_len:
+            raise Exception("APDU LEN should be {} but is {}".format(m.mpdu_len, apdu_len))
 
-        if len(apdu) == 1:
+        if apdu_len == 1:
             m.data = apci & 0x2f
         else:
             m.data = cemi[11 + offset:]
 
         return m
 
+    @property
+    def apci(self):
+        return self.tpci_apci & 0x3ff
+
+    @property
+    def payload(self):
+        """
+        The data octets following the APCI as a memoryview, empty when the
+        data is contained in the APCI
+
+        """
+        if isinstance(self.data, int):
+            return memoryview(b'')
+        return memoryview(self.data)
+
     def init_group(self, dst_addr=1):
         self.code = 0x11  # Comes from packet dump, why?
         self.ctl1 = 0xbc  # frametype 1, repeat 1, system broadcast 1, priority 3, ack-req 0, confirm-flag 0
@@ -176,10 +253,10 @@ class CEMIMessage():
             (self.dst_addr >> 0) & 0xff,
         ]
 
-        if type(self.data) == list:
-            data = self.data
-        else:
+        if isinstance(self.data, int):
             data = [self.data]
+        else:
+            data = list(self.data)
 
         if len(data) == 1:
             if (data[0] & 3) == data[0]:
@@ -189,7 +266,7 @@ class CEMIMessage():
                 b.extend([1 + len(data), (self.tpci_apci >> 8) & 0xff, (self.tpci_apci >> 0) & 0xff])
                 b.extend(data)
         else:
-            if (data[0] & 3) == data[0] and data[1] == 0:
+            if len(data) == 2 and (data[0] & 3) == data[0] and data[1] == 0:
                 # dpt1 data is added to the acpi byte and not data bytes are added
                 b.extend([1, (self.tpci_apci >> 8) & 0xff, ((self.tpci_apci >> 0) & 0xff) + data[0]])
             else:
@@ -207,5 +284,8 @@ class CEMIMessage():
             c = "write"
         elif self.cmd == self.CMD_GROUP_RESPONSE:
             c = "response"
+        data = self.data
+        if isinstance(data, memoryview):
+            data = bytes(data)
         return "{0:<10}-> {1:<10} {2} {3}".format(util.decode_ga(self.src_addr), util.decode_ga(self.dst_addr), c,
-                                                  self.data)
+                                                  data)
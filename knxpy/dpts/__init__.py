@@ -20,3 +20,41 @@ from . import dpt20
 from . import dpt24
 from . import dpt232
 
+from .codec import Codec, Registry, normalize
+
+registry = Registry()
+registry.register('1', dpt1)
+registry.register('2', dpt2)
+registry.register('3', dpt3)
+registry.register('4.002', dpt4002)
+registry.register('5', dpt5)
+registry.register('5.001', dpt5001)
+registry.register('6', dpt6)
+registry.register('7', dpt7)
+registry.register('8', dpt8)
+registry.register('9', dpt9)
+registry.register('10', dpt10)
+registry.register('11', dpt11)
+registry.register('12', dpt12)
+registry.register('13', dpt13)
+registry.register('14', dpt14)
+registry.register('16', dpt16000)
+registry.register('16.001', dpt16001)
+registry.register('17', dpt17)
+registry.register('20', dpt20)
+registry.register('24', dpt24)
+registry.register('232', dpt232)
+
+def register(dpt, codec, replace=False):
+    """
+    Register a codec in the default registry, see :meth:`Registry.register`
+
+    """
+    return registry.register(dpt, codec, replace=replace)
+
+def get_codec(dpt):
+    """
+    Returns the codec for a data point type from the default registry or None
+
+    """
+    return registry.get(dpt)
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Data point type codec registry
+
+Maps data point type identifiers ('9', '9.001', '9001', ...) to codec objects
+with a single dictionary lookup.
+
+"""
+
+
+class Codec(object):
+    """
+    Encoder / decoder pair for a single data point type
+
+    Parameters
+    ----------
+    dpt : string
+        the normalized data point type identifier (e.g. '9' or '5.001')
+
+    encode : callable
+        function converting a value to the knx data representation
+
+    decode : callable
+        function converting the knx data representation to a value
+
+    encode_array : callable, optional
+        vectorized version of encode, None when not available
+
+    decode_array : callable, optional
+        vectorized version of decode, None when not available
+
+    """
+
+    __slots__ = ('dpt', 'encode', 'decode', 'encode_array', 'decode_array')
+
+    def __init__(self, dpt, encode, decode, encode_array=None, decode_array=None):
+        self.dpt = dpt
+        self.encode = encode
+        self.decode = decode
+        self.encode_array = encode_array
+        self.decode_array = decode_array
+
+    @classmethod
+    def from_module(cls, dpt, module):
+        return cls(dpt, module.encode, module.decode,
+                   getattr(module, 'encode_array', None), getattr(module, 'decode_array', None))
+
+    def __repr__(self):
+        return '<Codec dpt: {}>'.format(self.dpt)
+
+
+def normalize(dpt):
+    """
+    Normalize a data point type identifier
+
+    Parameters
+    ----------
+    dpt : string or int
+        data point type as '9', '9.001', '9001' or 9
+
+    Returns
+    -------
+    main : string
+        the main type (e.g. '9')
+
+    sub : string or None
+        the zero padded subtype (e.g. '001') or None when no subtype is given
+
+    Examples
+    --------
+    >>> normalize('9.1')
+    ('9', '001')
+    >>> normalize('4002')
+    ('4', '002')
+    >>> normalize('232')
+    ('232', None)
+
+    """
+
+    dpt = str(dpt).strip()
+    if '.' in dpt:
+        main, sub = dpt.split('.', 1)
+    elif len(dpt) > 3:
+        main, sub = dpt[:-3], dpt[-3:]
+    else:
+        main, sub = dpt, None
+
+    main = str(int(main))
+    if sub is not None:
+        sub = '{:03d}'.format(int(sub))
+    return main, sub
+
+
+class Registry(object):
+    """
+    Registry of data point type codecs
+
+    Lookups of identifiers which were seen before are a single dictionary
+    access. A subtype which is not registered falls back to the codec of its
+    main type.
+
+    Examples
+    --------
+    >>> from knxpy.dpts import registry
+    >>> codec = registry.get('9.001')
+    >>> codec.decode(b'\\x0cl')
+    22.64
+
+    """
+
+    def __init__(self):
+        self._codecs = {}
+        self._lookup = {}
+
+    def register(self, dpt, codec, replace=False):
+        """
+        Register a codec
+
+        Parameters
+        ----------
+        dpt : string
+            the data point type identifier (e.g. '9' or '5.001')
+
+        codec : Codec or module
+            the codec, or any object with an encode and decode attribute
+
+        replace : bool
+            allow replacing an already registered codec
+
+        Returns
+        -------
+        codec : Codec
+            the registered codec
+
+        """
+
+        main, sub = normalize(dpt)
+        key = main if sub is None else '{}.{}'.format(main, sub)
+
+        if key in self._codecs and not replace:
+            raise ValueError('A codec for dpt {} is already registered'.format(key))
+
+        if not isinstance(codec, Codec):
+            codec = Codec.from_module(key, codec)
+
+        self._codecs[key] = codec
+        # resolved identifiers might now map to a different codec
+        self._lookup.clear()
+        return codec
+
+    def get(self, dpt, default=None):
+        """
+        Returns the codec for a data point type
+
+        Parameters
+        ----------
+        dpt : string or int
+            the data point type identifier (e.g. '9', '9.001' or '9001')
+
+        default :
+            the value to return when no codec is registered
+
+        """
+
+        try:
+            return self._lookup[dpt]
+        except (KeyError, TypeError):
+            pass
+
+        try:
+            main, sub = normalize(dpt)
+        except (ValueError, TypeError):
+            return default
+
+        codec = None
+        if sub is not None:
+            codec = self._codecs.get('{}.{}'.format(main, sub))
+        if codec is None:
+            codec = self._codecs.get(main)
+        if codec is None:
+            return default
+
+        try:
+            self._lookup[dpt] = codec
+        except TypeError:
+            pass
+        return codec
+
+    def __getitem__(self, dpt):
+        codec = self.get(dpt)
+        if codec is None:
+            raise KeyError('No codec registered for dpt {}'.format(dpt))
+        return codec
+
+    def __contains__(self, dpt):
+        return self.get(dpt) is not None
+
+    def __iter__(self):
+        return iter(self._codecs)
+
+    def __len__(self):
+        return len(self._codecs)
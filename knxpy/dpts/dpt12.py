@@ -7,6 +7,8 @@ Octet without Sign
 
 import struct
 
+from . import vector
+
 def encode(value):
     if value < 0:
         value = 0
@@ -24,3 +26,24 @@ def decode(data):
     return struct.unpack('>I', data)[0]
 
 
+def encode_array(values):
+    """
+    Encode an array of values, row i equals encode(values[i])
+
+    Returns
+    -------
+    rows : numpy.ndarray
+        (N, 5) uint8 array
+
+    """
+    import numpy as np
+    values = vector.as_float(values)
+    return vector.to_rows(np.trunc(np.clip(values, 0, 4294967295)), '>u4')
+
+
+def decode_array(data):
+    """
+    Decode 4 octet unsigned values from a contiguous buffer or an (N, 4) uint8 array
+
+    """
+    return vector.as_values(data, '>u4').astype('u4')
@@ -7,6 +7,8 @@ Octet with Sign
 
 import struct
 
+from . import vector
+
 def encode(value):
     if value < -2147483648:
         value = -2147483648
@@ -24,3 +26,24 @@ def decode(data):
     return struct.unpack('>i', data)[0]
 
 
+def encode_array(values):
+    """
+    Encode an array of values, row i equals encode(values[i])
+
+    Returns
+    -------
+    rows : numpy.ndarray
+        (N, 5) uint8 array
+
+    """
+    import numpy as np
+    values = vector.as_float(values)
+    return vector.to_rows(np.trunc(np.clip(values, -2147483648, 2147483647)), '>i4')
+
+
+def decode_array(data):
+    """
+    Decode 4 octet signed values from a contiguous buffer or an (N, 4) uint8 array
+
+    """
+    return vector.as_values(data, '>i4').astype('i4')
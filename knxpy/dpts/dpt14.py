@@ -7,6 +7,8 @@ Octet Floating Point Number
 
 import struct
 
+from . import vector
+
 def encode(value):
     data = bytearray([0])
     data.extend(struct.pack('>f', int(value)))
@@ -20,3 +22,24 @@ def decode(data):
     return struct.unpack('>f', data)[0]
 
 
+def encode_array(values):
+    """
+    Encode an array of values, row i equals encode(values[i])
+
+    Returns
+    -------
+    rows : numpy.ndarray
+        (N, 5) uint8 array
+
+    """
+    import numpy as np
+    # adding 0.0 turns -0.0 into 0.0 like int(value) does
+    return vector.to_rows(np.trunc(vector.as_float(values)) + 0.0, '>f4')
+
+
+def decode_array(data):
+    """
+    Decode 4 octet floats from a contiguous buffer or an (N, 4) uint8 array
+
+    """
+    return vector.as_values(data, '>f4').astype('f8')
@@ -12,6 +12,6 @@ def encode(value):
     return enc
 
 def decode(data):
-    return data.rstrip(b'0').decode()
+    return bytes(data).rstrip(b'0').decode()
 
 
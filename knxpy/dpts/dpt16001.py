@@ -12,6 +12,6 @@ def encode(value):
     return enc
 
 def decode(data):
-    return payload.rstrip(b'0').decode('iso-8859-1')
+    return bytes(data).rstrip(b'0').decode('iso-8859-1')
 
 
@@ -5,6 +5,8 @@ Scene Control
 
 """
 
+import struct
+
 def encode(value):
     return [0, int(value) & 0x3f]
 
@@ -5,6 +5,8 @@ Common HVAC Datapoint types
 
 """
 
+import struct
+
 def encode(value):
     return [0, int(value) & 0xff]
 
@@ -16,5 +16,5 @@ def encode(value):
 def decode(data):
     if len(data) != 1:
         return None
-    return payload.decode('iso-8859-1')
+    return bytes(data).decode('iso-8859-1')
 
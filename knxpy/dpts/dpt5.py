@@ -7,6 +7,8 @@
 
 import struct
 
+from . import vector
+
 
 def encode(value):
     if value < 0:
@@ -22,3 +24,24 @@ def decode(data):
     return struct.unpack('>B', data)[0]
 
 
+def encode_array(values):
+    """
+    Encode an array of values, row i equals encode(values[i])
+
+    Returns
+    -------
+    rows : numpy.ndarray
+        (N, 2) uint8 array
+
+    """
+    import numpy as np
+    values = vector.as_float(values)
+    return vector.to_rows(np.trunc(np.clip(values, 0, 255)), 'u1')
+
+
+def decode_array(data):
+    """
+    Decode 8 bit unsigned values from a contiguous buffer or an (N, 1) uint8 array
+
+    """
+    return vector.as_values(data, 'u1').astype('u1')
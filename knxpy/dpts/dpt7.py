@@ -7,6 +7,8 @@
 
 import struct
 
+from . import vector
+
 def encode(value):
     ret = bytearray([0])
     ret.extend(struct.pack('>H', int(value)))
@@ -19,3 +21,26 @@ def decode(data):
     return struct.unpack('>H', data)[0]
 
 
+def encode_array(values):
+    """
+    Encode an array of values, row i equals encode(values[i])
+
+    Returns
+    -------
+    rows : numpy.ndarray
+        (N, 3) uint8 array
+
+    """
+    import numpy as np
+    values = np.trunc(vector.as_float(values))
+    if values.size and (values.min() < 0 or values.max() > 65535):
+        raise ValueError('dpt7 values must be between 0 and 65535')
+    return vector.to_rows(values, '>u2')
+
+
+def decode_array(data):
+    """
+    Decode 2 octet unsigned values from a contiguous buffer or an (N, 2) uint8 array
+
+    """
+    return vector.as_values(data, '>u2').astype('u2')
@@ -7,6 +7,8 @@
 
 import struct
 
+from . import vector
+
 def encode(value):
     if value < -32768:
         value = -32768
@@ -23,3 +25,24 @@ def decode(data):
     return struct.unpack('>h', data)[0]
 
 
+def encode_array(values):
+    """
+    Encode an array of values, row i equals encode(values[i])
+
+    Returns
+    -------
+    rows : numpy.ndarray
+        (N, 3) uint8 array
+
+    """
+    import numpy as np
+    values = vector.as_float(values)
+    return vector.to_rows(np.trunc(np.clip(values, -32768, 32767)), '>i2')
+
+
+def decode_array(data):
+    """
+    Decode 2 octet signed values from a contiguous buffer or an (N, 2) uint8 array
+
+    """
+    return vector.as_values(data, '>i2').astype('i2')
@@ -7,6 +7,8 @@
 
 import struct
 
+from . import vector
+
 
 def encode(value):
     s = 0
@@ -38,3 +40,47 @@ def decode(data):
     return round(f, 2)
 
 
+_decode_table = None
+
+
+def encode_array(values):
+    """
+    Encode an array of values, row i equals encode(values[i])
+
+    Returns
+    -------
+    rows : numpy.ndarray
+        (N, 3) uint8 array
+
+    """
+    import numpy as np
+    values = vector.as_float(values)
+
+    s = np.where(values < 0, 0x8000, 0)
+    m = np.trunc(values * 100).astype(np.int64)
+    e = np.zeros(m.shape, dtype=np.int64)
+    overflow = (m > 2047) | (m < -2048)
+    while overflow.any():
+        e[overflow] += 1
+        m[overflow] >>= 1
+        overflow = (m > 2047) | (m < -2048)
+
+    if e.size and e.max() > 15:
+        raise ValueError('dpt9 values out of range')
+    return vector.to_rows(s | (e << 11) | (m & 0x07ff), '>u2')
+
+
+def decode_array(data):
+    """
+    Decode 2 octet floats from a contiguous buffer or an (N, 2) uint8 array
+
+    All 65536 possible values are decoded once with decode and looked up,
+    so the results are identical to the scalar function.
+
+    """
+    import numpy as np
+    global _decode_table
+
+    if _decode_table is None:
+        _decode_table = np.array([decode(struct.pack('>H', i)) for i in range(0x10000)], dtype=np.float64)
+    return _decode_table[vector.as_values(data, '>u2')]
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Helpers for the vectorized encode_array and decode_array functions of the
+numeric data point types
+
+NumPy is only imported when one of these functions is used.
+
+"""
+
+
+def as_values(data, dtype):
+    """
+    View raw knx data as an array of values without copying
+
+    Parameters
+    ----------
+    data : bytes-like or numpy.ndarray
+        a contiguous buffer of concatenated values or an (N, k) uint8 array
+        with one value per row
+
+    dtype : string
+        the numpy dtype of a single value (e.g. '>u2')
+
+    Returns
+    -------
+    values : numpy.ndarray
+        one dimensional array of values
+
+    """
+
+    import numpy as np
+
+    dtype = np.dtype(dtype)
+    if isinstance(data, np.ndarray):
+        if data.ndim == 2 and data.shape[1] != dtype.itemsize:
+            raise ValueError('Expected {} bytes per row but got {}'.format(dtype.itemsize, data.shape[1]))
+        data = np.ascontiguousarray(data, dtype=np.uint8).reshape(-1)
+        if data.size % dtype.itemsize:
+            raise ValueError('Data length is not a multiple of {}'.format(dtype.itemsize))
+        return data.view(dtype)
+
+    return np.frombuffer(data, dtype=dtype)
+
+
+def as_float(values):
+    import numpy as np
+    return np.asarray(values, dtype=np.float64).reshape(-1)
+
+
+def to_rows(values, dtype):
+    """
+    Convert an array of values to rows as returned by the scalar encode
+    functions, a zero byte followed by the big endian value
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        one dimensional array of values
+
+    dtype : string
+        the big endian numpy dtype of a single value (e.g. '>u2')
+
+    Returns
+    -------
+    rows : numpy.ndarray
+        (N, k+1) uint8 array
+
+    """
+
+    import numpy as np
+
+    values = np.ascontiguousarray(values, dtype=dtype)
+    width = values.dtype.itemsize
+    rows = np.zeros((values.size, width + 1), dtype=np.uint8)
+    rows[:, 1:] = values.view(np.uint8).reshape(-1, width)
+    return rows
@@ -3,10 +3,11 @@ import threading
 
 import logging
 import socketserver
-import queue
 import time
+import collections
+import concurrent.futures
 
-from .core import KNXIPFrame,KNXTunnelingRequest,CEMIMessage
+from .core import KNXIPFrame,KNXTunnelingRequest,CEMIMessage,hpai
 from . import util
 
 
@@ -22,27 +23,51 @@ class KNXIPTunnel(object):
     channel = 0
     seq = 0
     
-    def __init__(self, ip, port, callback=None):
+    def __init__(self, ip, port, callback=None, send_window=1, catalog=None, write_buffer=1000):
         self.remote_ip = ip
         self.remote_port = port
         self.discovery_port = None
         self.data_port = None
-        self.result_addr_dict = {}
-        self.result_dict = {}
-        self.unack_queue = queue.Queue()
+        self.pending_reads = PendingReads()
         self.callback = callback
+        self.catalog = catalog
         self.read_timeout = 0.5
+        self.ack_timeout = 1.0
+        self.send_window = send_window
+        self.heartbeat_interval = 60.0
+        self.heartbeat_timeout = 10.0
+        self.min_backoff = 0.5
+        self.max_backoff = 30.0
+        self.stats = {'sent': 0, 'acked': 0, 'retransmits': 0, 'dropped': 0,
+                      'heartbeats': 0, 'reconnects': 0, 'reconnect_failures': 0,
+                      'reconnect_latency': 0.0, 'downtime': 0.0, 'buffered': 0, 'replayed': 0}
+        self._send_lock = threading.Lock()
+        self._window = threading.BoundedSemaphore(send_window)
+        self._acks = {}
+
+        self._send_executor = None
+        self._heartbeat_thread = None
+        self._lost = threading.Event()
+        self._stop = threading.Event()
+        self._down_since = None
+        self._write_buffer = collections.deque(maxlen=write_buffer)
 
         # Find my own IP
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         s.connect((self.remote_ip,self.remote_port))
         self.local_ip=s.getsockname()[0]
+        s.close()
 
 
     def connect(self):
         """
         Connect to the KNX interface
 
+        A heartbeat thread checks the connection every heartbeat_interval
+        seconds. When the gateway does not respond or reports the channel as
+        unknown, the tunnel is established again. Writes made meanwhile are
+        buffered and sent once the tunnel is back.
+
         """
 
         # create the data server
@@ -59,43 +84,287 @@ class KNXIPTunnel(object):
         # initiate tunneling
         self._initiate_tunneling()
 
-        
+        if self.heartbeat_interval and self._heartbeat_thread is None:
+            self._stop.clear()
+            self._heartbeat_thread = threading.Thread(target=self._keep_alive)
+            self._heartbeat_thread.daemon = True
+            self._heartbeat_thread.start()
+
+    def disconnect(self):
+        """
+        Stop the heartbeat, close the tunnel and stop the data server
+
+        """
+
+        self._stop.set()
+        self._lost.set()
+        if self._heartbeat_thread is not None:
+            if self._heartbeat_thread is not threading.current_thread():
+                self._heartbeat_thread.join()
+            self._heartbeat_thread = None
+
+        if self.control_socket is not None:
+            try:
+                self._control_request(self._disconnect_request(self.control_socket.getsockname()[1]),
+                                      KNXIPFrame.DISCONNECT_RESPONSE, 1.0)
+            except (OSError, TimeoutError):
+                logger.warning("Gateway did not respond to the disconnect request")
+            self.control_socket.close()
+            self.control_socket = None
+
+        if self._send_executor is not None:
+            self._send_executor.shutdown(wait=False)
+            self._send_executor = None
+
+        if self.data_server is not None:
+            self.data_server.shutdown()
+            self.data_server.server_close()
+            self.data_server = None
+
+    def connection_state(self):
+        """
+        Request the state of the connection from the gateway
+
+        Returns
+        -------
+        status : int
+            the status of the CONNECTIONSTATE_RESPONSE, e.g.
+            KNXIPFrame.E_NO_ERROR or KNXIPFrame.E_CONNECTION_ID, None when
+            the gateway did not respond within heartbeat_timeout
+
+        """
+
+        try:
+            received = self._control_request(self._connectionstate_request(self.control_socket.getsockname()[1]),
+                                             KNXIPFrame.CONNECTIONSTATE_RESPONSE, self.heartbeat_timeout)
+        except (OSError, TimeoutError):
+            return None
+        return received[7]
+
+    def _keep_alive(self):
+        """
+        Send heartbeats and establish the tunnel again when the connection
+        is lost, runs in the heartbeat thread
+
+        """
+
+        while not self._stop.is_set():
+            lost = self._lost.wait(self.heartbeat_interval)
+            if self._stop.is_set():
+                break
+
+            if not lost:
+                # the gateway is given three chances to respond
+                for attempt in range(3):
+                    status = self.connection_state()
+                    self._count('heartbeats')
+                    if status is not None or self._stop.is_set():
+                        break
+                if status == KNXIPFrame.E_NO_ERROR or self._stop.is_set():
+                    continue
+                logger.warning("Connection state request of channel {} failed with status {}".format(
+                    self.channel, status))
+                self._connection_lost()
+
+            self._reconnect()
+
+    def _connection_lost(self):
+        """
+        Mark the tunnel as down and wake the heartbeat thread to reconnect
+
+        """
+
+        with self._send_lock:
+            if self._heartbeat_thread is None or self._down_since is not None:
+                return
+            self._down_since = time.monotonic()
+        logger.warning("Lost KNX IP tunnel (Channel: {})".format(self.channel))
+        self._lost.set()
+
+    def _reconnect(self):
+        """
+        Establish the tunnel again with exponential backoff and replay the
+        buffered writes
+
+        """
+
+        # the gateway may still hold the channel when it stopped responding
+        if self.control_socket is not None:
+            try:
+                self.control_socket.sendto(self._disconnect_request(self.control_socket.getsockname()[1]),
+                                           (self.remote_ip, self.remote_port))
+            except OSError:
+                pass
+            self.control_socket.close()
+            self.control_socket = None
+
+        backoff = self.min_backoff
+        while not self._stop.is_set():
+            starttime = time.monotonic()
+            try:
+                self._initiate_tunneling()
+            except Exception as e:
+                self._count('reconnect_failures')
+                logger.warning("Reconnecting failed, retrying in {} s: {}".format(backoff, e))
+                if self.control_socket is not None:
+                    self.control_socket.close()
+                    self.control_socket = None
+                # disconnect interrupts the wait
+                self._stop.wait(backoff)
+                backoff = min(2 * backoff, self.max_backoff)
+                continue
+
+            self._reconnected(starttime)
+            self._replay()
+            return
+
+    def _reconnected(self, starttime):
+        """
+        Mark the tunnel as up again after reconnecting, the reconnect
+        attempt started at starttime
+
+        """
+
+        now = time.monotonic()
+        with self._send_lock:
+            self.seq = 0
+            self.stats['reconnects'] += 1
+            self.stats['reconnect_latency'] = now - starttime
+            if self._down_since is not None:
+                self.stats['downtime'] += now - self._down_since
+            self._down_since = None
+            self._lost.clear()
+
+    def _buffer(self, cemi):
+        with self._send_lock:
+            self._write_buffer.append(cemi)
+            self.stats['buffered'] += 1
+
+    def _replay(self):
+        """
+        Send the writes buffered while the tunnel was down
+
+        """
+
+        while self._write_buffer and self._down_since is None:
+            cemi = self._write_buffer.popleft()
+            if self.send_tunnelling_request(cemi):
+                self._count('replayed')
+            elif self._down_since is not None:
+                self._write_buffer.appendleft(cemi)
+
     def send_tunnelling_request(self, cemi):
         """
-        Send a request through the ip tunnel
+        Send a request through the ip tunnel and wait for the acknowledgement
+
+        When no TUNNELLING_ACK is received within ack_timeout the request is
+        sent once more. At most send_window requests are waiting for an
+        acknowledgement, further calls block until one is acknowledged.
     
         Parameters
         ----------
         cemi : knxpy.core.CEMIMessage
             message as a cemi object
 
+        Returns
+        -------
+        acked : bool
+            True when the gateway acknowledged the request
+
+        """
+
+        body = cemi.to_body()
+        with self._window:
+            ack, seq, frame = self._prepare_tunnelling_request(body, concurrent.futures.Future())
+            try:
+                for attempt in range(2):
+                    if attempt > 0:
+                        self._count('retransmits')
+                    self.data_server.socket.sendto(frame, (self.remote_ip, self.remote_port))
+                    try:
+                        status = ack.result(timeout=self.ack_timeout)
+                    except concurrent.futures.TimeoutError:
+                        continue
+                    return self._check_ack(seq, status)
+
+                return self._ack_timeout(seq)
+            finally:
+                self._release_ack(seq)
+
+    def _prepare_tunnelling_request(self, body, ack):
+        """
+        Assign a sequence number to a request and register its ack future
+
         """
 
+        with self._send_lock:
+            seq = self.seq
+            if (self.seq < 0xff):
+                self.seq += 1
+            else:
+                self.seq = 0
+            self._acks[seq] = ack
+            self.stats['sent'] += 1
+
         f = KNXIPFrame(KNXIPFrame.TUNNELING_REQUEST)
-        b = bytearray([0x04,self.channel,self.seq,0x00]) # Connection header see KNXnet/IP 4.4.6 TUNNELLING_REQUEST
-        if (self.seq < 0xff):
-            self.seq += 1
-        else:
-            self.seq = 0
+        f.body = bytearray([0x04,self.channel,seq,0x00]) # Connection header see KNXnet/IP 4.4.6 TUNNELLING_REQUEST
+        f.body.extend(body)
+        return ack, seq, f.to_frame()
+
+    def _release_ack(self, seq):
+        with self._send_lock:
+            self._acks.pop(seq, None)
+
+    def _count(self, key):
+        with self._send_lock:
+            self.stats[key] += 1
+
+    def _check_ack(self, seq, status):
+        self._count('acked')
+        if status != KNXIPFrame.E_NO_ERROR:
+            logger.warning("Tunnelling request {} acknowledged with error {:#04x}".format(seq, status))
+            if status in (KNXIPFrame.E_CONNECTION_ID, KNXIPFrame.E_DATA_CONNECTION):
+                self._connection_lost()
+            return False
+        return True
+
+    def _ack_timeout(self, seq):
+        self._count('dropped')
+        logger.warning("Tunnelling request {} was not acknowledged".format(seq))
+        return False
+
+    def _ack_received(self, channel, seq, status):
+        """
+        Resolve the ack future of a request, called when a TUNNELLING_ACK
+        is received
+
+        """
+
+        if channel != self.channel:
+            return
+        with self._send_lock:
+            ack = self._acks.get(seq)
+        if ack is not None and not ack.done():
+            ack.set_result(status)
 
-        b.extend(cemi.to_body())
-        f.body=b
-        self.data_server.socket.sendto(f.to_frame(), (self.remote_ip, self.remote_port))
-        # TODO: wait for ack
-        
         
-    def group_read(self, ga, dpt=None):
+    def group_read(self, ga, dpt=None, raw=False):
         """
         Reads a value from the KNX bus
 
         Parameters
         ----------
         ga : string or int
-            the group address to write to as a string (e.g. '1/1/64') or an integer (0-65535)
+            the group address to write to as a string (e.g. '1/1/64') or an integer (0-65535),
+            or a name in the catalog
 
         dpt : string
             the data point type of the group address, used to decode the result
 
+        raw : bool
+            return the data as received, without decoding it with dpt or
+            the catalog
+
         Returns
         -------
         res : 
@@ -104,40 +373,167 @@ class KNXIPTunnel(object):
 
         Notes
         -----
-        This is still tricky, not all requests are answered and fast successive 
-        read calls can lead to wrong answers
+        Concurrent reads of the same group address share a single request
+        on the bus and all receive the first response.
 
         """
 
-        if type(ga) is str:
-            addr = util.encode_ga(ga)
-        else:
-            addr = ga
+        addr = util.resolve_ga(ga, self.catalog)
 
-        self.result_addr_dict[addr] = True
+        future = self._request_read(addr)
+        try:
+            res = future.result(timeout=self.read_timeout)
+        except concurrent.futures.TimeoutError:
+            res = None
+            self.pending_reads.discard(addr, future)
 
-        cemi = CEMIMessage()
-        cemi.init_group_read(addr)
-        self.send_tunnelling_request(cemi)
+        if raw:
+            return res
+        return self._decode(addr, res, dpt)
+
+    def group_read_many(self, gas, dpts=None, concurrency=10):
+        """
+        Reads the values of many group addresses, keeping up to concurrency
+        reads in flight
+
+        Parameters
+        ----------
+        gas : list of strings or ints
+            the group addresses to read
+
+        dpts : string, list or dict
+            a single data point type for all addresses, a list with a data
+            point type per address or a dict mapping addresses to data point
+            types, used to decode the results
+
+        concurrency : int
+            the maximum number of reads waiting for a response
+
+        Returns
+        -------
+        results : dict
+            the decoded value for each group address, None when not answered
+
+        timings : dict
+            the time in seconds between the request and the response or the
+            timeout for each group address
 
-        # Wait for the result
-        res = None
-        starttime = time.time()
-        runtime = 0
-        while res is None and runtime < self.read_timeout:
-            if addr in self.result_dict:
-                res = self.result_dict[addr]
-                del self.result_dict[addr]
-            time.sleep(0.01)
-            runtime = time.time()-starttime
+        """
 
-        del self.result_addr_dict[addr]
+        gas = list(collections.OrderedDict.fromkeys(gas))
+        dpts = util.expand_dpts(gas, dpts)
+
+        results = {}
+        timings = {}
+        waiting = collections.deque(zip(gas, dpts))
+        in_flight = []
+
+        while waiting or in_flight:
+            while waiting and len(in_flight) < concurrency:
+                ga, dpt = waiting.popleft()
+                addr = util.resolve_ga(ga, self.catalog)
+
+                read = GroupRead(ga, addr, dpt)
+                read.start(self._request_read(addr, wait=False, sending=read.sending))
+                in_flight.append(read)
+
+            # the timeout of a read starts when its request is sent
+            timeout = None
+            started = [read.starttime for read in in_flight if read.starttime is not None]
+            if started:
+                timeout = max(0, min(started) + self.read_timeout - time.monotonic())
+            concurrent.futures.wait([read.future for read in in_flight] +
+                                    [read.sent for read in in_flight if read.starttime is None],
+                                    timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+
+            now = time.monotonic()
+            still_in_flight = []
+            for read in in_flight:
+                if read.future.done():
+                    results[read.ga] = self._decode(read.addr, read.future.result(), read.dpt)
+                    timings[read.ga] = read.elapsed(now)
+                elif read.starttime is not None and now - read.starttime >= self.read_timeout:
+                    self.pending_reads.discard(read.addr, read.future)
+                    results[read.ga] = None
+                    timings[read.ga] = now - read.starttime
+                else:
+                    still_in_flight.append(read)
+            in_flight = still_in_flight
+
+        return results, timings
+
+    def _decode(self, addr, res, dpt):
+        """
+        Decode a read result with dpt or with the codec of addr in the
+        catalog
 
-        if not res is None and not dpt is None:
-            res = util.decode_dpt(res,dpt)
+        """
 
+        if res is None:
+            return None
+        if not dpt is None:
+            return util.decode_dpt(res, dpt)
+        if not self.catalog is None:
+            return self.catalog.decode(addr, res)
         return res
 
+    def _request_read(self, addr, wait=True, sending=None):
+        """
+        Returns the future of a pending read of addr, a read request is only
+        sent when no read of addr is pending
+
+        With wait False the request is sent in a sender thread and the
+        acknowledgement is not waited for, sending is called when the
+        request is about to be sent or when a read of addr is already
+        pending.
+
+        """
+
+        future, created = self.pending_reads.request(addr)
+        if created:
+            cemi = CEMIMessage()
+            cemi.init_group_read(addr)
+            try:
+                if wait:
+                    sent = self.send_tunnelling_request(cemi)
+                else:
+                    sent = self._sender().submit(self._send_read, cemi, sending)
+            except:
+                self.pending_reads.discard(addr, future)
+                raise
+            # the asyncio tunnel sends in a task, a failed send is only known when it is done
+            if hasattr(sent, 'add_done_callback'):
+                sent.add_done_callback(lambda sent: self._read_sent(addr, future, sent))
+        elif sending is not None:
+            sending()
+        return future
+
+    def _send_read(self, cemi, sending):
+        if sending is not None:
+            sending()
+        return self.send_tunnelling_request(cemi)
+
+    def _sender(self):
+        """
+        Returns the executor sending requests in the background, created on
+        first use
+
+        """
+
+        with self._send_lock:
+            if self._send_executor is None:
+                self._send_executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.send_window)
+            return self._send_executor
+
+    def _read_sent(self, addr, future, sent):
+        """
+        Discard the pending read of addr when sending its request failed
+
+        """
+
+        if sent.cancelled() or sent.exception() is not None:
+            self.pending_reads.discard(addr, future)
+
 
     def group_write(self, ga, data, dpt=None):
         """
@@ -146,25 +542,49 @@ class KNXIPTunnel(object):
         Parameters
         ----------
         ga : string or int
-            the group address to write to as a string (e.g. '1/1/64') or an integer (0-65535)
+            the group address to write to as a string (e.g. '1/1/64') or an integer (0-65535),
+            or a name in the catalog
 
         dpt : string
             the data point type of the group address, used to encode the data
 
+        Returns
+        -------
+        acked : bool
+            True when the gateway acknowledged the request, None when the
+            tunnel is reconnecting and the write is buffered
+
         """
 
-        if type(ga) is str:
-            addr = util.encode_ga(ga)
-        else:
-            addr = ga
+        cemi = self._write_request(ga, data, dpt)
+
+        if self._down_since is not None:
+            self._buffer(cemi)
+            return None
+        acked = self.send_tunnelling_request(cemi)
+        if not acked and self._down_since is not None:
+            # the gateway reported the channel as lost
+            self._buffer(cemi)
+            return None
+        return acked
+
+    def _write_request(self, ga, data, dpt):
+        """
+        Returns the cEMI message of a group write, the data is encoded with
+        dpt or with the codec of ga in the catalog
+
+        """
+
+        addr = util.resolve_ga(ga, self.catalog)
 
         if not dpt is None:
-            util.encode_dpt(data,dpt)
+            data = util.encode_dpt(data,dpt)
+        elif not self.catalog is None:
+            data = self.catalog.encode(addr, data)
 
         cemi = CEMIMessage()
         cemi.init_group_write(addr, data)
-        self.send_tunnelling_request(cemi)
-    
+        return cemi
 
     def _initiate_tunneling(self):
         """
@@ -174,45 +594,93 @@ class KNXIPTunnel(object):
 
         self.control_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.control_socket.bind((self.local_ip, 0))
-        
-        # Connect packet
-        p=bytearray()
-        p.extend([0x06,0x10]) # header size, protocol version
-        p.extend(util.int_to_array(KNXIPFrame.CONNECT_REQUEST , 2))
-        p.extend([0x00,0x1a]) # total length = 24 octet
-        
-        # Control endpoint
-        p.extend([0x08,0x01]) # length 8 bytes, UPD
-        _ip,port=self.control_socket.getsockname()
-        p.extend(util.ip_to_array(self.local_ip))
-        p.extend(util.int_to_array(port, 2)) 
-        
-        # Data endpoint
-        p.extend([0x08,0x01]) # length 8 bytes, UPD
-        p.extend(util.ip_to_array(self.local_ip))
-        p.extend(util.int_to_array(self.data_port, 2)) 
-
-        # 
-        p.extend([0x04,0x04,0x02,0x00])
-
-
-        self.control_socket.sendto(p, (self.remote_ip, self.remote_port))
-        
+        _ip, port = self.control_socket.getsockname()
 
         try:
-            self.control_socket.settimeout(1)
-            received = bytearray(self.control_socket.recv(1024))
+            received = self._control_request(self._connect_request(port, self.data_port),
+                                             KNXIPFrame.CONNECT_RESPONSE, 1.0)
         except:
             raise Exception('Could not connect to knx gateway {}:{}'.format(self.remote_ip, self.remote_port))
         else:
-            # Check if the response is an TUNNELING ACK
-            r_sid = received[2]*256+received[3]
-            if r_sid == KNXIPFrame.CONNECT_RESPONSE:
-                self.channel = received[6]
-                logger.debug("Connected KNX IP tunnel (Channel: {})".format(self.channel,self.seq))
-                # TODO: parse the other parts of the response
-            else:
-                raise Exception("Could not initiate tunnel connection, STI = {}".format(r_sid))
+            self.channel = self._parse_connect_response(received)
+            logger.debug("Connected KNX IP tunnel (Channel: {})".format(self.channel))
+
+    def _control_request(self, frame, response_type, timeout):
+        """
+        Send a frame through the control socket and return the first
+        received frame of response_type, other frames are skipped
+
+        Raises
+        ------
+        TimeoutError
+            when no response is received within timeout
+
+        """
+
+        self.control_socket.sendto(frame, (self.remote_ip, self.remote_port))
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError('No response from knx gateway {}:{}'.format(self.remote_ip, self.remote_port))
+            self.control_socket.settimeout(remaining)
+            try:
+                received = bytearray(self.control_socket.recv(1024))
+            except socket.timeout:
+                continue
+            if len(received) >= 6 and (received[2] << 8) | received[3] == response_type:
+                return received
+
+    def _connect_request(self, control_port, data_port):
+        """
+        Returns a CONNECT_REQUEST frame for a tunnel on the link layer
+
+        """
+
+        f = KNXIPFrame(KNXIPFrame.CONNECT_REQUEST)
+        f.body = hpai(self.local_ip, control_port) + hpai(self.local_ip, data_port)
+        # connection request information: tunnel connection on the link layer
+        f.body.extend([0x04, KNXIPFrame.TUNNEL_CONNECTION, 0x02, 0x00])
+        return f.to_frame()
+
+    def _connectionstate_request(self, control_port):
+        """
+        Returns a CONNECTIONSTATE_REQUEST frame for the current channel
+
+        """
+
+        f = KNXIPFrame(KNXIPFrame.CONNECTIONSTATE_REQUEST)
+        f.body = bytearray([self.channel, 0x00]) + hpai(self.local_ip, control_port)
+        return f.to_frame()
+
+    def _disconnect_request(self, control_port):
+        """
+        Returns a DISCONNECT_REQUEST frame for the current channel
+
+        """
+
+        f = KNXIPFrame(KNXIPFrame.DISCONNECT_REQUEST)
+        f.body = bytearray([self.channel, 0x00]) + hpai(self.local_ip, control_port)
+        return f.to_frame()
+
+    def _parse_connect_response(self, frame):
+        """
+        Returns the channel of a CONNECT_RESPONSE frame
+
+        Raises
+        ------
+        Exception
+            when the frame is no CONNECT_RESPONSE or the gateway refused the
+            connection
+
+        """
+
+        f = KNXIPFrame.from_frame(frame)
+        if f.service_type_id != KNXIPFrame.CONNECT_RESPONSE:
+            raise Exception("Could not initiate tunnel connection, STI = {}".format(f.service_type_id))
+        if f.body[1] != KNXIPFrame.E_NO_ERROR:
+            raise Exception("Could not initiate tunnel connection, error {:#04x}".format(f.body[1]))
+        return f.body[0]
 
     
 class DataRequestHandler(socketserver.BaseRequestHandler):
@@ -226,8 +694,11 @@ class DataRequestHandler(socketserver.BaseRequestHandler):
         socket = self.request[1]
         
         f = KNXIPFrame.from_frame(data)
-        
-        if f.service_type_id == KNXIPFrame.TUNNELING_REQUEST:
+
+        if f.service_type_id == KNXIPFrame.TUNNELLING_ACK:
+            self.server.tunnel._ack_received(f.body[1], f.body[2], f.body[3])
+
+        elif f.service_type_id == KNXIPFrame.TUNNELING_REQUEST:
             req = KNXTunnelingRequest.from_body(f.body)
             msg = CEMIMessage.from_body(req.cEmi)
             send_ack = False
@@ -248,9 +719,9 @@ class DataRequestHandler(socketserver.BaseRequestHandler):
             
             logger.debug("Received KNX message {}".format(msg))
             
-            # Put RESPONSES into the result dict
-            if (msg.cmd == CEMIMessage.CMD_GROUP_RESPONSE) and msg.dst_addr in tunnel.result_addr_dict:
-                tunnel.result_dict[msg.dst_addr] = msg.data
+            # resolve pending reads
+            if msg.cmd == CEMIMessage.CMD_GROUP_RESPONSE:
+                tunnel.pending_reads.resolve(msg.dst_addr, msg.data)
 
             # execute callback
             if not tunnel.callback is None:
@@ -268,6 +739,117 @@ class DataRequestHandler(socketserver.BaseRequestHandler):
             
 
 
- 
+
+class PendingReads(object):
+    """
+    Table of outstanding group reads keyed by group address
+
+    Parameters
+    ----------
+    future_factory : callable
+        function creating a new future, ``concurrent.futures.Future`` for
+        threads or ``loop.create_future`` for asyncio
+
+    """
+
+    def __init__(self, future_factory=concurrent.futures.Future):
+        self.future_factory = future_factory
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def request(self, addr):
+        """
+        Returns the future for a read of addr and whether it was created,
+        only the creator needs to send a read request
+
+        """
+
+        with self._lock:
+            future = self._futures.get(addr)
+            if future is not None and not future.done():
+                return future, False
+
+            future = self.future_factory()
+            self._futures[addr] = future
+            return future, True
+
+    def resolve(self, addr, data):
+        """
+        Set the result of the pending read of addr, returns True when a read
+        was pending
+
+        """
+
+        with self._lock:
+            future = self._futures.pop(addr, None)
+
+        if future is None or future.done():
+            return False
+        future.set_result(data)
+        return True
+
+    def discard(self, addr, future):
+        """
+        Remove future from the table, e.g. after a timeout
+
+        """
+
+        with self._lock:
+            if self._futures.get(addr) is future:
+                del self._futures[addr]
+
+    def __contains__(self, addr):
+        return addr in self._futures
+
+    def __len__(self):
+        return len(self._futures)
+
+
+class GroupRead(object):
+    """
+    A group read in flight, keeps track of the request and response time
+
+    """
+
+    __slots__ = ('ga', 'addr', 'dpt', 'future', 'sent', 'starttime', 'endtime')
+
+    def __init__(self, ga, addr, dpt=None):
+        self.ga = ga
+        self.addr = addr
+        self.dpt = dpt
+        self.future = None
+        self.sent = concurrent.futures.Future()
+        self.starttime = None
+        self.endtime = None
+
+    def start(self, future):
+        self.future = future
+        future.add_done_callback(self._done)
+
+    def sending(self):
+        """
+        Set the start time, called when the request is sent
+
+        """
+
+        if self.starttime is None:
+            self.starttime = time.monotonic()
+            self.sent.set_result(True)
+
+    def elapsed(self, now):
+        """
+        Returns the time between the request and the response, the done
+        callback which sets the end time may not have run yet
+
+        """
+
+        if self.starttime is None:
+            return 0.0
+        return (self.endtime or now) - self.starttime
+
+    def _done(self, future):
+        self.endtime = time.monotonic()
+
+
 class DataServer(socketserver.ThreadingMixIn, socketserver.UDPServer):
     pass
@@ -1,27 +1,83 @@
-import socket
 import time
+import inspect
 import logging
 import asyncio
+import collections
 
 
 from knxpy.core import KNXIPFrame, KNXTunnelingRequest, CEMIMessage
 from knxpy import util
 from knxpy import ip
+from knxpy.ip import PendingReads
+
+
+logger = logging.getLogger(__name__)
 
 
 class KNXIPTunnel(ip.KNXIPTunnel):
-    def __init__(self,ip,port,loop,callback=None):
-        super().__init__(ip,port,callback=callback)
+    """
+    Asyncio KNXnet/IP tunnel
+
+    The tunnel is set up, kept alive and closed through a control channel
+    endpoint, all frames are sent through the datagram transports so the
+    event loop is never blocked.
+
+    Parameters
+    ----------
+    ip : string
+        the ip address of the gateway
+
+    port : int
+        the port of the gateway
+
+    loop : asyncio event loop
+        the loop to run in
+
+    callback : callable or coroutine function
+        called with each received message
+
+    send_window : int
+        the maximum number of requests waiting for an acknowledgement
+
+    catalog : knxpy.catalog.Catalog
+        used to look up group addresses by name and to encode and decode
+        values when no dpt is given
+
+    Examples
+    --------
+    >>> tunnel = KNXIPTunnel('192.168.1.3', 3671, loop)
+    >>> await tunnel.connect()
+    >>> await asyncio.gather(tunnel.group_read('1/1/71', dpt='9'), tunnel.group_read('1/1/72', dpt='9'))
+    [22.64, 21.9]
+    >>> await tunnel.disconnect()
+
+    """
+
+    def __init__(self,ip,port,loop,callback=None,send_window=1,catalog=None):
+        super().__init__(ip,port,callback=callback,send_window=send_window,catalog=catalog)
 
         self.loop = loop
+        self.pending_reads = PendingReads(loop.create_future)
+        self.connect_timeout = 1.0
+        self.stats['heartbeat_errors'] = 0
+
+        self.control_server = None
+        self.control_port = None
+        self._control = None
+        self._heartbeat = None
+        self._lost = asyncio.Event()
+        self._read_sends = {}
+        self._async_window = asyncio.BoundedSemaphore(self.send_window)
 
     async def connect(self):
         """
-        
+        Connect to the KNX interface and start the heartbeat
+
         """
+
         # create the data server
         if self.data_server:
-            logging.info("Data server already running, not starting again")
+            logger.info("Data server already running, not starting again")
         else:
             listen = self.loop.create_datagram_endpoint(DataServerProtocol, local_addr=(self.local_ip, 0))
             transport, protocol = await listen
@@ -30,23 +86,223 @@ class KNXIPTunnel(ip.KNXIPTunnel):
             self.data_server = transport
             # get the data port
             self.data_port = transport.get_extra_info('sockname')[1]
-            self.data_server.socket = self.data_server._sock
+
+        # create the control endpoint
+        if self.control_server is None:
+            listen = self.loop.create_datagram_endpoint(lambda: ControlProtocol(self), local_addr=(self.local_ip, 0))
+            self.control_server, self._control = await listen
+            self.control_port = self.control_server.get_extra_info('sockname')[1]
 
         # initiate tunneling
-        self._initiate_tunneling()
+        await self._initiate_tunneling()
+
+        if self._heartbeat is None:
+            self._heartbeat = self.loop.create_task(self._keep_alive())
 
-    async def group_read(self, ga, dpt=None):
+    async def _initiate_tunneling(self):
+        """
+        Initiate the tunneling through the control endpoint
+
+        """
+
+        try:
+            received = await self._control.request(self._connect_request(self.control_port, self.data_port),
+                                                   KNXIPFrame.CONNECT_RESPONSE, self.connect_timeout)
+        except asyncio.TimeoutError:
+            raise Exception('Could not connect to knx gateway {}:{}'.format(self.remote_ip, self.remote_port))
+
+        self.channel = self._parse_connect_response(received)
+        logger.debug("Connected KNX IP tunnel (Channel: {})".format(self.channel))
+
+    async def connection_state(self):
+        """
+        Request the state of the connection from the gateway
+
+        Returns
+        -------
+        status : int
+            the status of the CONNECTIONSTATE_RESPONSE, e.g.
+            KNXIPFrame.E_NO_ERROR or KNXIPFrame.E_CONNECTION_ID, None when
+            the gateway did not respond within heartbeat_timeout
+
+        """
+
+        try:
+            received = await self._control.request(self._connectionstate_request(self.control_port),
+                                                   KNXIPFrame.CONNECTIONSTATE_RESPONSE, self.heartbeat_timeout)
+        except asyncio.TimeoutError:
+            return None
+        return KNXIPFrame.from_frame(received).body[1]
+
+    async def _keep_alive(self):
+        """
+        Send heartbeats and establish the tunnel again when the connection
+        is lost, runs in the heartbeat task
+
+        """
+
+        while True:
+            try:
+                lost = await asyncio.wait_for(self._lost.wait(), self.heartbeat_interval)
+            except asyncio.TimeoutError:
+                lost = False
+
+            if not lost:
+                # the gateway is given three chances to respond
+                for attempt in range(3):
+                    status = await self.connection_state()
+                    self._count('heartbeats')
+                    if status is not None:
+                        break
+                if status == KNXIPFrame.E_NO_ERROR:
+                    continue
+                self._count('heartbeat_errors')
+                logger.warning("Connection state request of channel {} failed with status {}".format(
+                    self.channel, status))
+                self._connection_lost()
+
+            await self._reconnect()
+
+    def _connection_lost(self):
+        """
+        Mark the tunnel as down and wake the heartbeat task to reconnect
+
+        """
+
+        if self._heartbeat is None or self._down_since is not None:
+            return
+        self._down_since = time.monotonic()
+        logger.warning("Lost KNX IP tunnel (Channel: {})".format(self.channel))
+        self._lost.set()
+
+    async def _reconnect(self):
+        """
+        Establish the tunnel again with exponential backoff and replay the
+        buffered writes
+
+        """
+
+        # the gateway may still hold the channel when it stopped responding
+        self._control.transport.sendto(self._disconnect_request(self.control_port),
+                                       (self.remote_ip, self.remote_port))
+
+        backoff = self.min_backoff
+        while True:
+            starttime = time.monotonic()
+            try:
+                await self._initiate_tunneling()
+            except Exception as e:
+                self._count('reconnect_failures')
+                logger.warning("Reconnecting failed, retrying in {} s: {}".format(backoff, e))
+                await asyncio.sleep(backoff)
+                backoff = min(2 * backoff, self.max_backoff)
+                continue
+
+            self._reconnected(starttime)
+            await self._replay()
+            return
+
+    async def _replay(self):
+        """
+        Send the writes buffered while the tunnel was down
+
+        """
+
+        while self._write_buffer and self._down_since is None:
+            cemi = self._write_buffer.popleft()
+            if await self.send_tunnelling_request(cemi):
+                self._count('replayed')
+            elif self._down_since is not None:
+                self._write_buffer.appendleft(cemi)
+
+    async def disconnect(self):
+        """
+        Close the tunnel and the endpoints
+
+        """
+
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+
+        if self._control is not None:
+            try:
+                await self._control.request(self._disconnect_request(self.control_port),
+                                            KNXIPFrame.DISCONNECT_RESPONSE, self.connect_timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Gateway did not respond to the disconnect request")
+            self.control_server.close()
+            self.control_server = None
+            self._control = None
+
+        if self.data_server is not None:
+            self.data_server.close()
+            self.data_server = None
+
+        for task in self._read_sends.values():
+            task.cancel()
+        self._read_sends.clear()
+
+    def send_tunnelling_request(self, cemi, sending=None):
+        """
+        Send a request through the ip tunnel
+
+        Parameters
+        ----------
+        cemi : knxpy.core.CEMIMessage
+            message as a cemi object
+
+        sending : callable
+            called when the request is sent, after waiting for the send
+            window
+
+        Returns
+        -------
+        task : asyncio.Task
+            task which results in True when the gateway acknowledged the
+            request, can be awaited to wait for the acknowledgement
+
+        """
+
+        return self.loop.create_task(self._send_tunnelling_request(cemi.to_body(), sending))
+
+    async def _send_tunnelling_request(self, body, sending=None):
+        async with self._async_window:
+            if sending is not None:
+                sending()
+            ack, seq, frame = self._prepare_tunnelling_request(body, self.loop.create_future())
+            try:
+                for attempt in range(2):
+                    if attempt > 0:
+                        self._count('retransmits')
+                    self.data_server.sendto(frame, (self.remote_ip, self.remote_port))
+                    try:
+                        status = await asyncio.wait_for(asyncio.shield(ack), self.ack_timeout)
+                    except asyncio.TimeoutError:
+                        continue
+                    return self._check_ack(seq, status)
+
+                return self._ack_timeout(seq)
+            finally:
+                self._release_ack(seq)
+
+    async def group_read(self, ga, dpt=None, raw=False):
         """
         Reads a value from the KNX bus
 
         Parameters
         ----------
         ga : string or int
-            the group address to write to as a string (e.g. '1/1/64') or an integer (0-65535)
+            the group address to write to as a string (e.g. '1/1/64') or an integer (0-65535),
+            or a name in the catalog
 
         dpt : string
             the data point type of the group address, used to decode the result
 
+        raw : bool
+            return the data as received, without decoding it with dpt or
+            the catalog
+
         Returns
         -------
         res : 
@@ -55,42 +311,232 @@ class KNXIPTunnel(ip.KNXIPTunnel):
 
         Notes
         -----
-        This is still tricky, not all requests are answered and fast successive 
-        read calls can lead to wrong answers
+        Concurrent reads of the same group address share a single request
+        on the bus and all receive the first response.
 
         """
 
-        if type(ga) is str:
-            addr = util.encode_ga(ga)
-        else:
-            addr = ga
-
-        self.result_addr_dict[addr] = True
-
-        cemi = CEMIMessage()
-        cemi.init_group_read(addr)
-        self.send_tunnelling_request(cemi)
-    
-        # Wait for the result
-        res = None
-        starttime = time.time()
-        runtime = 0
-        while res is None and runtime < self.read_timeout:
-            if addr in self.result_dict:
-                res = self.result_dict[addr]
-                del self.result_dict[addr]
-            await asyncio.sleep(0.01)
-            runtime = time.time()-starttime
-
-        del self.result_addr_dict[addr]
-
-        if not res is None and not dpt is None:
-            res = util.decode_dpt(res,dpt)
-
+        res, _elapsed = await self._timed_read(ga, dpt, raw)
         return res
 
+    async def group_write(self, ga, data, dpt=None):
+        """
+        Writes a value to the KNX bus and waits for the acknowledgement
+
+        Parameters
+        ----------
+        ga : string or int
+            the group address to write to as a string (e.g. '1/1/64') or an integer (0-65535),
+            or a name in the catalog
+
+        dpt : string
+            the data point type of the group address, used to encode the data
+
+        Returns
+        -------
+        acked : bool
+            True when the gateway acknowledged the request, None when the
+            tunnel is reconnecting and the write is buffered
+
+        """
+
+        cemi = self._write_request(ga, data, dpt)
+
+        if self._down_since is not None:
+            self._buffer(cemi)
+            return None
+        acked = await self.send_tunnelling_request(cemi)
+        if not acked and self._down_since is not None:
+            # the gateway reported the channel as lost
+            self._buffer(cemi)
+            return None
+        return acked
+
+    async def group_read_many(self, gas, dpts=None, concurrency=10):
+        """
+        Reads the values of many group addresses, keeping up to concurrency
+        reads in flight
+
+        Parameters
+        ----------
+        gas : list of strings or ints
+            the group addresses to read
+
+        dpts : string, list or dict
+            a single data point type for all addresses, a list with a data
+            point type per address or a dict mapping addresses to data point
+            types, used to decode the results
+
+        concurrency : int
+            the maximum number of reads waiting for a response
+
+        Returns
+        -------
+        results : dict
+            the decoded value for each group address, None when not answered
+
+        timings : dict
+            the time in seconds between the request and the response or the
+            timeout for each group address
+
+        """
+
+        gas = list(collections.OrderedDict.fromkeys(gas))
+        dpts = util.expand_dpts(gas, dpts)
+
+        results = {}
+        timings = {}
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def read(ga, dpt):
+            async with semaphore:
+                results[ga], timings[ga] = await self._timed_read(ga, dpt)
+
+        await asyncio.gather(*[read(ga, dpt) for ga, dpt in zip(gas, dpts)])
+        return results, timings
+
+    async def _timed_read(self, ga, dpt=None, raw=False):
+        """
+        Read a group address, returns the decoded value and the time in
+        seconds between the request and the response or the timeout
+
+        The read_timeout starts when the request is sent, not while it
+        waits for the send window.
+
+        """
+
+        addr = util.resolve_ga(ga, self.catalog)
+        sent = self.loop.create_future()
+
+        def sending():
+            if not sent.done():
+                sent.set_result(time.monotonic())
+
+        future = self._request_read(addr, sending=sending)
+        # shield the shared future from being cancelled by a single timeout
+        response = asyncio.shield(future)
+        await asyncio.wait([response, sent], return_when=asyncio.FIRST_COMPLETED)
+        starttime = sent.result() if sent.done() else time.monotonic()
+        try:
+            res = await asyncio.wait_for(response, max(0, starttime + self.read_timeout - time.monotonic()))
+        except asyncio.TimeoutError:
+            res = None
+            self._discard_read(addr, future)
+
+        if not raw:
+            res = self._decode(addr, res, dpt)
+        return res, time.monotonic() - starttime
+
+    def _request_read(self, addr, wait=True, sending=None):
+        """
+        Returns the future of a pending read of addr, a read request is only
+        sent when no read of addr is pending
+
+        The request is sent in a task, sending is called when the request
+        is sent or when a read of addr is already pending.
+
+        """
+
+        future, created = self.pending_reads.request(addr)
+        if created:
+            cemi = CEMIMessage()
+            cemi.init_group_read(addr)
+            task = self.send_tunnelling_request(cemi, sending)
+            if task is not None:
+                self._read_sends[future] = task
+                task.add_done_callback(lambda task: self._read_sent(addr, future, task, sending))
+        elif sending is not None:
+            sending()
+        return future
+
+    def _read_sent(self, addr, future, task, sending=None):
+        """
+        Discard the pending read of addr when sending its request failed,
+        a read waiting for the request is timed from now on
+
+        """
+
+        if self._read_sends.get(future) is task:
+            del self._read_sends[future]
+        super()._read_sent(addr, future, task)
+        if sending is not None:
+            sending()
+
+    def _discard_read(self, addr, future):
+        """
+        Discard the pending read of addr and cancel sending its request
+
+        """
+
+        self.pending_reads.discard(addr, future)
+        task = self._read_sends.pop(future, None)
+        if task is not None:
+            task.cancel()
+
+
+class ControlProtocol(asyncio.DatagramProtocol):
+    """
+    The control endpoint of a tunnel, sends requests to the gateway and
+    resolves the futures waiting for their responses
 
-class DataServerProtocol(object):
+    """
+
+    def __init__(self, tunnel):
+        self.tunnel = tunnel
+        self.transport = None
+        self._waiting = {}
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    async def request(self, frame, response_type, timeout):
+        """
+        Send a frame to the gateway and return the first response of
+        response_type
+
+        Raises
+        ------
+        asyncio.TimeoutError
+            when no response is received within timeout
+
+        """
+
+        future = self._waiting.get(response_type)
+        if future is None or future.done():
+            future = self.tunnel.loop.create_future()
+            self._waiting[response_type] = future
+        self.transport.sendto(frame, (self.tunnel.remote_ip, self.tunnel.remote_port))
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        finally:
+            if self._waiting.get(response_type) is future:
+                del self._waiting[response_type]
+
+    def datagram_received(self, data, addr):
+        try:
+            f = KNXIPFrame.from_frame(data)
+        except ValueError as e:
+            logger.warning("Invalid frame on the control endpoint: {}".format(e))
+            return
+
+        if f.service_type_id == KNXIPFrame.DISCONNECT_REQUEST:
+            # the gateway closes the connection
+            logger.warning("Gateway closed channel {}".format(f.body[0]))
+            response = KNXIPFrame(KNXIPFrame.DISCONNECT_RESPONSE, bytearray([f.body[0], KNXIPFrame.E_NO_ERROR]))
+            self.transport.sendto(response.to_frame(), addr)
+            if f.body[0] == self.tunnel.channel:
+                self.tunnel._connection_lost()
+            return
+
+        future = self._waiting.get(f.service_type_id)
+        if future is not None and not future.done():
+            future.set_result(bytes(data))
+
+    def error_received(self, exc):
+        logger.warning("Control endpoint error: {}".format(exc))
+
+
+class DataServerProtocol(asyncio.DatagramProtocol):
     """
     An UDP server protocol for recieving messages from the KNX ip gateway
 
@@ -112,7 +558,7 @@ class DataServerProtocol(object):
     >>> transport, protocol = loop.run_until_complete(listen)
     >>>
     >>> # get the data port
-    >>> data_port = transport._sock.getsockname()[1]
+    >>> data_port = transport.get_extra_info('sockname')[1]
     >>>
     >>> # start the event loop
     >>> try:
@@ -126,12 +572,14 @@ class DataServerProtocol(object):
         self.transport = transport
 
     def datagram_received(self, data, addr):
-        socket = self.transport._sock
         tunnel = self.transport.tunnel
 
         f = KNXIPFrame.from_frame(data)
 
-        if f.service_type_id == KNXIPFrame.TUNNELING_REQUEST:
+        if f.service_type_id == KNXIPFrame.TUNNELLING_ACK:
+            tunnel._ack_received(f.body[1], f.body[2], f.body[3])
+
+        elif f.service_type_id == KNXIPFrame.TUNNELING_REQUEST:
             req = KNXTunnelingRequest.from_body(f.body)
             msg = CEMIMessage.from_body(req.cEmi)
             send_ack = False
@@ -144,26 +592,27 @@ class DataServerProtocol(object):
                 send_ack = True
             else: 
                 problem="Unimplemented cEMI message code {}".format(msg.code)
-                logging.error(problem)
+                logger.error(problem)
                 raise Exception(problem)
 
-            logging.debug("Received KNX message {}".format(msg))
+            logger.debug("Received KNX message {}".format(msg))
             
-            # Put RESPONSES into the result dict
-            if (msg.cmd == CEMIMessage.CMD_GROUP_RESPONSE) and msg.dst_addr in tunnel.result_addr_dict:
-                tunnel.result_dict[msg.dst_addr] = msg.data
-                print(tunnel.result_dict)
+            # resolve pending reads
+            if msg.cmd == CEMIMessage.CMD_GROUP_RESPONSE:
+                tunnel.pending_reads.resolve(msg.dst_addr, msg.data)
 
-            # execute callback
+            # execute callback, a coroutine function is run in a task
             if not tunnel.callback is None:
                 try:
-                    tunnel.loop.create_task(tunnel.callback(msg))
+                    result = tunnel.callback(msg)
+                    if inspect.isawaitable(result):
+                        tunnel.loop.create_task(result)
                 except Exception as e:
-                    logging.error("Error encountered durring callback execution: {}".format(e))
+                    logger.error("Error encountered durring callback execution: {}".format(e))
 
             if send_ack:
                 bodyack = bytearray([0x04, req.channel, req.seq, KNXIPFrame.E_NO_ERROR])
                 ack = KNXIPFrame(KNXIPFrame.TUNNELLING_ACK)
                 ack.body = bodyack
-                socket.sendto(ack.to_frame(), addr)
+                self.transport.sendto(ack.to_frame(), addr)
 
@@ -1,10 +1,9 @@
 #!/usr/bin/env python
-import time
 import socket
 import logging
-from threading import Thread
+from threading import Thread, Event
 
-from knxpy.util import encode_ga, encode_dpt, encode_data, decode_telegram, default_callback
+from knxpy.util import resolve_ga, encode_dpt, encode_data, decode_telegram, default_callback
 
 
 logger = logging.getLogger(__name__)
@@ -20,14 +19,22 @@ class KNXD(object):
     EIB_GROUP_PACKET = 0x27
     EIB_OPEN_GROUPCON = 0x26
 
-    def __init__(self, ip='localhost', port=6720, read_timeout=0.5):
+    def __init__(self, ip='localhost', port=6720, read_timeout=0.5, buffer_size=0x20000, min_backoff=0.1,
+                 max_backoff=30.0, catalog=None):
         self.ip = ip
         self.port = port
 
         self.read_timeout = read_timeout
+        self.buffer_size = buffer_size
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.catalog = catalog
         self.socket = None
+        self.recv_socket = None
         self.connected = False
         self.listening = False
+        self.stats = {'bytes': 0, 'frames': 0, 'resyncs': 0, 'reconnects': 0}
+        self._stop = Event()
 
     def connect(self):
         """
@@ -42,6 +49,11 @@ class KNXD(object):
     def listen(self, callback=None):
         """
         Listen for messages on a knx server.
+
+        Messages are received on a separate connection in a background
+        thread. When the connection is lost it is reopened, waiting
+        min_backoff seconds after the first failure and doubling the wait up
+        to max_backoff seconds after each further failure.
         """
         if callback is None:
             def callback(data):
@@ -49,57 +61,58 @@ class KNXD(object):
 
         def listen():
             self.listening = True
+            backoff = self.min_backoff
+            reader = FrameReader(self.buffer_size)
             while self.listening:
                 logger.debug('opening new connection')
-                recv_socket = socket.socket()
-                recv_socket.connect((self.ip, int(self.port)))
-                recv_socket.send(encode_data('HHB', [self.EIB_OPEN_GROUPCON, 0, 0]))
-
-                buf = bytearray()
-                num_read = 0
-                telegram_length = 2
-
-                # while self.listening:
-                #     data = recv_socket.recv(100)
-                #     print(data)
-
-                while self.listening:
+                try:
+                    self.recv_socket = socket.create_connection((self.ip, int(self.port)), timeout=1.0)
+                    self.recv_socket.send(encode_data('HHB', [self.EIB_OPEN_GROUPCON, 0, 0]))
+                except OSError as e:
+                    logger.warning('could not connect to {}:{}: {}'.format(self.ip, self.port, e))
+                else:
+                    reader.clear()
                     try:
-                        data = recv_socket.recv(100)
-                        if not data:
-                            break
-
-                        num_read += len(data)
-                        buf.extend(data)
-                        if num_read < telegram_length:
-                            continue
-
-                        telegram_length = (buf[0] << 0 | buf[1])
-                        if num_read < telegram_length + 2:
-                            continue
-
-                        ttype = (buf[2] << 8 | buf[3])
-                        if ttype != 39 or len(buf) < 6:
-                            buf = bytearray()
-                            num_read = 0
-                            telegram_length = 2
-                            continue
-
-                        message = decode_telegram(buf)
-                        callback(message)
-
-                        telegram_length = 2
-                        num_read = 0
-                        buf = bytearray()
-
-                    except:
-                        logger.exception('exception while listening')
-                        break
-
-                recv_socket.close()
-                time.sleep(1)
-
+                        while self.listening:
+                            try:
+                                num_read = reader.recv(self.recv_socket)
+                            except socket.timeout:
+                                continue
+                            if not num_read:
+                                break
+
+                            self.stats['bytes'] += num_read
+                            for telegram in reader.frames():
+                                ttype = (telegram[2] << 8 | telegram[3])
+                                if ttype != self.EIB_GROUP_PACKET or len(telegram) < 10:
+                                    continue
+
+                                # a server which accepts and acknowledges but then drops the connection keeps backing off
+                                backoff = self.min_backoff
+
+                                self.stats['frames'] += 1
+                                message = decode_telegram(telegram)
+                                try:
+                                    callback(message)
+                                except Exception:
+                                    logger.exception('exception in callback')
+
+                            self.stats['resyncs'] = reader.resyncs
+
+                    except OSError:
+                        if self.listening:
+                            logger.exception('exception while listening')
+                    finally:
+                        self.recv_socket.close()
+
+                if self.listening:
+                    self.stats['reconnects'] += 1
+                    self._stop.wait(backoff)
+                    backoff = min(2 * backoff, self.max_backoff)
+
+        self._stop.clear()
         thread = Thread(target=listen)
+        thread.daemon = True
         thread.start()
 
     def group_read(self, ga):
@@ -109,13 +122,11 @@ class KNXD(object):
         Parameters
         ----------
         ga : string or int
-            The group address to write to as a string (e.g. '1/1/64') or an integer (0-65535).
+            The group address to write to as a string (e.g. '1/1/64') or an integer (0-65535),
+            or a name in the catalog.
 
         """
-        if type(ga) is str:
-            addr = encode_ga(ga)
-        else:
-            addr = ga
+        addr = resolve_ga(ga, self.catalog)
 
         self.socket.send(encode_data('HHBB', [self.EIB_GROUP_PACKET, addr, 0, self.KNXREAD]))
         
@@ -126,17 +137,17 @@ class KNXD(object):
         Parameters
         ----------
         ga : string or int
-            The group address to write to as a string (e.g. '1/1/64') or an integer (0-65535).
+            The group address to write to as a string (e.g. '1/1/64') or an integer (0-65535),
+            or a name in the catalog.
         dpt : string
             The data point type of the group address, used to encode the data.
 
         """
-        if type(ga) is str:
-            addr = encode_ga(ga)
-        else:
-            addr = ga
+        addr = resolve_ga(ga, self.catalog)
         if dpt is not None:
             data = encode_dpt(data, dpt)
+        elif self.catalog is not None:
+            data = self.catalog.encode(addr, data)
 
         msg = bytearray([0, 39])
         msg.extend(addr.to_bytes(2, byteorder='big'))
@@ -160,4 +171,99 @@ class KNXD(object):
     def close(self):
         self.connected = False
         self.listening = False
-        self.socket.close()
+        self._stop.set()
+        if self.socket is not None:
+            self.socket.close()
+        if self.recv_socket is not None:
+            self.recv_socket.close()
+
+
+class FrameReader(object):
+    """
+    Extracts length prefixed knxd telegrams from a stream
+
+    Data is received with recv_into in a preallocated buffer. Complete
+    telegrams are consumed from the start of the buffered data, the remainder
+    is moved to the front of the buffer when the free space at the end runs
+    out.
+
+    Parameters
+    ----------
+    size : int
+        the buffer size in bytes, at least the maximum telegram length
+
+    """
+
+    def __init__(self, size=0x20000):
+        size = max(size, 2 + 0xffff)
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.start = 0
+        self.end = 0
+        self.resyncs = 0
+
+    def clear(self):
+        self.start = 0
+        self.end = 0
+
+    def recv(self, sock):
+        """
+        Receive data from a socket into the buffer
+
+        Returns
+        -------
+        num_read : int
+            the number of bytes received, 0 when the connection is closed
+
+        """
+
+        if self.end == len(self.buffer):
+            self.compact()
+        num_read = sock.recv_into(self.view[self.end:])
+        self.end += num_read
+        return num_read
+
+    def compact(self):
+        remaining = self.end - self.start
+        if remaining and self.start:
+            self.buffer[0:remaining] = self.view[self.start:self.end]
+        self.start = 0
+        self.end = remaining
+
+    def feed(self, data):
+        """
+        Add data to the buffer as if it was received
+
+        """
+
+        if self.end + len(data) > len(self.buffer):
+            self.compact()
+        self.buffer[self.end:self.end + len(data)] = data
+        self.end += len(data)
+
+    def frames(self):
+        """
+        Yields all complete telegrams in the buffer including the length
+        prefix as bytes
+
+        A length below 2 can not occur in a valid stream, the buffered data
+        is discarded and counted as a resync.
+
+        """
+
+        buf = self.buffer
+        while self.end - self.start >= 2:
+            length = buf[self.start] << 8 | buf[self.start + 1]
+            if length < 2:
+                self.resyncs += 1
+                self.start = self.end
+                break
+            if self.end - self.start < length + 2:
+                break
+            frame = bytes(self.view[self.start:self.start + length + 2])
+            self.start += length + 2
+            yield frame
+
+        if self.start == self.end:
+            self.start = 0
+            self.end = 0
@@ -1,28 +1,66 @@
 #!/usr/bin/env python
 
+import struct
 import asyncio
-import socket
 import logging
 
-from knxpy.util import encode_ga, encode_dpt, encode_data, default_callback
+from knxpy.util import resolve_ga, encode_dpt, decode_dpt, encode_data, decode_telegram, default_callback
+from knxpy.ip import PendingReads
 
 
-logger = logging.getLogger(__file__)
-logger.setLevel(logging.DEBUG)
+logger = logging.getLogger(__name__)
 
 
 class KNXD(object):
+    """
+    Asyncio client of a knxd server
+
+    A single connection is used for sending and receiving. Received
+    telegrams are decoded to :class:`knxpy.util.Message` objects which are
+    passed to the callback and to all :meth:`telegrams` iterators.
+
+    Parameters
+    ----------
+    ip : string
+        the knxd host
+
+    port : int
+        the knxd port
+
+    loop : asyncio event loop
+        the loop to run in, defaults to the current event loop
+
+    callback : callable
+        called with each received message
+
+    read_timeout : float
+        the time in seconds to wait for the response to a group read
+
+    catalog : knxpy.catalog.Catalog
+        used to look up group addresses by name and to encode and decode
+        values when no dpt is given
+
+    Examples
+    --------
+    >>> connection = KNXD('localhost', 6720)
+    >>> await connection.connect()
+    >>> await connection.group_write('1/1/61', 1, dpt='1')
+    >>> async for message in connection.telegrams():
+    ...     print(message)
+
+    """
 
     KNXWRITE = 0x80
     KNXREAD = 0x00
+    KNXRESPONSE = 0x40
 
     EIB_GROUP_PACKET = 0x27
     EIB_OPEN_GROUPCON = 0x26
 
-    def __init__(self, ip='localhost', port=6720, loop=None, callback=None, read_timeout=0.5):
+    def __init__(self, ip='localhost', port=6720, loop=None, callback=None, read_timeout=0.5, catalog=None):
         self.ip = ip
         self.port = port
-        
+
         if callback is None:
             callback = default_callback
         self.callback = callback
@@ -32,66 +70,162 @@ class KNXD(object):
         self.loop = loop
 
         self.read_timeout = read_timeout
-        self.socket = None
+        self.catalog = catalog
+        self.pending_reads = PendingReads(loop.create_future)
+
+        self.reader = None
+        self.writer = None
+        self._listener = None
+        self._queues = set()
 
     async def connect(self):
         """
-        Connect to a knxd server
+        Connect to a knxd server and start listening for telegrams
 
         """
 
-        self.socket = socket.socket()
-        self.socket.connect((self.ip, int(self.port)))
-        self.socket.send(encode_data('HHB', [self.EIB_OPEN_GROUPCON, 0, 0]))
+        self.reader, self.writer = await asyncio.open_connection(self.ip, int(self.port))
+        self.writer.write(encode_data('HHB', [self.EIB_OPEN_GROUPCON, 0, 0]))
+        await self.writer.drain()
+
+        self._listener = self.loop.create_task(self._listen())
 
-        reader, writer = await asyncio.open_connection(self.ip, self.port)
-        writer.write(encode_data('HHB', [self.EIB_OPEN_GROUPCON, 0, 0]))
-        
-        async def listen(reader):
+    async def _listen(self):
+        reader = self.reader
+        try:
             while True:
-                data = await reader.read(100)
-                self.callback(data)
-        
-        self.loop.create_task(listen(reader))
-        # writer.close()
+                length = await reader.readexactly(2)
+                data = await reader.readexactly(struct.unpack('>H', length)[0])
+
+                # skip the acknowledgement of the group connection
+                if len(data) < 6 or data[1] != self.EIB_GROUP_PACKET:
+                    continue
+
+                message = decode_telegram(length + data)
+                if message is None:
+                    continue
+
+                if message.flg == self.KNXRESPONSE:
+                    self.pending_reads.resolve(message._dst, message.val)
+
+                if self.callback is not None:
+                    try:
+                        self.callback(message)
+                    except Exception as e:
+                        logger.error("Error encountered durring callback execution: {}".format(e))
+
+                for queue in self._queues:
+                    queue.put_nowait(message)
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            logger.info('connection to {}:{} closed'.format(self.ip, self.port))
+        finally:
+            for queue in self._queues:
+                queue.put_nowait(None)
 
-    async def group_read(self, ga):
+    async def telegrams(self):
+        """
+        Iterate over the received messages until the connection is closed
+
+        Each iterator receives all messages from the moment it is started.
+
+        """
+
+        queue = asyncio.Queue()
+        self._queues.add(queue)
+        try:
+            while True:
+                message = await queue.get()
+                if message is None:
+                    return
+                yield message
+        finally:
+            self._queues.discard(queue)
+
+    async def _send(self, data):
+        self.writer.write(data)
+        await self.writer.drain()
+
+    async def group_read(self, ga, dpt=None, raw=False):
         """
         Reads a value from the KNX bus
 
         Parameters
         ----------
         ga : string or int
-            the group address to write to as a string (e.g. '1/1/64') or an integer (0-65535)
+            the group address to write to as a string (e.g. '1/1/64') or an integer (0-65535),
+            or a name in the catalog
+
+        dpt : string
+            the data point type of the group address, used to decode the result
+
+        raw : bool
+            return the data as received, without decoding it with dpt or
+            the catalog
+
+        Returns
+        -------
+        res :
+            the decoded value on the KNX bus, None when there was no response
+            within read_timeout
 
         """
-        if type(ga) is str:
-            addr = encode_ga(ga)
-        else:
-            addr = ga
-        self.socket.send(encode_data('HHBB', [self.EIB_GROUP_PACKET, addr, 0, self.KNXREAD]))
-        
-    def group_write(self, ga, data, dpt=None):
+
+        addr = resolve_ga(ga, self.catalog)
+
+        future, created = self.pending_reads.request(addr)
+        if created:
+            await self._send(encode_data('HHBB', [self.EIB_GROUP_PACKET, addr, 0, self.KNXREAD]))
+        try:
+            # shield the shared future from being cancelled by a single timeout
+            res = await asyncio.wait_for(asyncio.shield(future), self.read_timeout)
+        except asyncio.TimeoutError:
+            res = None
+            self.pending_reads.discard(addr, future)
+
+        if res is not None and not raw:
+            if dpt is not None:
+                res = decode_dpt(res, dpt)
+            elif self.catalog is not None:
+                res = self.catalog.decode(addr, res)
+
+        return res
+
+    async def group_write(self, ga, data, dpt=None):
         """
-        Writes a value to the KNX bus
+        Writes a value to the KNX bus, waits while the send buffer is full
 
         Parameters
         ----------
         ga : string or int
-            the group address to write to as a string (e.g. '1/1/64') or an integer (0-65535)
+            the group address to write to as a string (e.g. '1/1/64') or an integer (0-65535),
+            or a name in the catalog
 
         dpt : string
             the data point type of the group address, used to encode the data
 
         """
 
-        if type(ga) is str:
-            addr = encode_ga(ga)
-        else:
-            addr = ga
+        addr = resolve_ga(ga, self.catalog)
         if dpt is not None:
-            encode_dpt(data, dpt)
-        self.socket.send(encode_data('HHBB', [self.EIB_GROUP_PACKET, addr, 0, self.KNXWRITE | data]))
+            data = encode_dpt(data, dpt)
+        elif self.catalog is not None:
+            data = self.catalog.encode(addr, data)
+        if isinstance(data, int):
+            data = [data]
+
+        msg = bytearray(struct.pack('>HHB', self.EIB_GROUP_PACKET, addr, 0))
+        msg.extend(data)
+        msg[5] = self.KNXWRITE | msg[5]
+
+        await self._send(struct.pack('>H', len(msg)) + msg)
 
     def close(self):
-        self.socket.close()
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        for queue in self._queues:
+            queue.put_nowait(None)
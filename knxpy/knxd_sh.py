@@ -17,7 +17,7 @@ import threading
 import select
 import time
 
-from knxpy.util import default_callback, encode_ga, decode_pa, encode_dpt, Message
+from knxpy.util import default_callback, resolve_ga, decode_pa, encode_dpt, Message
 
 
 KNXREAD = 0x00
@@ -57,6 +57,12 @@ class Connections(Base):
         Base.__init__(self)
         Base._poller = self
         self._epoll = select.epoll()
+        # connections registered for EPOLLOUT
+        self._armed = set()
+        self._armed_lock = threading.Lock()
+        self._callback = None
+        self._timed_callback = None
+        self.stats = {'iterations': 0, 'wakeups': 0, 'events': 0, 'callback_time': 0.0}
 
     def register_server(self, fileno, obj):
         self._servers[fileno] = obj
@@ -68,6 +74,7 @@ class Connections(Base):
         self._epoll.register(fileno, self._ro)
 
     def unregister_connection(self, fileno):
+        self._armed.discard(fileno)
         try:
             self._epoll.unregister(fileno)
             del(self._connections[fileno])
@@ -84,21 +91,71 @@ class Connections(Base):
                 obj.connect()
 
     def trigger(self, fileno):
-        if self._connections[fileno].outbuffer:
-            self._epoll.modify(fileno, self._rw)
+        """
+        Register a connection for EPOLLOUT when its out buffer is not empty,
+        called after data is added to the buffer
+
+        """
+
+        with self._armed_lock:
+            if fileno not in self._armed and self._connections[fileno].outbuffer:
+                self._epoll.modify(fileno, self._rw)
+                self._armed.add(fileno)
+
+    def disarm(self, fileno):
+        """
+        Unregister a connection for EPOLLOUT when its out buffer is empty
+
+        """
+
+        with self._armed_lock:
+            if fileno in self._armed and not self._connections[fileno].outbuffer:
+                self._epoll.modify(fileno, self._ro)
+                self._armed.discard(fileno)
+
+    def _timed(self, callback):
+        """
+        Returns callback wrapped to add its execution time to the stats
+
+        """
+
+        if callback is None:
+            return None
+        if callback is not self._callback:
+            stats = self.stats
 
-    def poll(self, callback=None):
-        time.sleep(0.0000000001)  # give epoll.modify a chance
+            def timed(*args, **kwargs):
+                starttime = time.perf_counter()
+                try:
+                    return callback(*args, **kwargs)
+                finally:
+                    stats['callback_time'] += time.perf_counter() - starttime
+
+            self._callback = callback
+            self._timed_callback = timed
+        return self._timed_callback
+
+    def poll(self, callback=None, timeout=1):
+        """
+        Wait up to timeout seconds for events and handle them
+
+        Connections are only registered for EPOLLOUT while their out buffer
+        holds data, so an idle loop only waits in epoll.
+
+        """
+
+        self.stats['iterations'] += 1
         if not self._connections:
-            time.sleep(1)
+            time.sleep(timeout)
             return
-        for fileno in self._connections:
-            if fileno not in self._servers:
-                if self._connections[fileno].outbuffer:
-                    self._epoll.modify(fileno, self._rw)
-                else:
-                    self._epoll.modify(fileno, self._ro)
-        for fileno, event in self._epoll.poll(timeout=1):
+
+        callback = self._timed(callback)
+        events = self._epoll.poll(timeout=timeout)
+        if events:
+            self.stats['wakeups'] += 1
+            self.stats['events'] += len(events)
+
+        for fileno, event in events:
             if fileno in self._servers:
                 server = self._servers[fileno]
                 server.handle_connection()
@@ -115,6 +172,8 @@ class Connections(Base):
                     try:
                         con = self._connections[fileno]
                         con._out()
+                        if con.connected:
+                            self.disarm(fileno)
                     except Exception as e:  # noqa
                         logger.exception(e)
                         con.close()
@@ -141,10 +200,14 @@ class Stream(Base):
         Base.__init__(self, monitor=monitor)
         self.connected = False
         self.address = address
-        self.inbuffer = bytearray()
         self.outbuffer = collections.deque()
         self._frame_size_in = 4096
         self._frame_size_out = 4096
+        self._max_frames_out = 64
+        self._inbuf = bytearray(4 * self._frame_size_in)
+        self._inview = memoryview(self._inbuf)
+        self._instart = 0
+        self._inend = 0
         self.terminator = b'\r\n'
         self._balance_open = False
         self._balance_close = False
@@ -159,82 +222,158 @@ class Stream(Base):
             self.handle_connect()
 
     def _in(self, callback=None):
-        max_size = self._frame_size_in
+        # compact the buffer when there is no room for a full recv
+        if len(self._inbuf) - self._inend < self._frame_size_in:
+            self._compact()
         try:
-            data = self.socket.recv(max_size)
+            received = self.socket.recv_into(self._inview[self._inend:], self._frame_size_in)
         except Exception as e:  # noqa
             logger.exception(e)
             self.close()
             return
-        if data == b'':
+        if received == 0:
             self.close()
             return
-        self.inbuffer.extend(data)
+        self._inend += received
+
+        buf = self._inbuf
         while True:
             terminator = self.terminator
-            buffer_len = len(self.inbuffer)
+            start = self._instart
             if not terminator:
                 if not self._balance_open:
                     break
                 index = self._is_balanced()
                 if index:
-                    data = self.inbuffer[:index]
-                    self.inbuffer = self.inbuffer[index:]
+                    data = buf[start:start + index]
+                    self._instart = start + index
                     self.found_balance(data)
                 else:
                     break
             elif isinstance(terminator, int):
-                if buffer_len < terminator:
+                if self._inend - start < terminator:
                     break
                 else:
-                    data = self.inbuffer[:terminator]
-                    self.inbuffer = self.inbuffer[terminator:]
+                    data = buf[start:start + terminator]
+                    self._instart = start + terminator
                     self.terminator = 0
                     self.found_terminator(data, callback=callback)
             else:
-                if terminator not in self.inbuffer:
+                index = buf.find(terminator, start, self._inend)
+                if index < 0:
                     break
-                index = self.inbuffer.find(terminator)
-                data = self.inbuffer[:index]
-                cut = index + len(terminator)
-                self.inbuffer = self.inbuffer[cut:]
+                data = buf[start:index]
+                self._instart = index + len(terminator)
                 self.found_terminator(data, callback=callback)
+            # the handlers may have closed the connection and discarded the buffers
+            if buf is not self._inbuf:
+                break
+
+        if self._instart == self._inend:
+            self._instart = self._inend = 0
+
+    def _compact(self):
+        """
+        Move the unconsumed input to the start of the buffer, the buffer is
+        grown when it has no room for a full recv after compaction
+
+        """
+
+        start, end = self._instart, self._inend
+        size = len(self._inbuf)
+        if end - start + self._frame_size_in > size:
+            self._inview.release()
+            inbuf = bytearray(max(2 * size, end - start + self._frame_size_in))
+            inbuf[:end - start] = self._inbuf[start:end]
+            self._inbuf = inbuf
+            self._inview = memoryview(inbuf)
+        elif start:
+            self._inview[:end - start] = self._inview[start:end]
+        self._instart = 0
+        self._inend = end - start
+
+    @property
+    def inbuffer(self):
+        """
+        A read-only view of the received data which is not consumed yet,
+        the view is only valid until the next receive
+
+        Frames passed to found_terminator and found_balance are copies.
+
+        """
+
+        return memoryview(self._inbuf)[self._instart:self._inend].toreadonly()
 
     def _is_balanced(self):
-        stack = []
-        for index, char in enumerate(self.inbuffer):
-            if char == self._balance_open:
-                stack.append(char)
-            elif char == self._balance_close:
-                stack.append(char)
-                if stack.count(self._balance_open) < stack.count(self._balance_close):
+        depth = 0
+        buf = self._inbuf
+        bopen, bclose = self._balance_open, self._balance_close
+        for index in range(self._instart, self._inend):
+            char = buf[index]
+            if char == bopen:
+                depth += 1
+            elif char == bclose:
+                depth -= 1
+                if depth < 0:
                     logger.warning("{}: unbalanced input!".format(self._name))
-                    logger.close()
+                    self.close()
                     return False
-                if stack.count(self._balance_open) == stack.count(self._balance_close):
-                    return index + 1
+                if depth == 0:
+                    return index - self._instart + 1
         return False
 
     def _out(self):
         while self.outbuffer and self.connected:
-            frame = self.outbuffer.pop()
-            if not frame:
+            # gather the queued frames, oldest first, up to a close marker
+            frames = []
+            size = 0
+            close = False
+            while self.outbuffer and len(frames) < self._max_frames_out:
+                frame = self.outbuffer.pop()
                 if frame is None:
-                    self.close()
-                    return
-                continue  # ignore empty frames
-            try:
-                sent = self.socket.send(frame)
-            except socket.error:
-                # logger.exception("{}: {}".format(self._name, e))
-                self.outbuffer.append(frame)
+                    close = True
+                    break
+                if frame:  # ignore empty frames
+                    frames.append(frame)
+                    size += len(frame)
+
+            sent = 0
+            if frames:
+                try:
+                    sent = self.socket.sendmsg(frames)
+                except socket.error:
+                    # logger.exception("{}: {}".format(self._name, e))
+                    pass
+
+            if sent < size:
+                # requeue the unsent data so the oldest frame is popped first
+                if close:
+                    self.outbuffer.append(None)
+                for frame in self._unsent(frames, sent):
+                    self.outbuffer.append(frame)
+                return
+            if close:
+                self.close()
                 return
-            else:
-                if sent < len(frame):
-                    self.outbuffer.append(frame[sent:])
         if self._close_after_send:
             self.close()
 
+    @staticmethod
+    def _unsent(frames, sent):
+        """
+        Returns the unsent parts of frames after sent bytes, newest first
+
+        """
+
+        unsent = []
+        for frame in frames:
+            if sent >= len(frame):
+                sent -= len(frame)
+                continue
+            unsent.append(frame[sent:] if sent else frame)
+            sent = 0
+        return reversed(unsent)
+
     def balance(self, bopen, bclose):
         self._balance_open = ord(bopen)
         self._balance_close = ord(bclose)
@@ -265,7 +404,11 @@ class Stream(Base):
             pass
 
     def discard_buffers(self):
-        self.inbuffer = bytearray()
+        self._inview.release()
+        self._inbuf = bytearray(4 * self._frame_size_in)
+        self._inview = memoryview(self._inbuf)
+        self._instart = 0
+        self._inend = 0
         self.outbuffer.clear()
 
     def found_terminator(self, data, callback=None):
@@ -336,9 +479,10 @@ class Client(Stream):
 
 class KNXD(Client):
 
-    def __init__(self, ip='localhost', port=6720):
+    def __init__(self, ip='localhost', port=6720, catalog=None):
         super().__init__(ip, str(port), monitor=True)
         self.connections = Connections()
+        self.catalog = catalog
 
         self.gar = {}
         # self._init_ga = []
@@ -359,12 +503,11 @@ class KNXD(Client):
 
     def group_write(self, ga, data, dpt=None, flag='write'):
         pkt = bytearray([0, 39])
-        if type(ga) is str:
-            addr = encode_ga(ga)
-        else:
-            addr = ga
+        addr = resolve_ga(ga, self.catalog)
         if dpt is not None:
             data = encode_dpt(data, dpt)
+        elif self.catalog is not None and self.catalog.codec(addr) is not None:
+            data = self.catalog.encode(addr, data)
         else:
             data = [data]
 
@@ -384,10 +527,7 @@ class KNXD(Client):
         self._send(pkt)
 
     def group_read(self, ga):
-        if type(ga) is str:
-            addr = encode_ga(ga)
-        else:
-            addr = ga
+        addr = resolve_ga(ga, self.catalog)
         pkt = bytearray([0, 39])
         pkt.extend(addr.to_bytes(2, byteorder='big'))
         pkt.extend([0, KNXREAD])
@@ -476,8 +616,8 @@ class KNXD(Client):
             while self.alive:
                 try:
                     self.connections.poll(callback=callback)
-                except Exception as e:
-                    pass
+                except Exception:
+                    logger.exception('exception while listening')
 
         thread = Thread(target=listen)
         thread.start()
@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+"""
+Local knxd stand-in server for testing the knxd clients
+
+The server implements the part of the knxd EIB protocol used by the clients:
+opening a group connection (EIB_OPEN_GROUPCON), group packets
+(EIB_GROUP_PACKET) and enabling the group cache (EIB_CACHE_ENABLE). Group
+packets are sent to all other clients with an open group connection, reads
+are answered from a state table and recorded traffic can be replayed at a
+multiple of real time.
+
+Run a server on the default knxd port with::
+
+    python -m knxpy.knxd_simulator --port 6720
+
+"""
+
+import time
+import struct
+import asyncio
+import logging
+import argparse
+
+from . import util
+
+
+logger = logging.getLogger(__name__)
+
+
+KNXREAD = 0x00
+KNXRESP = 0x40
+KNXWRITE = 0x80
+
+
+class Client(object):
+    """
+    A client connection of the simulator
+
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.groupcon = False
+        self.cache = False
+        self.address = writer.get_extra_info('peername')
+
+
+class KNXDSimulator(object):
+    """
+    A knxd compatible server running in an asyncio event loop
+
+    Parameters
+    ----------
+    ip : string
+        the ip address to bind to
+
+    port : int
+        the port to bind to, 0 picks a free port
+
+    max_buffer : int
+        the maximum number of bytes buffered for a client, packets to slow
+        clients are dropped when it is exceeded
+
+    Examples
+    --------
+    >>> sim = KNXDSimulator(port=6720)
+    >>> await sim.start()
+    >>> sim.state[knxpy.util.encode_ga('1/1/71')] = bytes([0x00, 0x80, 12, 108])
+    >>> await sim.replay(records, speed=10)
+    >>> await sim.stop()
+
+    """
+
+    EIB_OPEN_GROUPCON = 0x26
+    EIB_GROUP_PACKET = 0x27
+    EIB_CACHE_ENABLE = 0x70
+
+    def __init__(self, ip='127.0.0.1', port=0, max_buffer=1 << 20):
+        self.ip = ip
+        self.port = port
+        self.max_buffer = max_buffer
+        self.individual_address = 0x1101
+
+        self.state = {}
+        self.clients = set()
+        self.stats = {'connections': 0, 'received': 0, 'sent': 0, 'dropped': 0, 'reads': 0, 'writes': 0}
+
+        self.server = None
+        self.address = None
+
+    async def start(self):
+        """
+        Start listening for clients
+
+        """
+
+        self.server = await asyncio.start_server(self._serve, self.ip, self.port)
+        self.address = self.server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        """
+        Stop listening and close all client connections
+
+        """
+
+        if self.server is not None:
+            self.server.close()
+            self.drop_clients()
+            await self.server.wait_closed()
+            self.server = None
+
+    def drop_clients(self):
+        """
+        Close all client connections, as happens when knxd restarts
+
+        """
+
+        for client in list(self.clients):
+            client.writer.close()
+        self.clients.clear()
+
+    def group_write(self, ga, data, dpt=None, src=None, flag=KNXWRITE):
+        """
+        Simulate a group write on the bus by a device, the value is stored in
+        the state table and sent to all clients
+
+        Parameters
+        ----------
+        ga : string or int
+            the group address to write to as a string (e.g. '1/1/64') or an integer (0-65535)
+
+        dpt : string
+            the data point type of the group address, used to encode the data
+
+        src : int
+            the individual address of the sender
+
+        """
+
+        if type(ga) is str:
+            addr = util.encode_ga(ga)
+        else:
+            addr = ga
+        if dpt is not None:
+            data = util.encode_dpt(data, dpt)
+        elif isinstance(data, int):
+            data = [data]
+
+        apdu = bytearray([0])
+        apdu.extend(data)
+        apdu[1] |= flag
+        self.state[addr] = bytes(apdu)
+        self.send(self.individual_address if src is None else src, addr, apdu)
+
+    def send(self, src, dst, apdu, exclude=None):
+        """
+        Send a group packet to all clients with an open group connection
+
+        Parameters
+        ----------
+        src : int
+            the individual address of the sender
+
+        dst : int
+            the group address
+
+        apdu : bytes
+            the application layer data, starting with the TPCI byte
+
+        exclude : Client
+            a client which does not receive the packet
+
+        """
+
+        packet = bytearray(struct.pack('>HHHH', len(apdu) + 6, self.EIB_GROUP_PACKET, src, dst))
+        packet.extend(apdu)
+        packet = bytes(packet)
+
+        for client in self.clients:
+            if client is exclude or not client.groupcon:
+                continue
+            if client.writer.transport.get_write_buffer_size() > self.max_buffer:
+                self.stats['dropped'] += 1
+                continue
+            client.writer.write(packet)
+            self.stats['sent'] += 1
+
+    async def replay(self, records, speed=1.0):
+        """
+        Send recorded traffic to all clients
+
+        Parameters
+        ----------
+        records : iterable
+            tuples of the timestamp in seconds, the source address, the group
+            address and the application layer data starting with the TPCI
+            byte
+
+        speed : float
+            the replay speed as a multiple of real time, None sends all
+            records without delay
+
+        Returns
+        -------
+        count : int
+            the number of replayed records
+
+        """
+
+        count = 0
+        start = None
+        for timestamp, src, dst, apdu in records:
+            if speed is not None:
+                if start is None:
+                    start = (time.monotonic(), timestamp)
+                delay = start[0] + (timestamp - start[1]) / speed - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif count % 100 == 0:
+                # let the clients drain their buffers
+                await asyncio.sleep(0)
+
+            if apdu[1] & 0xc0 in (KNXWRITE, KNXRESP):
+                self.state[dst] = bytes(apdu)
+            self.send(src, dst, apdu)
+            count += 1
+        return count
+
+    async def _serve(self, reader, writer):
+        client = Client(reader, writer)
+        self.clients.add(client)
+        self.stats['connections'] += 1
+        logger.debug('client connected from {}'.format(client.address))
+
+        try:
+            while True:
+                length = struct.unpack('>H', await reader.readexactly(2))[0]
+                data = await reader.readexactly(length)
+                self.stats['received'] += 1
+                self.handle(client, data)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception:
+            logger.exception('error while handling client {}'.format(client.address))
+        finally:
+            self.clients.discard(client)
+            writer.close()
+            logger.debug('client {} disconnected'.format(client.address))
+
+    def handle(self, client, data):
+        """
+        Handle a message received from a client, without the length prefix
+
+        """
+
+        if len(data) < 2:
+            return
+        typ = struct.unpack('>H', data[0:2])[0]
+
+        if typ == self.EIB_OPEN_GROUPCON:
+            client.groupcon = True
+            client.writer.write(struct.pack('>HH', 2, self.EIB_OPEN_GROUPCON))
+
+        elif typ == self.EIB_CACHE_ENABLE:
+            client.cache = True
+            client.writer.write(struct.pack('>HH', 2, self.EIB_CACHE_ENABLE))
+
+        elif typ == self.EIB_GROUP_PACKET and len(data) >= 6:
+            dst = struct.unpack('>H', data[2:4])[0]
+            apdu = bytes(data[4:])
+            flag = apdu[1] & 0xc0
+
+            if flag == KNXREAD:
+                self.stats['reads'] += 1
+                self.send(self.individual_address, dst, apdu, exclude=client)
+                if dst in self.state:
+                    response = bytearray(self.state[dst])
+                    response[1] = (response[1] & 0x3f) | KNXRESP
+                    self.send(self.individual_address, dst, response)
+            else:
+                self.stats['writes'] += 1
+                self.state[dst] = apdu
+                self.send(self.individual_address, dst, apdu, exclude=client)
+
+        else:
+            logger.debug('unsupported message type {:04x}'.format(typ))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run a local knxd stand-in server')
+    parser.add_argument('--ip', default='127.0.0.1', help='the address to bind to')
+    parser.add_argument('--port', type=int, default=6720, help='the port to bind to')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG)
+    loop = asyncio.new_event_loop()
+    sim = KNXDSimulator(args.ip, args.port)
+    loop.run_until_complete(sim.start())
+    print('listening on {}:{}'.format(*sim.address))
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(sim.stop())
+        loop.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+import copy
+import time
+import queue
+import logging
+import threading
+import multiprocessing
+
+
+logger = logging.getLogger(__name__)
+
+
+PROCESSED = 0
+ERRORS = 1
+LATENCY_SUM = 2
+LATENCY_MAX = 3
+
+
+def message_key(message):
+    """
+    Returns the group address of a message from any of the clients
+
+    """
+
+    return message.dst_addr
+
+
+def detach(message):
+    """
+    Returns the message or a copy of it which does not reference the buffer
+    it was received in
+
+    Received data can be a memoryview of a buffer which is reused once the
+    callback returns, the data is copied to bytes before the message is
+    queued. This also makes the message picklable.
+
+    """
+
+    for attr in ('val', 'data'):
+        value = getattr(message, attr, None)
+        if isinstance(value, memoryview):
+            message = copy.copy(message)
+            setattr(message, attr, bytes(value))
+    return message
+
+
+def _work(get, callback, counters):
+    """
+    Worker loop, calls the callback with each queued message until a None
+    sentinel is received
+
+    """
+
+    while True:
+        item = get()
+        if item is None:
+            return
+        queued, message = item
+        try:
+            callback(message)
+        except Exception:
+            counters[ERRORS] += 1
+            logger.exception('Error encountered during callback execution')
+
+        latency = time.monotonic() - queued
+        counters[PROCESSED] += 1
+        counters[LATENCY_SUM] += latency
+        if latency > counters[LATENCY_MAX]:
+            counters[LATENCY_MAX] = latency
+
+
+def _process_worker(q, callback, counters):
+    _work(q.get, callback, counters)
+
+
+class Pipeline(object):
+    """
+    Processing stage between a receiver and the consumers of its messages
+
+    A pipeline is a callable which can be used as the callback of any of the
+    clients. Received messages are put in a bounded queue and passed to the
+    callback by a pool of workers, so a slow callback does not stall the
+    receiving socket. Messages are partitioned over the workers by group
+    address, messages to the same group address are processed in the order
+    they were received.
+
+    Parameters
+    ----------
+    callback : callable
+        called with each message, in process mode it must be picklable,
+        e.g. a module level function
+
+    workers : int
+        the number of worker threads or processes
+
+    mode : string
+        'thread' runs the callback in threads, 'process' in separate
+        processes for callbacks which need a cpu core
+
+    maxsize : int
+        the maximum number of queued messages per worker
+
+    policy : string
+        what to do when the queue of a worker is full, 'block' waits for
+        free space, 'drop' discards the message
+
+    key : callable
+        returns the partitioning key of a message, by default the group
+        address
+
+    Examples
+    --------
+    >>> pipeline = Pipeline(store_value, workers=4)
+    >>> tunnel = knxpy.ip.KNXIPTunnel('192.168.1.3', 3671, callback=pipeline)
+    >>> tunnel.connect()
+
+    """
+
+    MODES = ('thread', 'process')
+    POLICIES = ('block', 'drop')
+
+    def __init__(self, callback, workers=4, mode='thread', maxsize=10000, policy='block', key=message_key):
+        if mode not in self.MODES:
+            raise ValueError('mode must be one of {}'.format(', '.join(self.MODES)))
+        if policy not in self.POLICIES:
+            raise ValueError('policy must be one of {}'.format(', '.join(self.POLICIES)))
+
+        self.callback = callback
+        self.mode = mode
+        self.policy = policy
+        self.key = key
+
+        self._submitted = 0
+        self._dropped = 0
+        self._alive = True
+        self._lock = threading.Lock()
+
+        self._queues = []
+        self._counters = []
+        self._workers = []
+        for i in range(workers):
+            if mode == 'thread':
+                q = queue.Queue(maxsize)
+                counters = [0, 0, 0.0, 0.0]
+                worker = threading.Thread(target=_work, args=(q.get, callback, counters))
+            else:
+                q = multiprocessing.Queue(maxsize)
+                counters = multiprocessing.Array('d', 4, lock=False)
+                worker = multiprocessing.Process(target=_process_worker, args=(q, callback, counters))
+            worker.daemon = True
+            worker.start()
+
+            self._queues.append(q)
+            self._counters.append(counters)
+            self._workers.append(worker)
+
+    def __call__(self, message):
+        """
+        Queue a message for processing
+
+        Returns
+        -------
+        queued : bool
+            False when the message was dropped because the queue is full
+
+        """
+
+        if not self._alive:
+            raise RuntimeError('The pipeline is stopped')
+
+        key = self.key(message)
+        if type(key) is not int:
+            key = hash(key)
+        q = self._queues[key % len(self._queues)]
+
+        item = (time.monotonic(), detach(message))
+        try:
+            if self.policy == 'block':
+                q.put(item)
+            else:
+                q.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            return False
+
+        with self._lock:
+            self._submitted += 1
+        return True
+
+    def depth(self):
+        """
+        Returns the number of queued messages
+
+        """
+
+        try:
+            return sum(q.qsize() for q in self._queues)
+        except NotImplementedError:
+            # multiprocessing queues do not implement qsize on macOS
+            return self._submitted - sum(int(c[PROCESSED]) for c in self._counters)
+
+    @property
+    def stats(self):
+        """
+        A dict with the number of submitted, processed and dropped messages,
+        the number of callback errors, the current queue depth and the mean
+        and maximum latency in seconds between queueing and the end of the
+        callback
+
+        """
+
+        processed = sum(int(c[PROCESSED]) for c in self._counters)
+        latency_sum = sum(c[LATENCY_SUM] for c in self._counters)
+        return {
+            'submitted': self._submitted,
+            'processed': processed,
+            'dropped': self._dropped,
+            'errors': sum(int(c[ERRORS]) for c in self._counters),
+            'depth': self.depth(),
+            'latency_mean': latency_sum / processed if processed else None,
+            'latency_max': max(c[LATENCY_MAX] for c in self._counters) if self._counters else None,
+        }
+
+    def stop(self, timeout=None):
+        """
+        Process all queued messages and stop the workers
+
+        """
+
+        self._alive = False
+        for q in self._queues:
+            q.put(None)
+        for worker in self._workers:
+            worker.join(timeout)
@@ -0,0 +1,361 @@
+"""
+Recording of bus traffic in segment files of fixed size binary records
+
+Each segment starts with a 32 byte header followed by 32 byte records::
+
+    offset  size  field
+    0       8     ts       timestamp in seconds since the epoch, float64
+    8       2     src      individual address of the sender
+    10      2     dst      group address
+    12      1     apci     the APCI byte, a read (0x00), response (0x40) or
+                           write (0x80) with 6 bit data in the low bits
+    13      1     len      the number of payload bytes
+    14      18    payload  the data following the APCI byte
+
+All fields are little endian. Longer payloads are truncated to 18 bytes,
+standard frames carry at most 14.
+
+"""
+
+import os
+import re
+import mmap
+import time
+import struct
+import logging
+import threading
+import collections
+
+from . import util
+
+
+logger = logging.getLogger(__name__)
+
+
+MAGIC = b'KNXREC'
+VERSION = 1
+HEADER = struct.Struct('<6sHHd14x')
+RECORD = struct.Struct('<dHHBB18s')
+PAYLOAD_SIZE = 18
+
+FLAGS = {util.Message.CMD_GROUP_READ: 0x00, util.Message.CMD_GROUP_RESPONSE: 0x40,
+         util.Message.CMD_GROUP_WRITE: 0x80}
+
+
+Record = collections.namedtuple('Record', ['ts', 'src', 'dst', 'apci', 'payload'])
+
+
+def dtype():
+    """
+    Returns the numpy dtype of a record
+
+    """
+
+    import numpy as np
+    return np.dtype([('ts', '<f8'), ('src', '<u2'), ('dst', '<u2'), ('apci', 'u1'), ('len', 'u1'),
+                     ('payload', 'u1', (PAYLOAD_SIZE,))])
+
+
+def encode_message(message, timestamp):
+    """
+    Returns the record of a message of any of the clients
+
+    """
+
+    src = getattr(message, 'src_addr', None)
+    if src is None:
+        src = message.src
+    if type(src) is str:
+        src = util.encode_pa(src)
+
+    apci = FLAGS.get(message.cmd, 0)
+    data = message.data
+    if isinstance(data, int):
+        apci |= data & 0x3f
+        payload = b''
+    else:
+        payload = bytes(data[:PAYLOAD_SIZE])
+
+    return RECORD.pack(timestamp, src or 0, message.dst_addr, apci, len(payload), payload)
+
+
+class Recorder(object):
+    """
+    Records bus traffic to rotating segment files
+
+    The recorder is a callable which is used as the callback of a client or
+    of a :class:`knxpy.router.Router` or :class:`knxpy.pipeline.Pipeline`.
+    Every message is appended to the current segment as a 32 byte record. A
+    new segment is started when the current one holds segment_records
+    records or is older than segment_seconds.
+
+    Parameters
+    ----------
+    directory : string
+        the directory of the segment files, created when it does not exist
+
+    prefix : string
+        the segment filename prefix
+
+    segment_records : int
+        the maximum number of records per segment
+
+    segment_seconds : float
+        the maximum age of a segment in seconds, None for no limit
+
+    max_segments : int
+        the number of segments to keep, older segments are deleted, None
+        keeps all segments
+
+    Examples
+    --------
+    >>> recorder = Recorder('/var/lib/knx/recording')
+    >>> tunnel = knxpy.ip.KNXIPTunnel('192.168.1.3', 3671, callback=recorder)
+    >>> tunnel.connect()
+
+    """
+
+    def __init__(self, directory, prefix='bus-', segment_records=1 << 20, segment_seconds=None, max_segments=None):
+        self.directory = directory
+        self.prefix = prefix
+        self.segment_records = segment_records
+        self.segment_seconds = segment_seconds
+        self.max_segments = max_segments
+        self.stats = {'records': 0, 'segments': 0}
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = None
+        self._count = 0
+        self._started = None
+        existing = segments(directory, prefix)
+        self._index = segment_index(existing[-1], prefix) + 1 if existing else 0
+
+    def __call__(self, message):
+        self.record(message)
+
+    def record(self, message, timestamp=None):
+        """
+        Append a message to the current segment
+
+        """
+
+        if timestamp is None:
+            timestamp = time.time()
+        data = encode_message(message, timestamp)
+
+        with self._lock:
+            if self._file is None or self._count >= self.segment_records or (
+                    self.segment_seconds is not None and time.monotonic() - self._started >= self.segment_seconds):
+                self._rotate(timestamp)
+            self._file.write(data)
+            self._count += 1
+            self.stats['records'] += 1
+
+    def _rotate(self, timestamp):
+        if self._file is not None:
+            self._file.close()
+
+        filename = os.path.join(self.directory, '{}{:06d}.rec'.format(self.prefix, self._index))
+        self._index += 1
+        self._file = open(filename, 'wb')
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, timestamp))
+        self._count = 0
+        self._started = time.monotonic()
+        self.stats['segments'] += 1
+        logger.debug('recording to {}'.format(filename))
+
+        if self.max_segments is not None:
+            for old in segments(self.directory, self.prefix)[:-self.max_segments]:
+                os.remove(old)
+
+    def flush(self):
+        """
+        Write buffered records to the current segment
+
+        """
+
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def segment_index(filename, prefix):
+    return int(os.path.basename(filename)[len(prefix):-4])
+
+
+def segments(directory, prefix='bus-'):
+    """
+    Returns the segment files in a directory in the order they were written
+
+    """
+
+    pattern = re.compile(r'^{}\d+\.rec$'.format(re.escape(prefix)))
+    filenames = [os.path.join(directory, f) for f in os.listdir(directory) if pattern.match(f)]
+    return sorted(filenames, key=lambda f: segment_index(f, prefix))
+
+
+class Reader(object):
+    """
+    Reads the segments written by a :class:`Recorder`
+
+    Segments are memory mapped, records are unpacked while iterating and
+    :meth:`arrays` returns numpy views of the mapped files. A partially
+    written record at the end of a segment is ignored.
+
+    Parameters
+    ----------
+    directory : string
+        the directory of the segment files
+
+    prefix : string
+        the segment filename prefix
+
+    Examples
+    --------
+    >>> reader = Reader('/var/lib/knx/recording')
+    >>> for record in reader.records(ga='1/1/71', t0=time.time() - 3600):
+    ...     print(record.ts, knxpy.util.decode_dpt(record.payload, '9'))
+
+    """
+
+    def __init__(self, directory, prefix='bus-'):
+        self.directory = directory
+        self.prefix = prefix
+        self._maps = {}
+        self._retired = []
+
+    def _map(self, filename):
+        """
+        Returns the memory map of a segment, a segment which grew since it
+        was mapped is mapped again
+
+        """
+
+        size = os.path.getsize(filename)
+        mm = self._maps.get(filename)
+        if mm is not None:
+            if len(mm) == size:
+                return mm
+            # arrays may still reference the old map
+            self._retired.append(mm)
+
+        if size < HEADER.size + RECORD.size:
+            return None
+        with open(filename, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, record_size, _created = HEADER.unpack_from(mm)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            logger.warning('skipping {}, not a version {} recording'.format(filename, VERSION))
+            mm.close()
+            return None
+
+        self._maps[filename] = mm
+        return mm
+
+    def _segments(self):
+        """
+        Yields the memory map and the number of records of each segment
+
+        """
+
+        for filename in segments(self.directory, self.prefix):
+            mm = self._map(filename)
+            if mm is not None:
+                yield mm, (len(mm) - HEADER.size) // RECORD.size
+
+    def records(self, ga=None, t0=None, t1=None):
+        """
+        Iterate over the records, optionally only those of a group address
+        and with t0 <= ts < t1
+
+        Yields
+        ------
+        record : Record
+            the timestamp, source address, group address, APCI byte and the
+            payload as bytes
+
+        """
+
+        addr = None if ga is None else util.resolve_ga(ga)
+        for mm, count in self._segments():
+            view = memoryview(mm)[HEADER.size:HEADER.size + count * RECORD.size]
+            try:
+                for ts, src, dst, apci, length, payload in RECORD.iter_unpack(view):
+                    if addr is not None and dst != addr:
+                        continue
+                    if (t0 is not None and ts < t0) or (t1 is not None and ts >= t1):
+                        continue
+                    yield Record(ts, src, dst, apci, payload[:length])
+            finally:
+                view.release()
+
+    def telegrams(self, ga=None, t0=None, t1=None):
+        """
+        Iterate over the records as tuples of the timestamp, source address,
+        group address and application layer data, as used by
+        :meth:`knxpy.knxd_simulator.KNXDSimulator.replay`
+
+        """
+
+        for record in self.records(ga=ga, t0=t0, t1=t1):
+            yield record.ts, record.src, record.dst, bytes([0, record.apci]) + record.payload
+
+    def arrays(self):
+        """
+        Returns a numpy structured array of each segment, the arrays are
+        views of the memory mapped files and are not copied
+
+        """
+
+        import numpy as np
+
+        return [np.frombuffer(mm, dtype=dtype(), count=count, offset=HEADER.size)
+                for mm, count in self._segments()]
+
+    def array(self, ga=None, t0=None, t1=None):
+        """
+        Returns the records as a numpy structured array, optionally only
+        those of a group address and with t0 <= ts < t1
+
+        With a single segment and no filter the array is a view of the
+        memory mapped file, otherwise the records are copied.
+
+        """
+
+        import numpy as np
+
+        arrays = self.arrays()
+        if not arrays:
+            return np.zeros(0, dtype=dtype())
+        result = arrays[0] if len(arrays) == 1 else np.concatenate(arrays)
+
+        mask = None
+        if ga is not None:
+            mask = result['dst'] == util.resolve_ga(ga)
+        if t0 is not None:
+            mask = (result['ts'] >= t0) if mask is None else mask & (result['ts'] >= t0)
+        if t1 is not None:
+            mask = (result['ts'] < t1) if mask is None else mask & (result['ts'] < t1)
+        if mask is not None:
+            result = result[mask]
+        return result
+
+    def close(self):
+        """
+        Close the memory maps, arrays returned by arrays or array must be
+        deleted first
+
+        """
+
+        for mm in list(self._maps.values()) + self._retired:
+            mm.close()
+        self._maps = {}
+        self._retired = []
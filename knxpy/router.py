@@ -0,0 +1,217 @@
+import logging
+import threading
+
+from . import util
+
+
+logger = logging.getLogger(__name__)
+
+
+CMD_GROUP_WRITE = util.Message.CMD_GROUP_WRITE
+CMD_GROUP_RESPONSE = util.Message.CMD_GROUP_RESPONSE
+
+# the maximum of the main, middle and sub group
+LEVELS = (0x1f, 0x07, 0xff)
+
+
+def parse_level(part, maximum):
+    """
+    Returns the range of a group address level pattern, '*', a number or a
+    range like '10-20'
+
+    """
+
+    if part == '*':
+        return 0, maximum
+    if '-' in part:
+        start, end = part.split('-')
+        return int(start), int(end)
+    return int(part), int(part)
+
+
+def compile_pattern(pattern):
+    """
+    Returns a function which checks if an integer group address matches a
+    pattern
+
+    Parameters
+    ----------
+    pattern : string or tuple
+        a group address pattern with a '*' or a range per level, e.g.
+        '1/2/*', '1/*/*' or '1/2/10-20', or a tuple with the first and last
+        group address of a range
+
+    """
+
+    if isinstance(pattern, tuple):
+        start, end = [util.encode_ga(ga) if type(ga) is str else ga for ga in pattern]
+        return lambda addr: start <= addr <= end
+
+    parts = pattern.split('/')
+    if len(parts) > 3:
+        raise ValueError('Invalid group address pattern {}'.format(pattern))
+    # a shorter pattern matches all addresses of the lower levels
+    parts += ['*'] * (3 - len(parts))
+    ranges = [parse_level(part, maximum) for part, maximum in zip(parts, LEVELS)]
+
+    def match(addr):
+        levels = ((addr >> 11) & 0x1f, (addr >> 8) & 0x07, addr & 0xff)
+        return all(start <= level <= end for level, (start, end) in zip(levels, ranges))
+
+    return match
+
+
+def is_pattern(ga):
+    return isinstance(ga, tuple) or (type(ga) is str and ('*' in ga or '-' in ga or ga.count('/') < 2))
+
+
+class Subscription(object):
+    """
+    A handler subscribed to a group address or pattern
+
+    """
+
+    __slots__ = ('ga', 'handler', 'dpt', 'addr', 'match')
+
+    def __init__(self, ga, handler, dpt=None):
+        self.ga = ga
+        self.handler = handler
+        self.dpt = dpt
+        self.addr = None
+        self.match = None
+        if is_pattern(ga):
+            self.match = compile_pattern(ga)
+        elif type(ga) is str:
+            self.addr = util.encode_ga(ga)
+        else:
+            self.addr = ga
+
+    def matches(self, addr):
+        if self.match is None:
+            return addr == self.addr
+        return self.match(addr)
+
+
+class Router(object):
+    """
+    Dispatches received messages to handlers subscribed by group address
+
+    The router is a callable which is used as the callback of a client.
+    Handlers are called with the decoded value and the message for each
+    write and response telegram to a matching group address. The value is
+    decoded once per data point type, also when many handlers are subscribed
+    to the same group address. All messages are passed on to the callback.
+
+    The handlers of a group address are looked up in a dict by integer
+    address. Patterns are only matched the first time a group address is
+    received, the result is kept until the subscriptions change.
+
+    Parameters
+    ----------
+    callback : callable
+        called with each message after the handlers
+
+    Examples
+    --------
+    >>> router = Router()
+    >>> router.subscribe('1/1/71', lambda value, message: print(value), dpt='9')
+    >>> router.subscribe('1/2/*', log_switch, dpt='1')
+    >>> tunnel = knxpy.ip.KNXIPTunnel('192.168.1.3', 3671, callback=router)
+
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.stats = {'messages': 0, 'dispatched': 0, 'errors': 0}
+
+        self._subscriptions = []
+        self._dispatch = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, ga, handler, dpt=None):
+        """
+        Subscribe a handler to a group address or pattern
+
+        Parameters
+        ----------
+        ga : string, int or tuple
+            a group address as a string (e.g. '1/1/64') or an integer
+            (0-65535), a pattern like '1/2/*' or '1/2/10-20' or a tuple with
+            the first and last group address of a range
+
+        handler : callable
+            called as ``handler(value, message)``
+
+        dpt : string
+            the data point type used to decode the value, the raw data is
+            passed when None
+
+        Returns
+        -------
+        subscription : Subscription
+            the subscription, used to unsubscribe
+
+        """
+
+        subscription = Subscription(ga, handler, dpt)
+        with self._lock:
+            self._subscriptions.append(subscription)
+            self._dispatch = {}
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.remove(subscription)
+            self._dispatch = {}
+
+    def handlers(self, ga):
+        """
+        Returns the handlers of a group address grouped by data point type
+
+        Returns
+        -------
+        groups : tuple
+            tuples of a data point type and a tuple of handlers, in the order
+            of the first subscription with that data point type
+
+        """
+
+        addr = util.encode_ga(ga) if type(ga) is str else ga
+        groups = self._dispatch.get(addr)
+        if groups is None:
+            with self._lock:
+                handlers = {}
+                for subscription in self._subscriptions:
+                    if subscription.matches(addr):
+                        handlers.setdefault(subscription.dpt, []).append(subscription.handler)
+                groups = tuple((dpt, tuple(h)) for dpt, h in handlers.items())
+                self._dispatch[addr] = groups
+        return groups
+
+    def __call__(self, message):
+        self.stats['messages'] += 1
+
+        if message.cmd in (CMD_GROUP_WRITE, CMD_GROUP_RESPONSE):
+            groups = self._dispatch.get(message.dst_addr)
+            if groups is None:
+                groups = self.handlers(message.dst_addr)
+
+            for dpt, handlers in groups:
+                data = message.data
+                try:
+                    value = data if dpt is None else util.decode_dpt(data, dpt)
+                except Exception:
+                    self.stats['errors'] += 1
+                    logger.exception('could not decode {} as dpt {}'.format(data, dpt))
+                    continue
+
+                for handler in handlers:
+                    try:
+                        handler(value, message)
+                        self.stats['dispatched'] += 1
+                    except Exception:
+                        self.stats['errors'] += 1
+                        logger.exception('Error encountered during handler execution')
+
+        if self.callback is not None:
+            self.callback(message)
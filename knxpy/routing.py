@@ -0,0 +1,380 @@
+import os
+import time
+import random
+import socket
+import logging
+import threading
+import socketserver
+import concurrent.futures
+
+from .core import KNXIPFrame, CEMIMessage
+from .ip import PendingReads
+from . import util
+
+
+logger = logging.getLogger(__name__)
+
+
+MULTICAST_GROUP = '224.0.23.12'
+MULTICAST_PORT = 3671
+
+# L_Data.ind, routing devices only exchange indications
+LDATA_IND = 0x29
+
+
+class RateLimiter(object):
+    """
+    Token bucket limiting the number of sent routing indications
+
+    KNXnet/IP routers should not send more than 50 telegrams per second on
+    average. A ROUTING_BUSY from another router pauses sending for the
+    requested wait time plus a random delay which grows with the number of
+    busy messages received in a short time.
+
+    Parameters
+    ----------
+    rate : float
+        the average number of telegrams per second
+
+    burst : int
+        the number of telegrams which may be sent at once
+
+    """
+
+    def __init__(self, rate=50, burst=10):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._busy_count = 0
+        self._random = random.Random()
+        self._lock = threading.Lock()
+
+    def delay(self):
+        """
+        Take a token and return the time in seconds to wait before sending
+
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            wait = max(0.0, self._paused_until - now)
+            if self._tokens < 1:
+                wait = max(wait, (1 - self._tokens) / self.rate)
+            # the token is reserved, also when waiting
+            self._tokens -= 1
+        return wait
+
+    def acquire(self):
+        """
+        Wait until a telegram may be sent
+
+        Returns
+        -------
+        wait : float
+            the time waited in seconds
+
+        """
+
+        wait = self.delay()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def busy(self, wait_time):
+        """
+        Pause sending after a ROUTING_BUSY
+
+        Parameters
+        ----------
+        wait_time : float
+            the wait time of the busy message in seconds
+
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            # the busy counter is decremented every 5 ms after the last pause ended
+            if self._busy_count and now > self._paused_until:
+                self._busy_count = max(0, self._busy_count - int((now - self._paused_until) / 0.005))
+            self._busy_count += 1
+            pause = wait_time + self._random.uniform(0, self._busy_count * 0.05)
+            self._paused_until = max(self._paused_until, now + pause)
+
+
+class KNXIPRouter(object):
+    """
+    KNXnet/IP routing client
+
+    Telegrams are sent to and received from the KNXnet/IP multicast group,
+    so any number of clients can take part without using the tunnelling
+    connections of a gateway. The API is the one of
+    :class:`knxpy.ip.KNXIPTunnel`, group writes are not acknowledged.
+
+    Every client needs its own individual address. Received telegrams sent
+    from that address are the client's own telegrams and are ignored.
+
+    Parameters
+    ----------
+    ip : string
+        the multicast group
+
+    port : int
+        the multicast port
+
+    callback : callable
+        called with each received message
+
+    catalog : knxpy.catalog.Catalog
+        used to look up group addresses by name and to encode and decode
+        values when no dpt is given
+
+    individual_address : string or int
+        the individual address used as the source of sent telegrams
+
+    local_ip : string
+        the ip address of the interface to use, the default interface when
+        None
+
+    rate : float
+        the maximum average number of sent telegrams per second
+
+    Examples
+    --------
+    >>> router = KNXIPRouter(callback=print, individual_address='1.1.250')
+    >>> router.connect()
+    >>> router.group_write('1/1/71', 22.64, dpt='9')
+    >>> router.group_read('1/1/71', dpt='9')
+    22.64
+
+    """
+
+    def __init__(self, ip=MULTICAST_GROUP, port=MULTICAST_PORT, callback=None, catalog=None,
+                 individual_address='15.15.250', local_ip=None, rate=50):
+        self.remote_ip = ip
+        self.remote_port = port
+        self.callback = callback
+        self.catalog = catalog
+        self.local_ip = local_ip or '0.0.0.0'
+        if type(individual_address) is str:
+            individual_address = util.encode_pa(individual_address)
+        self.individual_address = individual_address
+        self.pending_reads = PendingReads()
+        self.limiter = RateLimiter(rate)
+        self.read_timeout = 0.5
+        self.stats = {'sent': 0, 'received': 0, 'ignored': 0, 'busy': 0, 'lost': 0, 'throttle_time': 0.0}
+
+        self.data_server = None
+        self._send_lock = threading.Lock()
+
+    def connect(self):
+        """
+        Join the multicast group and start receiving
+
+        """
+
+        if self.data_server:
+            logger.info("Data server already running, not starting again")
+            return
+
+        self.data_server = RoutingServer((self.remote_ip, self.remote_port), RoutingRequestHandler,
+                                         local_ip=self.local_ip)
+        self.data_server.router = self
+        data_server_thread = threading.Thread(target=self.data_server.serve_forever)
+        data_server_thread.daemon = True
+        data_server_thread.start()
+
+    def disconnect(self):
+        """
+        Leave the multicast group and stop receiving
+
+        """
+
+        if self.data_server is not None:
+            self.data_server.shutdown()
+            self.data_server.server_close()
+            self.data_server = None
+
+    def send_routing_indication(self, cemi):
+        """
+        Send a cEMI message to the multicast group, waits while the rate
+        limiter or a ROUTING_BUSY holds back sending
+
+        Parameters
+        ----------
+        cemi : knxpy.core.CEMIMessage
+            message as a cemi object
+
+        """
+
+        cemi.code = LDATA_IND
+        cemi.src_addr = self.individual_address
+        frame = KNXIPFrame(KNXIPFrame.ROUTING_INDICATION, bytearray(cemi.to_body())).to_frame()
+
+        wait = self.limiter.acquire()
+        self.data_server.socket.sendto(frame, (self.remote_ip, self.remote_port))
+        with self._send_lock:
+            self.stats['sent'] += 1
+            self.stats['throttle_time'] += wait
+
+    def group_read(self, ga, dpt=None, raw=False):
+        """
+        Reads a value from the KNX bus
+
+        Parameters
+        ----------
+        ga : string or int
+            the group address to write to as a string (e.g. '1/1/64') or an integer (0-65535),
+            or a name in the catalog
+
+        dpt : string
+            the data point type of the group address, used to decode the result
+
+        raw : bool
+            return the data as received, without decoding it with dpt or
+            the catalog
+
+        Returns
+        -------
+        res :
+            the decoded value on the KNX bus, None when there was no response
+            within read_timeout
+
+        """
+
+        addr = util.resolve_ga(ga, self.catalog)
+
+        future, created = self.pending_reads.request(addr)
+        if created:
+            cemi = CEMIMessage()
+            cemi.init_group_read(addr)
+            self.send_routing_indication(cemi)
+        try:
+            res = future.result(timeout=self.read_timeout)
+        except concurrent.futures.TimeoutError:
+            self.pending_reads.discard(addr, future)
+            return None
+
+        if raw:
+            return res
+        if not dpt is None:
+            return util.decode_dpt(res, dpt)
+        if not self.catalog is None:
+            return self.catalog.decode(addr, res)
+        return res
+
+    def group_write(self, ga, data, dpt=None):
+        """
+        Writes a value to the KNX bus
+
+        Parameters
+        ----------
+        ga : string or int
+            the group address to write to as a string (e.g. '1/1/64') or an integer (0-65535),
+            or a name in the catalog
+
+        dpt : string
+            the data point type of the group address, used to encode the data
+
+        """
+
+        addr = util.resolve_ga(ga, self.catalog)
+
+        if not dpt is None:
+            data = util.encode_dpt(data, dpt)
+        elif not self.catalog is None:
+            data = self.catalog.encode(addr, data)
+
+        cemi = CEMIMessage()
+        cemi.init_group_write(addr, data)
+        self.send_routing_indication(cemi)
+
+    def _count(self, key, value=1):
+        with self._send_lock:
+            self.stats[key] += value
+
+    def handle_frame(self, data):
+        """
+        Handle a datagram received from the multicast group
+
+        """
+
+        try:
+            f = KNXIPFrame.from_frame(data)
+        except ValueError as e:
+            logger.debug("Invalid routing frame: {}".format(e))
+            return
+
+        if f.service_type_id == KNXIPFrame.ROUTING_INDICATION:
+            msg = CEMIMessage.from_body(f.body)
+            if msg.code != LDATA_IND or msg.src_addr == self.individual_address:
+                self._count('ignored')
+                return
+            self._count('received')
+
+            logger.debug("Received KNX message {}".format(msg))
+
+            # resolve pending reads
+            if msg.cmd == CEMIMessage.CMD_GROUP_RESPONSE:
+                self.pending_reads.resolve(msg.dst_addr, msg.data)
+
+            # execute callback
+            if not self.callback is None:
+                try:
+                    self.callback(msg)
+                except Exception as e:
+                    logger.error("Error encountered durring callback execution: {}".format(e))
+
+        elif f.service_type_id == KNXIPFrame.ROUTING_BUSY:
+            wait_time = ((f.body[2] << 8) | f.body[3]) / 1000
+            self._count('busy')
+            logger.debug("Routing busy, waiting {} s".format(wait_time))
+            self.limiter.busy(wait_time)
+
+        elif f.service_type_id == KNXIPFrame.ROUTING_LOST_MESSAGE:
+            lost = (f.body[2] << 8) | f.body[3]
+            self._count('lost', lost)
+            logger.warning("A router lost {} messages".format(lost))
+
+
+class RoutingRequestHandler(socketserver.BaseRequestHandler):
+    """
+    Class handling datagrams from the multicast group
+
+    """
+
+    def handle(self):
+        self.server.router.handle_frame(self.request[0])
+
+
+class RoutingServer(socketserver.UDPServer):
+    """
+    UDP server which is a member of a multicast group, several servers on
+    one host can share the port
+
+    """
+
+    allow_reuse_address = True
+
+    def __init__(self, server_address, handler, local_ip='0.0.0.0'):
+        self.local_ip = local_ip
+        super().__init__(server_address, handler)
+
+    def server_bind(self):
+        group, port = self.server_address
+        if hasattr(socket, 'SO_REUSEPORT'):
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # binding to the group only receives its datagrams, windows requires binding to any address
+        self.socket.bind(('' if os.name == 'nt' else group, port))
+        self.server_address = self.socket.getsockname()
+
+        self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP,
+                               socket.inet_aton(group) + socket.inet_aton(self.local_ip))
+        self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(self.local_ip))
+        self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 16)
+        self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
@@ -0,0 +1,188 @@
+import time
+import logging
+import threading
+import collections
+
+from . import util
+
+
+logger = logging.getLogger(__name__)
+
+
+class WriteScheduler(object):
+    """
+    Outbound scheduler which coalesces group writes
+
+    Writes are queued per group address. A write to an address which
+    already has a pending write replaces its value, so only the newest value
+    is sent. Consecutive writes to the same address are spaced at least
+    min_interval apart and at most max_rate telegrams per second are sent in
+    total.
+
+    Parameters
+    ----------
+    client : object
+        a client with a ``group_write(ga, data, dpt=None)`` method, e.g.
+        :class:`knxpy.ip.KNXIPTunnel` or :class:`knxpy.knxd.KNXD`
+
+    min_interval : float
+        the minimum time in seconds between two writes to the same group
+        address
+
+    max_rate : float
+        the maximum number of telegrams per second, None for no limit
+
+    burst : int
+        the number of telegrams which can be sent at once before max_rate
+        applies
+
+    Examples
+    --------
+    >>> tunnel = knxpy.ip.KNXIPTunnel('192.168.1.3', 3671)
+    >>> tunnel.connect()
+    >>> scheduler = WriteScheduler(tunnel, min_interval=0.2, max_rate=20)
+    >>> for value in range(100):
+    ...     scheduler.group_write('1/1/64', value, dpt='5')
+    >>> scheduler.flush()
+
+    """
+
+    def __init__(self, client, min_interval=0.0, max_rate=None, burst=1):
+        self.client = client
+        self.min_interval = min_interval
+        self.max_rate = max_rate
+        self.burst = burst
+
+        self.stats = {'submitted': 0, 'sent': 0, 'coalesced': 0, 'errors': 0}
+
+        self._pending = collections.OrderedDict()
+        self._last_sent = {}
+        self._sending = False
+        self._tokens = burst
+        self._token_time = time.monotonic()
+        self._condition = threading.Condition()
+        self._alive = True
+
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def group_write(self, ga, data, dpt=None):
+        """
+        Queue a write to the KNX bus, replacing a pending write to the same
+        group address
+
+        Parameters
+        ----------
+        ga : string or int
+            the group address to write to as a string (e.g. '1/1/64') or an integer (0-65535),
+            or a name in the catalog of the client
+
+        dpt : string
+            the data point type of the group address, used to encode the data
+
+        """
+
+        addr = util.resolve_ga(ga, getattr(self.client, 'catalog', None))
+
+        with self._condition:
+            if not self._alive:
+                raise RuntimeError('The scheduler is stopped')
+
+            self.stats['submitted'] += 1
+            if addr in self._pending:
+                self.stats['coalesced'] += 1
+            # replacing keeps the position of the first pending write
+            self._pending[addr] = (ga, data, dpt)
+            self._condition.notify_all()
+
+    def pending(self):
+        """
+        Returns the number of group addresses with a pending write
+
+        """
+
+        with self._condition:
+            return len(self._pending)
+
+    def flush(self, timeout=None):
+        """
+        Wait until all pending writes are sent
+
+        Returns
+        -------
+        flushed : bool
+            False when the timeout expired first
+
+        """
+
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and not self._sending, timeout)
+
+    def stop(self, flush=True, timeout=None):
+        """
+        Stop the scheduler thread, optionally after sending all pending
+        writes
+
+        """
+
+        if flush:
+            self.flush(timeout)
+        with self._condition:
+            self._alive = False
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+    def _next(self):
+        """
+        Returns the next write which may be sent or the time to wait
+
+        """
+
+        now = time.monotonic()
+        wait = None
+
+        if self.max_rate is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._token_time) * self.max_rate)
+            self._token_time = now
+            if self._tokens < 1:
+                return None, (1 - self._tokens) / self.max_rate
+
+        for addr in self._pending:
+            last_sent = self._last_sent.get(addr)
+            if last_sent is None or now - last_sent >= self.min_interval:
+                self._last_sent[addr] = now
+                if self.max_rate is not None:
+                    self._tokens -= 1
+                return self._pending.pop(addr), None
+
+            remaining = last_sent + self.min_interval - now
+            if wait is None or remaining < wait:
+                wait = remaining
+
+        return None, wait
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._sending = False
+                self._condition.notify_all()
+
+                write = None
+                while self._alive:
+                    write, wait = self._next()
+                    if write is not None:
+                        break
+                    self._condition.wait(wait)
+
+                if write is None:
+                    return
+                self._sending = True
+
+            ga, data, dpt = write
+            try:
+                self.client.group_write(ga, data, dpt=dpt)
+                self.stats['sent'] += 1
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error("Error encountered during group write to {}: {}".format(ga, e))
@@ -0,0 +1,512 @@
+#!/usr/bin/env python
+"""
+Local KNXnet/IP gateway simulator for load and latency testing
+
+The simulator accepts tunnelling connections, acknowledges tunnelling
+requests, answers group reads from a state table and can generate streams of
+group writes with configurable packet loss and jitter.
+
+Run a load test against it with::
+
+    python -m knxpy.simulator --reads 2000 --concurrency 20 --loss 0.01
+
+"""
+
+import time
+import heapq
+import random
+import socket
+import logging
+import argparse
+import threading
+
+from .core import KNXIPFrame, KNXTunnelingRequest, CEMIMessage, hpai, parse_hpai
+from . import util
+
+
+logger = logging.getLogger(__name__)
+
+
+VALUE_GENERATORS = {
+    '1': lambda rand: rand.randint(0, 1),
+    '5': lambda rand: rand.randint(0, 255),
+    '5.001': lambda rand: rand.uniform(0, 100),
+    '7': lambda rand: rand.randint(0, 65535),
+    '8': lambda rand: rand.randint(-32768, 32767),
+    '9': lambda rand: round(rand.uniform(-20, 40), 2),
+    '12': lambda rand: rand.randint(0, 4294967295),
+    '13': lambda rand: rand.randint(-2147483648, 2147483647),
+    '14': lambda rand: rand.uniform(-1000, 1000),
+}
+
+
+def cemi_data(msg):
+    """
+    Returns the data of a received cEMI message in the format of
+    CEMIMessage.data for sending
+
+    """
+
+    if isinstance(msg.data, int):
+        return msg.data
+    return [0] + list(msg.data)
+
+
+class Connection(object):
+    """
+    A tunnelling connection of the simulator
+
+    """
+
+    def __init__(self, channel, control_addr, data_addr):
+        self.channel = channel
+        self.control_addr = control_addr
+        self.data_addr = data_addr
+        self.seq_in = None
+        self.seq_out = 0
+
+    def next_seq(self):
+        seq = self.seq_out
+        self.seq_out = (self.seq_out + 1) & 0xff
+        return seq
+
+
+class GatewaySimulator(object):
+    """
+    A KNXnet/IP tunnelling gateway running in a background thread
+
+    Parameters
+    ----------
+    ip : string
+        the ip address to bind to
+
+    port : int
+        the port to bind to, 0 picks a free port
+
+    loss : float
+        the probability that a received or sent datagram is dropped
+
+    jitter : float
+        the maximum random delay in seconds of sent datagrams
+
+    confirm : bool
+        send an L_Data.con for each received L_Data.req, as gateways do
+
+    max_connections : int
+        the maximum number of simultaneous tunnelling connections
+
+    seed : int
+        seed for the random number generator
+
+    Examples
+    --------
+    >>> sim = GatewaySimulator()
+    >>> sim.start()
+    >>> sim.state[knxpy.util.encode_ga('1/1/71')] = [0, 12, 108]
+    >>> tunnel = knxpy.ip.KNXIPTunnel(*sim.address)
+    >>> tunnel.connect()
+    >>> tunnel.group_read('1/1/71', dpt='9')
+    22.64
+    >>> sim.stop()
+
+    """
+
+    def __init__(self, ip='127.0.0.1', port=0, loss=0.0, jitter=0.0, confirm=True, max_connections=4,
+                 seed=None):
+        self.loss = loss
+        self.jitter = jitter
+        self.confirm = confirm
+        self.max_connections = max_connections
+        self.individual_address = 0x1101
+
+        self.state = {}
+        self.connections = {}
+        self.stats = {'received': 0, 'sent': 0, 'dropped': 0, 'acked': 0, 'reads': 0, 'writes': 0}
+
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._queue = []
+        self._queue_condition = threading.Condition(self._lock)
+        self._counter = 0
+        self._threads = []
+        self._stream = None
+        self.alive = False
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((ip, port))
+        self.socket.settimeout(0.1)
+        self.address = self.socket.getsockname()
+
+    def start(self):
+        """
+        Start the receiving and sending threads
+
+        """
+
+        self.alive = True
+        for target in (self._receive, self._send):
+            thread = threading.Thread(target=target)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """
+        Stop all threads and close the socket
+
+        """
+
+        self.stop_stream()
+        with self._lock:
+            self.alive = False
+            self._queue_condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.socket.close()
+
+    def drop_connections(self):
+        """
+        Forget all tunnelling connections without notifying the clients,
+        like a gateway which restarted
+
+        """
+
+        with self._lock:
+            self.connections.clear()
+
+    def sendto(self, frame, addr, delay=0.0):
+        """
+        Send a datagram, subject to the configured loss and jitter
+
+        """
+
+        with self._lock:
+            if self.loss and self._random.random() < self.loss:
+                self.stats['dropped'] += 1
+                return
+            if self.jitter:
+                delay += self._random.uniform(0, self.jitter)
+
+            self._counter += 1
+            heapq.heappush(self._queue, (time.monotonic() + delay, self._counter, bytes(frame), addr))
+            self._queue_condition.notify()
+
+    def indicate(self, cemi):
+        """
+        Send a cEMI message as L_Data.ind to all connected clients
+
+        """
+
+        cemi.code = 0x29
+        body = cemi.to_body()
+        with self._lock:
+            connections = list(self.connections.values())
+        for connection in connections:
+            self._tunnelling_request(connection, body)
+
+    def group_write(self, ga, data, dpt=None):
+        """
+        Simulate a group write on the bus by a device, the value is stored in
+        the state table and sent to all connected clients
+
+        """
+
+        if type(ga) is str:
+            addr = util.encode_ga(ga)
+        else:
+            addr = ga
+        if dpt is not None:
+            data = util.encode_dpt(data, dpt)
+        if not isinstance(data, int):
+            data = list(data)
+
+        self.state[addr] = data
+        cemi = CEMIMessage()
+        cemi.init_group_write(addr, data)
+        cemi.src_addr = self.individual_address
+        self.indicate(cemi)
+
+    def start_stream(self, rate, gas, weights=None, dpts='9', duration=None):
+        """
+        Generate a stream of group writes in a background thread
+
+        Parameters
+        ----------
+        rate : float
+            the number of telegrams per second
+
+        gas : list
+            the group addresses to write to
+
+        weights : list
+            the relative frequency of each group address, uniform when None
+
+        dpts : string, list or dict
+            the data point types of the addresses, see :func:`knxpy.util.expand_dpts`
+
+        duration : float
+            stop after this many seconds, run until stop_stream when None
+
+        """
+
+        self.stop_stream()
+        gas = list(gas)
+        dpts = util.expand_dpts(gas, dpts)
+        stop = threading.Event()
+
+        def stream():
+            interval = 1.0 / rate
+            starttime = time.monotonic()
+            count = 0
+            while not stop.is_set():
+                now = time.monotonic()
+                if duration is not None and now - starttime >= duration:
+                    break
+
+                index = self._random.choices(range(len(gas)), weights=weights)[0]
+                value = VALUE_GENERATORS.get(dpts[index] or '9', VALUE_GENERATORS['9'])(self._random)
+                self.group_write(gas[index], value, dpt=dpts[index] or '9')
+
+                count += 1
+                stop.wait(max(0, starttime + count * interval - time.monotonic()))
+
+        thread = threading.Thread(target=stream)
+        thread.daemon = True
+        thread.start()
+        self._stream = (thread, stop)
+
+    def stop_stream(self):
+        if self._stream is not None:
+            thread, stop = self._stream
+            stop.set()
+            thread.join()
+            self._stream = None
+
+    def _tunnelling_request(self, connection, cemi_body):
+        f = KNXIPFrame(KNXIPFrame.TUNNELING_REQUEST)
+        f.body = bytearray([0x04, connection.channel, connection.next_seq(), 0x00])
+        f.body.extend(cemi_body)
+        self.sendto(f.to_frame(), connection.data_addr)
+
+    def _send(self):
+        while True:
+            with self._lock:
+                while self.alive:
+                    now = time.monotonic()
+                    if self._queue and self._queue[0][0] <= now:
+                        _t, _c, frame, addr = heapq.heappop(self._queue)
+                        break
+                    self._queue_condition.wait(self._queue[0][0] - now if self._queue else None)
+                else:
+                    return
+            try:
+                self.socket.sendto(frame, addr)
+                self.stats['sent'] += 1
+            except OSError as e:
+                logger.debug('could not send to {}: {}'.format(addr, e))
+
+    def _receive(self):
+        while self.alive:
+            try:
+                data, addr = self.socket.recvfrom(1024)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            self.stats['received'] += 1
+            if self.loss and self._random.random() < self.loss:
+                self.stats['dropped'] += 1
+                continue
+
+            try:
+                self.handle(data, addr)
+            except Exception:
+                logger.exception('could not handle datagram from {}'.format(addr))
+
+    def handle(self, data, addr):
+        """
+        Handle a received datagram
+
+        """
+
+        f = KNXIPFrame.from_frame(data)
+        body = f.body
+
+        if f.service_type_id == KNXIPFrame.CONNECT_REQUEST:
+            control_addr = parse_hpai(body[0:8], addr)
+            data_addr = parse_hpai(body[8:16], addr)
+            with self._lock:
+                channels = [c for c in range(1, 256) if c not in self.connections]
+                if len(self.connections) >= self.max_connections or not channels:
+                    response = bytearray([0, KNXIPFrame.E_NO_MORE_CONNECTIONS])
+                else:
+                    connection = Connection(channels[0], control_addr, data_addr)
+                    self.connections[connection.channel] = connection
+                    response = bytearray([connection.channel, KNXIPFrame.E_NO_ERROR])
+                    response.extend(hpai(*self.address))
+                    response.extend([0x04, 0x04, (self.individual_address >> 8) & 0xff,
+                                     self.individual_address & 0xff])
+            self.sendto(KNXIPFrame(KNXIPFrame.CONNECT_RESPONSE, response).to_frame(), control_addr)
+
+        elif f.service_type_id == KNXIPFrame.CONNECTIONSTATE_REQUEST:
+            channel = body[0]
+            status = KNXIPFrame.E_NO_ERROR if channel in self.connections else KNXIPFrame.E_CONNECTION_ID
+            response = bytearray([channel, status])
+            self.sendto(KNXIPFrame(KNXIPFrame.CONNECTIONSTATE_RESPONSE, response).to_frame(),
+                        parse_hpai(body[2:10], addr))
+
+        elif f.service_type_id == KNXIPFrame.DISCONNECT_REQUEST:
+            channel = body[0]
+            with self._lock:
+                connection = self.connections.pop(channel, None)
+            status = KNXIPFrame.E_NO_ERROR if connection is not None else KNXIPFrame.E_CONNECTION_ID
+            response = bytearray([channel, status])
+            self.sendto(KNXIPFrame(KNXIPFrame.DISCONNECT_RESPONSE, response).to_frame(),
+                        parse_hpai(body[2:10], addr))
+
+        elif f.service_type_id == KNXIPFrame.TUNNELLING_ACK:
+            self.stats['acked'] += 1
+
+        elif f.service_type_id == KNXIPFrame.TUNNELING_REQUEST:
+            req = KNXTunnelingRequest.from_body(body)
+            connection = self.connections.get(req.channel)
+            status = KNXIPFrame.E_NO_ERROR if connection is not None else KNXIPFrame.E_CONNECTION_ID
+
+            ack = KNXIPFrame(KNXIPFrame.TUNNELLING_ACK, bytearray([0x04, req.channel, req.seq, status]))
+            self.sendto(ack.to_frame(), addr)
+
+            # a repeated sequence number is a retransmission which was already handled
+            if connection is None or req.seq == connection.seq_in:
+                return
+            connection.seq_in = req.seq
+
+            if self.confirm:
+                con = bytearray(req.cEmi)
+                con[0] = 0x2e
+                self._tunnelling_request(connection, con)
+
+            msg = CEMIMessage.from_body(req.cEmi)
+            if msg.cmd == CEMIMessage.CMD_GROUP_WRITE:
+                self.stats['writes'] += 1
+                self.state[msg.dst_addr] = cemi_data(msg)
+                ind = CEMIMessage.from_body(req.cEmi)
+                ind.src_addr = self.individual_address
+                ind.tpci_apci = 0x80
+                ind.data = cemi_data(msg)
+                self._indicate_others(ind, connection)
+
+            elif msg.cmd == CEMIMessage.CMD_GROUP_READ:
+                self.stats['reads'] += 1
+                if msg.dst_addr in self.state:
+                    response = CEMIMessage()
+                    response.init_group_write(msg.dst_addr, self.state[msg.dst_addr])
+                    response.src_addr = self.individual_address
+                    response.tpci_apci = 0x40
+                    self.indicate(response)
+
+    def _indicate_others(self, cemi, connection):
+        cemi.code = 0x29
+        body = cemi.to_body()
+        with self._lock:
+            connections = [c for c in self.connections.values() if c is not connection]
+        for other in connections:
+            self._tunnelling_request(other, body)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return None
+    index = min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))
+    return values[index]
+
+
+def load_test(reads=1000, writes=0, gas=100, concurrency=10, loss=0.0, jitter=0.0, seed=None):
+    """
+    Run a load test of :class:`knxpy.ip.KNXIPTunnel` against a simulator
+
+    Returns
+    -------
+    report : dict
+        the throughput in telegrams per second, the p50 and p99 round trip
+        latency of the reads in seconds and the number of unanswered reads
+
+    """
+
+    from . import ip
+
+    sim = GatewaySimulator(loss=loss, jitter=jitter, seed=seed)
+    sim.start()
+    rand = random.Random(seed)
+    addresses = list(range(1, gas + 1))
+    for addr in addresses:
+        sim.state[addr] = list(util.encode_dpt(round(rand.uniform(-20, 40), 2), '9'))
+
+    tunnel = ip.KNXIPTunnel(*sim.address)
+    tunnel.connect()
+    try:
+        latencies = []
+        unanswered = 0
+        starttime = time.monotonic()
+
+        remaining = reads
+        while remaining > 0:
+            batch = [addresses[(reads - remaining + i) % len(addresses)] for i in range(min(remaining, len(addresses)))]
+            results, timings = tunnel.group_read_many(batch, dpts='9', concurrency=concurrency)
+            for addr in batch:
+                if results[addr] is None:
+                    unanswered += 1
+                else:
+                    latencies.append(timings[addr])
+            remaining -= len(batch)
+
+        for i in range(writes):
+            tunnel.group_write(addresses[i % len(addresses)], [0, 12, 108])
+
+        elapsed = time.monotonic() - starttime
+    finally:
+        tunnel.disconnect()
+        sim.stop()
+
+    return {
+        'reads': reads,
+        'writes': writes,
+        'elapsed': elapsed,
+        'throughput': (reads + writes) / elapsed,
+        'p50': percentile(latencies, 50),
+        'p99': percentile(latencies, 99),
+        'unanswered': unanswered,
+        'retransmits': tunnel.stats['retransmits'],
+        'dropped': tunnel.stats['dropped'],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the KNXnet/IP tunnel against a local gateway simulator')
+    parser.add_argument('--reads', type=int, default=1000, help='number of group reads')
+    parser.add_argument('--writes', type=int, default=0, help='number of group writes')
+    parser.add_argument('--gas', type=int, default=100, help='number of group addresses')
+    parser.add_argument('--concurrency', type=int, default=10, help='number of reads in flight')
+    parser.add_argument('--loss', type=float, default=0.0, help='packet loss probability')
+    parser.add_argument('--jitter', type=float, default=0.0, help='maximum random delay in seconds')
+    parser.add_argument('--seed', type=int, default=None, help='random seed')
+    args = parser.parse_args(argv)
+
+    report = load_test(reads=args.reads, writes=args.writes, gas=args.gas, concurrency=args.concurrency,
+                       loss=args.loss, jitter=args.jitter, seed=args.seed)
+
+    print('telegrams:   {}'.format(report['reads'] + report['writes']))
+    print('elapsed:     {:.3f} s'.format(report['elapsed']))
+    print('throughput:  {:.1f} telegrams/s'.format(report['throughput']))
+    if report['p50'] is not None:
+        print('latency p50: {:.2f} ms'.format(report['p50'] * 1000))
+        print('latency p99: {:.2f} ms'.format(report['p99'] * 1000))
+    print('unanswered:  {}'.format(report['unanswered']))
+    print('retransmits: {}'.format(report['retransmits']))
+    print('dropped:     {}'.format(report['dropped']))
+
+
+if __name__ == '__main__':
+    main()
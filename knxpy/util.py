@@ -1,12 +1,13 @@
+import sys
 import struct
 import logging
+import functools
 
 from enum import Enum
 
 from knxpy import dpts
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
 
 class MESSAGETYPE(Enum):
@@ -44,114 +45,141 @@ def int_to_array(i, length=2):
     return reversed(res)
 
 
+# decoded address strings by integer address, filled on first use
+_ga_strings = [None] * 0x10000
+_pa_strings = [None] * 0x10000
+
+
+@functools.lru_cache(maxsize=0x10000)
 def encode_ga(str):
     parts = str.split('/')
     return (int(parts[0]) << 11) + (int(parts[1]) << 8) + int(parts[2])
 
 
 def decode_ga(i):
-    parts = [(i >> 11) & 0x1f, (i >> 8) & 0x07, i & 0xff]
-    return '{}/{}/{}'.format(*parts)
+    """
+    Returns the group address string of an integer group address
+
+    The strings are interned and kept in a table, so decoding the same
+    address again does not allocate.
+
+    """
+
+    i &= 0xffff
+    ga = _ga_strings[i]
+    if ga is None:
+        ga = _ga_strings[i] = sys.intern('{}/{}/{}'.format((i >> 11) & 0x1f, (i >> 8) & 0x07, i & 0xff))
+    return ga
+
+
+def resolve_ga(ga, catalog=None):
+    """
+    Returns the integer group address of a group address string, an integer
+    group address or, when a catalog is given, a name in the catalog
+
+    """
+
+    if catalog is not None:
+        return catalog.address(ga)
+    if type(ga) is str:
+        return encode_ga(ga)
+    return ga
+
+
+@functools.lru_cache(maxsize=0x10000)
+def encode_pa(str):
+    """
+    Returns the integer individual address of an individual address string
+    (e.g. '1.1.1')
+
+    """
+
+    parts = str.split('.')
+    return (int(parts[0]) << 12) + (int(parts[1]) << 8) + int(parts[2])
 
 
 def decode_pa(string):
-    if len(string) != 2:
+    """
+    Returns the individual address string of two bytes or an integer
+    individual address, the strings are kept in a table like the group
+    address strings
+
+    """
+
+    if isinstance(string, int):
+        pa = string & 0xffff
+    elif len(string) != 2:
         return None
-    pa = struct.unpack(">H", string)[0]
-    return "{0}.{1}.{2}".format((pa >> 12) & 0x0f, (pa >> 8) & 0x0f, (pa) & 0xff)
+    else:
+        pa = (string[0] << 8) | string[1]
+    res = _pa_strings[pa]
+    if res is None:
+        res = _pa_strings[pa] = sys.intern('{0}.{1}.{2}'.format((pa >> 12) & 0x0f, (pa >> 8) & 0x0f, pa & 0xff))
+    return res
 
 
 def encode_dpt(data, dpt):
-    if dpt in ['1', '1.001']:
-        return dpts.dpt1.encode(data)
-    elif dpt in ['2']:
-        return dpts.dpt2.encode(data)
-    elif dpt in ['3']:
-        return dpts.dpt3.encode(data)
-    elif dpt in ['4002', '4.002']:
-        return dpts.dpt4002.encode(data)
-    elif dpt in ['5']:
-        return dpts.dpt5.encode(data)
-    elif dpt in ['5001', '5.001']:
-        return dpts.dpt5001.encode(data)
-    elif dpt in ['6']:
-        return dpts.dpt6.encode(data)
-    elif dpt in ['7']:
-        return dpts.dpt7.encode(data)
-    elif dpt in ['8']:
-        return dpts.dpt8.encode(data)
-    elif dpt in ['9']:
-        return dpts.dpt9.encode(data)
-    elif dpt in ['10']:
-        return dpts.dpt10.encode(data)
-    elif dpt in ['11']:
-        return dpts.dpt11.encode(data)
-    elif dpt in ['12']:
-        return dpts.dpt12.encode(data)
-    elif dpt in ['13']:
-        return dpts.dpt13.encode(data)
-    elif dpt in ['14']:
-        return dpts.dpt14.encode(data)
-    elif dpt in ['16', '16000', '16.000']:
-        return dpts.dpt16000.encode(data)
-    elif dpt in ['16.001']:
-        return dpts.dpt16001.encode(data)
-    elif dpt in ['17']:
-        return dpts.dpt17.encode(data)
-    elif dpt in ['20']:
-        return dpts.dpt20.encode(data)
-    elif dpt in ['24']:
-        return dpts.dpt24.encode(data)
-    elif dpt in ['232']:
-        return dpts.dpt232.encode(data)
+    codec = dpts.registry.get(dpt)
+    if codec is not None:
+        return codec.encode(data)
 
 
 def decode_dpt(data, dpt):
-    if dpt in ['1', '1.001']:
-        return dpts.dpt1.decode(data)
-    elif dpt in ['2']:
-        return dpts.dpt2.decode(data)
-    elif dpt in ['3']:
-        return dpts.dpt3.decode(data)
-    elif dpt in ['4002', '4.002']:
-        return dpts.dpt4002.decode(data)
-    elif dpt in ['5']:
-        return dpts.dpt5.decode(data)
-    elif dpt in ['5001', '5.001']:
-        return dpts.dpt5001.decode(data)
-    elif dpt in ['6']:
-        return dpts.dpt6.decode(data)
-    elif dpt in ['7']:
-        return dpts.dpt7.decode(data)
-    elif dpt in ['8']:
-        return dpts.dpt8.decode(data)
-    elif dpt in ['9']:
-        return dpts.dpt9.decode(data)
-    elif dpt in ['10']:
-        return dpts.dpt10.decode(data)
-    elif dpt in ['11']:
-        return dpts.dpt11.decode(data)
-    elif dpt in ['12']:
-        return dpts.dpt12.decode(data)
-    elif dpt in ['13']:
-        return dpts.dpt13.decode(data)
-    elif dpt in ['14']:
-        return dpts.dpt14.decode(data)
-    elif dpt in ['16', '16000', '16.000']:
-        return dpts.dpt16000.decode(data)
-    elif dpt in ['16.001']:
-        return dpts.dpt16001.decode(data)
-    elif dpt in ['17']:
-        return dpts.dpt17.decode(data)
-    elif dpt in ['20']:
-        return dpts.dpt20.decode(data)
-    elif dpt in ['24']:
-        return dpts.dpt24.decode(data)
-    elif dpt in ['232']:
-        return dpts.dpt232.decode(data)
+    codec = dpts.registry.get(dpt)
+    if codec is not None:
+        return codec.decode(data)
+
+
+def expand_dpts(gas, dpts=None):
+    """
+    Returns a list with the data point type of each group address
+
+    Parameters
+    ----------
+    gas : list
+        group addresses
+
+    dpts : string, list or dict
+        a single data point type for all addresses, a list with a data point
+        type per address or a dict mapping addresses to data point types
+
+    """
+
+    if dpts is None or isinstance(dpts, str):
+        return [dpts] * len(gas)
+    elif isinstance(dpts, dict):
+        return [dpts.get(ga) for ga in gas]
+    else:
+        dpts = list(dpts)
+        if len(dpts) != len(gas):
+            raise ValueError('Expected {} data point types but got {}'.format(len(gas), len(dpts)))
+        return dpts
 
 
 class Message():
+    """
+    A telegram received from knxd
+
+    The dst_addr, data and cmd properties match the attributes of
+    :class:`knxpy.core.CEMIMessage`, so consumers can handle the messages of
+    all clients alike.
+
+    """
+
+    # the same values as the CEMIMessage CMD constants
+    CMD_GROUP_READ = 1
+    CMD_GROUP_WRITE = 2
+    CMD_GROUP_RESPONSE = 3
+    CMD_UNKNOWN = 0xff
+
+    _commands = {
+        0x00: CMD_GROUP_READ, 'read': CMD_GROUP_READ,
+        0x80: CMD_GROUP_WRITE, 'write': CMD_GROUP_WRITE,
+        0x40: CMD_GROUP_RESPONSE, 'response': CMD_GROUP_RESPONSE,
+    }
+
+    __slots__ = ('src', '_dst', 'flg', 'val')
+
     def __init__(self, src, dst, flg, val):
         self.src = src
         self._dst = dst
@@ -162,6 +190,18 @@ class Message():
     def dst(self):
         return decode_ga(self._dst)
 
+    @property
+    def dst_addr(self):
+        return self._dst
+
+    @property
+    def data(self):
+        return self.val
+
+    @property
+    def cmd(self):
+        return self._commands.get(self.flg, self.CMD_UNKNOWN)
+
     def __repr__(self):
         return '<message src: {src}, dst: {dst}, flg: {flg}, val: {val}>'.format(
             src=self.src, dst=self.dst, flg=self.flg, val=self.val)
@@ -185,13 +225,14 @@ def encode_data(fmt, data):
 
 def decode_telegram(data):
     try:
-        logger.debug('retrieved message {}'.format(' '.join(['{:02x}'.format(d) for d in data])))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('retrieved message %s', bytes(data).hex(' '))
 
         typ = struct.unpack(">H", data[0:2])[0]
 
         src = (data[4] << 8) | (data[5])
         dst = ((data[6]) << 8) | (data[7])
-        flg = data[8] & 0xC0
+        flg = data[9] & 0xC0
         if len(data) == 10:
             val = data[9] & 0x3f
         else:
@@ -15,7 +15,25 @@
 ################################################################################
 import unittest
 
+from test_benchmark import *
+from test_cache import *
+from test_catalog import *
+from test_core import *
+from test_datastore import *
+from test_dpts import *
+from test_ip import *
+from test_knxd import *
+from test_knxd_async import *
+from test_knxd_sh import *
+from test_knxd_simulator import *
 from test_knxpy import *
+from test_pipeline import *
+from test_recorder import *
+from test_router import *
+from test_routing import *
+from test_scheduler import *
+from test_simulator import *
+from test_util import *
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
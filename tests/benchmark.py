@@ -0,0 +1,346 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright (c) 2016 Daniel Matuschek
+#    This file is part of knxpy.
+#
+#    Permission is hereby granted, free of charge, to any person obtaining a
+#    copy of this software and associated documentation files (the "Software"),
+#    to deal in the Software without restriction, including without limitation
+#    the rights to use, copy, modify, merge, publish, distribute, sublicense,
+#    and/or sell copies of the Software, and to permit persons to whom the
+#    Software is furnished to do so, subject to the following conditions:
+#
+#    The above copyright notice and this permission notice shall be included in
+#    all copies or substantial portions of the Software.
+################################################################################
+"""
+Benchmarks of the telegram pipeline hot paths
+
+Run all benchmarks and store the results::
+
+    python tests/benchmark.py --json results.json
+
+Compare against a stored baseline, the exit code is 1 when a benchmark is
+more than the threshold slower::
+
+    python tests/benchmark.py --baseline results.json --threshold 0.2
+
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import socket
+import argparse
+import platform
+import datetime
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import knxpy
+from knxpy import dpts, util, knxd, knxd_sh
+from knxpy.core import KNXIPFrame, KNXTunnelingRequest, CEMIMessage
+
+
+DPT_SAMPLES = {
+    '1': 1,
+    '2': [1, 0],
+    '3': [1, 5],
+    '4.002': 'a',
+    '5': 140,
+    '5.001': 55.0,
+    '6': -12,
+    '7': 1234,
+    '8': -1234,
+    '9': 22.64,
+    '10': datetime.datetime(2017, 3, 4, 12, 30, 15),
+    '11': datetime.date(2017, 3, 4),
+    '12': 123456,
+    '13': -123456,
+    '14': 3.0,
+    '16': 'hello',
+    '16.001': 'hello',
+    '17': 12,
+    '20': 3,
+    '24': 'hello world',
+    '232': [10, 20, 30],
+}
+
+
+class Benchmark(object):
+    """
+    A benchmark of a function called without arguments
+
+    Parameters
+    ----------
+    name : string
+        the benchmark name
+
+    func : callable
+        the function to time
+
+    number : int
+        the number of calls per repetition
+
+    ops : int
+        the number of operations done by a single call
+
+    teardown : callable
+        called once after timing
+
+    """
+
+    def __init__(self, name, func, number=10000, ops=1, teardown=None):
+        self.name = name
+        self.func = func
+        self.number = number
+        self.ops = ops
+        self.teardown = teardown
+
+    def run(self, repeat=5, scale=1.0):
+        func = self.func
+        number = max(1, int(self.number * scale))
+        best = None
+        try:
+            for r in range(repeat):
+                starttime = time.perf_counter()
+                for i in range(number):
+                    func()
+                elapsed = time.perf_counter() - starttime
+                if best is None or elapsed < best:
+                    best = elapsed
+        finally:
+            if self.teardown is not None:
+                self.teardown()
+
+        time_per_op = best / (number * self.ops)
+        return {'time_per_op': time_per_op, 'ops_per_sec': 1 / time_per_op if time_per_op > 0 else None,
+                'number': number, 'ops': self.ops}
+
+
+def telegram(dst=2375, payload=b'\x0c\x6c'):
+    """
+    Returns a knxd group packet as received by util.decode_telegram
+
+    """
+    body = bytearray([0x00, 0x27, 0x11, 0x01, (dst >> 8) & 0xff, dst & 0xff, 0x00, 0x80])
+    body.extend(payload)
+    return bytes(bytearray(len(body).to_bytes(2, byteorder='big')) + body)
+
+
+def tunnelling_request_frame():
+    cemi = CEMIMessage()
+    cemi.init_group_write(2375, [0, 12, 108])
+    f = KNXIPFrame(KNXIPFrame.TUNNELING_REQUEST)
+    f.body = bytearray([0x04, 1, 0, 0x00])
+    f.body.extend(cemi.to_body())
+    return bytes(f.to_frame())
+
+
+def codec_benchmarks():
+    benchmarks = []
+
+    packet = telegram()
+    benchmarks.append(Benchmark('util.decode_telegram', lambda: util.decode_telegram(packet)))
+
+    cemi = bytes(KNXTunnelingRequest.from_body(KNXIPFrame.from_frame(tunnelling_request_frame()).body).cEmi)
+    benchmarks.append(Benchmark('core.CEMIMessage.from_body', lambda: CEMIMessage.from_body(cemi)))
+
+    message = CEMIMessage()
+    message.init_group_write(2375, [0, 12, 108])
+    benchmarks.append(Benchmark('core.CEMIMessage.to_body', message.to_body))
+
+    frame = tunnelling_request_frame()
+
+    def frame_round_trip():
+        f = KNXIPFrame.from_frame(frame)
+        msg = CEMIMessage.from_body(KNXTunnelingRequest.from_body(f.body).cEmi)
+        f = KNXIPFrame(KNXIPFrame.TUNNELING_REQUEST)
+        f.body = bytearray([0x04, 1, 0, 0x00])
+        f.body.extend(msg.to_body())
+        return f.to_frame()
+
+    benchmarks.append(Benchmark('core.KNXIPFrame.round_trip', frame_round_trip))
+
+    for dpt in dpts.registry:
+        codec = dpts.registry[dpt]
+        value = DPT_SAMPLES[dpt]
+        encoded = codec.encode(value)
+        if len(encoded) == 1:
+            data = bytes(encoded)
+        else:
+            data = bytes(encoded[1:])
+        if dpt == '1':
+            data = encoded[0]
+
+        benchmarks.append(Benchmark('dpt{}.encode'.format(dpt), lambda codec=codec, value=value: codec.encode(value)))
+        benchmarks.append(Benchmark('dpt{}.decode'.format(dpt), lambda codec=codec, data=data: codec.decode(data)))
+
+    return benchmarks
+
+
+def stream_benchmarks():
+    """
+    Feed a chunk of knxd telegrams through knxd_sh framing
+
+    """
+
+    count = 100
+    chunk = b''.join(telegram(dst=i) for i in range(count))
+    received = []
+
+    client = knxd_sh.KNXD()
+    sock, peer = socket.socketpair()
+    client.socket = sock
+    client._connected()
+    peer.setblocking(False)
+
+    def drain():
+        try:
+            while peer.recv(65536):
+                pass
+        except BlockingIOError:
+            pass
+
+    def feed():
+        peer.sendall(chunk)
+        client._in(callback=received.append)
+        del received[:]
+
+    def teardown():
+        client.close()
+        peer.close()
+        client.connections._epoll.close()
+
+    reader = knxd.FrameReader()
+
+    def frames():
+        reader.feed(chunk)
+        for frame in reader.frames():
+            util.decode_telegram(frame)
+
+    drain()
+    return [Benchmark('knxd_sh.Stream._in', feed, number=200, ops=count, teardown=teardown),
+            Benchmark('knxd.FrameReader.frames', frames, number=200, ops=count)]
+
+
+def datastore_benchmarks():
+    from collector.datastore import SQLiteDatastore
+
+    directory = tempfile.TemporaryDirectory()
+    datastore = SQLiteDatastore(os.path.join(directory.name, 'benchmark.db'))
+    count = 1000
+
+    def record():
+        for i in range(count):
+            datastore.record_data('knx:1/1/71', i)
+        datastore.flush()
+
+    def teardown():
+        datastore.close()
+        directory.cleanup()
+
+    return [Benchmark('collector.SQLiteDatastore.record_data', record, number=5, ops=count, teardown=teardown)]
+
+
+def benchmarks():
+    return codec_benchmarks() + stream_benchmarks() + datastore_benchmarks()
+
+
+def run(pattern=None, repeat=5, scale=1.0, verbose=False):
+    """
+    Run the benchmarks
+
+    Parameters
+    ----------
+    pattern : string
+        regular expression, only benchmarks with a matching name are run
+
+    repeat : int
+        the number of repetitions, the fastest is reported
+
+    scale : float
+        factor applied to the number of calls of each benchmark
+
+    Returns
+    -------
+    results : dict
+        the results with metadata, as written to the json file
+
+    """
+
+    results = {}
+    for benchmark in benchmarks():
+        if pattern is not None and not re.search(pattern, benchmark.name):
+            if benchmark.teardown is not None:
+                benchmark.teardown()
+            continue
+        results[benchmark.name] = benchmark.run(repeat=repeat, scale=scale)
+        if verbose:
+            print('{:<45} {:>12.3f} us/op'.format(benchmark.name, results[benchmark.name]['time_per_op'] * 1e6))
+
+    return {
+        'knxpy': knxpy.__version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': datetime.datetime.utcnow().isoformat(),
+        'results': results,
+    }
+
+
+def compare(results, baseline, threshold=0.2):
+    """
+    Compare results with a baseline
+
+    Returns
+    -------
+    comparison : list
+        tuples of the benchmark name, the ratio of the time per operation
+        to the baseline and whether the ratio exceeds 1 + threshold
+
+    """
+
+    comparison = []
+    for name, result in sorted(results['results'].items()):
+        if name not in baseline['results']:
+            continue
+        ratio = result['time_per_op'] / baseline['results'][name]['time_per_op']
+        comparison.append((name, ratio, ratio > 1 + threshold))
+    return comparison
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the knxpy hot paths')
+    parser.add_argument('-k', '--filter', help='only run benchmarks matching this regular expression')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='number of repetitions')
+    parser.add_argument('-s', '--scale', type=float, default=1.0, help='scale the number of calls per benchmark')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--baseline', help='compare the results with this file')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative slowdown')
+    args = parser.parse_args(argv)
+
+    results = run(pattern=args.filter, repeat=args.repeat, scale=args.scale, verbose=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+
+        print('')
+        regressions = 0
+        for name, ratio, regression in compare(results, baseline, threshold=args.threshold):
+            print('{:<45} {:>8.2f}x {}'.format(name, ratio, 'REGRESSION' if regression else ''))
+            regressions += regression
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,40 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright (c) 2016 Daniel Matuschek
+#    This file is part of knxpy.
+#    
+#    Permission is hereby granted, free of charge, to any person obtaining a
+#    copy of this software and associated documentation files (the "Software"), 
+#    to deal in the Software without restriction, including without limitation 
+#    the rights to use, copy, modify, merge, publish, distribute, sublicense, 
+#    and/or sell copies of the Software, and to permit persons to whom the 
+#    Software is furnished to do so, subject to the following conditions:
+#    
+#    The above copyright notice and this permission notice shall be included in 
+#    all copies or substantial portions of the Software.
+################################################################################
+import unittest
+
+import benchmark
+from knxpy import dpts
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_run(self):
+        results = benchmark.run(repeat=1, scale=0.001)
+        names = set(results['results'])
+        self.assertIn( 'util.decode_telegram', names )
+        self.assertIn( 'knxd_sh.Stream._in', names )
+        self.assertIn( 'collector.SQLiteDatastore.record_data', names )
+        for dpt in dpts.registry:
+            self.assertIn( 'dpt{}.decode'.format(dpt), names )
+
+    def test_compare(self):
+        baseline = {'results': {'a': {'time_per_op': 1.0}, 'b': {'time_per_op': 1.0}}}
+        results = {'results': {'a': {'time_per_op': 1.5}, 'b': {'time_per_op': 1.1}, 'c': {'time_per_op': 1.0}}}
+        self.assertEqual( benchmark.compare(results, baseline, threshold=0.2), [('a', 1.5, True), ('b', 1.1, False)] )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright (c) 2016 Daniel Matuschek
+#    This file is part of knxpy.
+#    
+#    Permission is hereby granted, free of charge, to any person obtaining a
+#    copy of this software and associated documentation files (the "Software"), 
+#    to deal in the Software without restriction, including without limitation 
+#    the rights to use, copy, modify, merge, publish, distribute, sublicense, 
+#    and/or sell copies of the Software, and to permit persons to whom the 
+#    Software is furnished to do so, subject to the following conditions:
+#    
+#    The above copyright notice and this permission notice shall be included in 
+#    all copies or substantial portions of the Software.
+################################################################################
+import unittest
+import asyncio
+import threading
+import time
+
+from knxpy import cache, catalog, ip, ip_async, knxd, knxd_async, knxd_simulator, simulator, util
+from knxpy.core import CEMIMessage
+
+
+class CountingClient(object):
+
+    def __init__(self, data):
+        self.data = data
+        self.reads = []
+        self.pending_reads = None
+
+    def group_read(self, ga, raw=False):
+        self.reads.append(ga)
+        return self.data
+
+
+class TestStateCache(unittest.TestCase):
+
+    def test_messages(self):
+        received = []
+        c = cache.StateCache(callback=received.append)
+        c(util.Message(0x1101, 2375, 0x80, b'\x0c\x6c'))
+        c(util.Message('1.1.1', 2376, 'response', 1))
+        c(util.Message(0x1101, 2377, 0x00, 0))
+
+        cemi = CEMIMessage()
+        cemi.init_group_write(2378, [0, 12, 108])
+        c(CEMIMessage.from_body(bytes(cemi.to_body())))
+
+        self.assertEqual( len(received), 4 )
+        self.assertEqual( c.peek('1/1/71', dpt='9')[0], 22.64 )
+        self.assertEqual( c.peek(2376)[0], 1 )
+        self.assertIsNone( c.peek(2377) )
+        self.assertEqual( c.peek(2378)[0], b'\x0c\x6c' )
+
+    def test_max_age(self):
+        client = CountingClient(b'\x0c\x6c')
+        c = cache.StateCache(client, dpts={'1/1/71': '9'})
+        c.update('1/1/71', b'\x0c\x6c', timestamp=time.time() - 10)
+        self.assertEqual( c.get('1/1/71'), 22.64 )
+        self.assertEqual( c.get('1/1/71', max_age=60), 22.64 )
+        self.assertEqual( client.reads, [] )
+        self.assertEqual( c.get('1/1/71', max_age=5), 22.64 )
+        self.assertEqual( client.reads, [2375] )
+        self.assertEqual( c.stats, {'hits': 2, 'misses': 1, 'updates': 2} )
+
+    def test_no_response(self):
+        c = cache.StateCache(CountingClient(None))
+        self.assertIsNone( c.get('1/1/71') )
+        self.assertNotIn( '1/1/71', c )
+
+
+class TestClients(unittest.TestCase):
+
+    def test_ip(self):
+        sim = simulator.GatewaySimulator()
+        sim.start()
+        sim.state[2375] = [0, 12, 108]
+        c = cache.StateCache(dpts={'1/1/71': '9'})
+        tunnel = ip.KNXIPTunnel(*sim.address, callback=c)
+        c.client = tunnel
+        tunnel.connect()
+        try:
+            self.assertEqual( c.get('1/1/71'), 22.64 )
+            sim.group_write('1/1/71', 21.0, dpt='9')
+            deadline = time.monotonic() + 1
+            while c.peek('1/1/71')[0] != 21.0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual( c.get('1/1/71'), 21.0 )
+            self.assertEqual( sim.stats['reads'], 1 )
+        finally:
+            tunnel.data_server.shutdown()
+            tunnel.data_server.server_close()
+            tunnel.control_socket.close()
+            sim.stop()
+
+    def test_ip_catalog(self):
+        sim = simulator.GatewaySimulator()
+        sim.start()
+        sim.state[2375] = [0, 12, 108]
+        cat = catalog.Catalog()
+        cat.add('1/1/71', 'Temperature', '9')
+        tunnel = ip.KNXIPTunnel(*sim.address, catalog=cat)
+        c = cache.StateCache(tunnel)
+        tunnel.connect()
+        try:
+            self.assertEqual( c.get('1/1/71', max_age=0, dpt='9'), 22.64 )
+            self.assertEqual( bytes(c.peek('1/1/71')[0]), b'\x0c\x6c' )
+        finally:
+            tunnel.disconnect()
+            sim.stop()
+
+    def test_knxd(self):
+        loop = asyncio.new_event_loop()
+        sim = knxd_simulator.KNXDSimulator()
+        loop.run_until_complete(sim.start())
+        sim.group_write('1/1/71', 22.64, dpt='9')
+        thread = threading.Thread(target=loop.run_forever)
+        thread.start()
+        try:
+            client = knxd.KNXD(*sim.address)
+            c = cache.StateCache(client, dpts={'1/1/71': '9'})
+            client.connect()
+            client.listen(c)
+            deadline = time.monotonic() + 1
+            while len(sim.clients) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual( c.get('1/1/71'), 22.64 )
+            client.close()
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.run_until_complete(sim.stop())
+            loop.close()
+
+    def test_knxd_async(self):
+        loop = asyncio.new_event_loop()
+        sim = knxd_simulator.KNXDSimulator()
+        loop.run_until_complete(sim.start())
+        sim.group_write('1/1/71', 22.64, dpt='9')
+
+        c = cache.StateCache(dpts={'1/1/71': '9'})
+        client = knxd_async.KNXD(*sim.address, loop=loop, callback=c)
+        c.client = client
+        loop.run_until_complete(client.connect())
+        self.assertEqual( loop.run_until_complete(c.get_async('1/1/71')), 22.64 )
+        self.assertEqual( loop.run_until_complete(c.get_async('1/1/71')), 22.64 )
+        self.assertEqual( sim.stats['reads'], 1 )
+        client.close()
+        loop.run_until_complete(sim.stop())
+        loop.close()
+
+    def test_ip_async(self):
+        sim = simulator.GatewaySimulator()
+        sim.start()
+        loop = asyncio.new_event_loop()
+        c = cache.StateCache(dpts={'1/1/71': '9'})
+        tunnel = ip_async.KNXIPTunnel(*sim.address, loop, callback=c)
+        c.client = tunnel
+        try:
+            loop.run_until_complete(tunnel.connect())
+            with self.assertLogs('knxpy.ip_async', 'DEBUG') as logs:
+                sim.group_write('1/1/71', 22.64, dpt='9')
+                deadline = time.monotonic() + 1
+                while '1/1/71' not in c and time.monotonic() < deadline:
+                    loop.run_until_complete(asyncio.sleep(0.01))
+            self.assertFalse( [line for line in logs.output if 'ERROR' in line] )
+            self.assertEqual( loop.run_until_complete(c.get_async('1/1/71')), 22.64 )
+            self.assertEqual( sim.stats['reads'], 0 )
+        finally:
+            loop.run_until_complete(tunnel.disconnect())
+            loop.close()
+            sim.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright (c) 2016 Daniel Matuschek
+#    This file is part of knxpy.
+#    
+#    Permission is hereby granted, free of charge, to any person obtaining a
+#    copy of this software and associated documentation files (the "Software"), 
+#    to deal in the Software without restriction, including without limitation 
+#    the rights to use, copy, modify, merge, publish, distribute, sublicense, 
+#    and/or sell copies of the Software, and to permit persons to whom the 
+#    Software is furnished to do so, subject to the following conditions:
+#    
+#    The above copyright notice and this permission notice shall be included in 
+#    all copies or substantial portions of the Software.
+################################################################################
+import unittest
+import io
+import os
+import json
+import tempfile
+
+from knxpy import catalog, ip, simulator
+
+
+ETS_CSV = '''"Group name";"Address";"Central";"Unfiltered";"Description";"DatapointType";"Security"
+"Living room";"1/-/-";"";"";"";"";"Auto"
+"Temperature";"1/1/-";"";"";"";"";"Auto"
+"Living room temperature";"1/1/71";"";"";"";"DPST-9-1";"Auto"
+"Living room light";"1/1/72";"";"";"";"DPST-1-1";"Auto"
+"Living room dimmer";"1/1/73";"";"";"";"DPT-5";"Auto"
+'''
+
+ETS_XML = '''<?xml version="1.0" encoding="utf-8"?>
+<GroupAddress-Export xmlns="http://knx.org/xml/ga-export/01">
+  <GroupRange Name="Living room" RangeStart="2048" RangeEnd="4095">
+    <GroupRange Name="Temperature" RangeStart="2304" RangeEnd="2559">
+      <GroupAddress Name="Living room temperature" Address="1/1/71" DPTs="DPST-9-1" />
+      <GroupAddress Name="Living room light" Address="1/1/72" DPTs="DPST-1-1" />
+    </GroupRange>
+  </GroupRange>
+</GroupAddress-Export>
+'''
+
+
+class TestCatalog(unittest.TestCase):
+
+    def test_normalize_dpt(self):
+        self.assertEqual( catalog.normalize_dpt('DPST-9-1'), '9.001' )
+        self.assertEqual( catalog.normalize_dpt('DPT-5'), '5' )
+        self.assertEqual( catalog.normalize_dpt('DPST-1-1,DPST-1-8'), '1.001' )
+        self.assertEqual( catalog.normalize_dpt('9'), '9' )
+        self.assertIsNone( catalog.normalize_dpt('') )
+
+    def test_add(self):
+        c = catalog.Catalog()
+        c.add('1/1/71', name='temperature', dpt='9')
+        c.add(2376, dpt='9.001')
+        c.add('1/1/73', name='light')
+        self.assertEqual( len(c), 3 )
+        self.assertEqual( c.address('temperature'), 2375 )
+        self.assertEqual( c.address('1/1/72'), 2376 )
+        self.assertEqual( c.name(2375), 'temperature' )
+        self.assertEqual( c.dpt('temperature'), '9' )
+        self.assertEqual( c.decode('temperature', b'\x0c\x6c'), 22.64 )
+        self.assertEqual( c.decode(2376, b'\x0c\x6c'), 22.64 )
+        self.assertEqual( c.encode('light', 1), 1 )
+        self.assertIsNone( c.codec('1/1/74') )
+        self.assertIn( 'light', c )
+        self.assertNotIn( 'unknown', c )
+        with self.assertRaises(KeyError):
+            c.address('unknown')
+
+    def test_rename(self):
+        c = catalog.Catalog()
+        c.add('1/1/71', name='a')
+        c.add('1/1/71', name='b')
+        self.assertNotIn( 'a', c )
+        self.assertEqual( c.address('b'), 2375 )
+
+    def test_csv(self):
+        c = catalog.Catalog.from_csv(io.StringIO(ETS_CSV))
+        self.assertEqual( list(c), [2375, 2376, 2377] )
+        self.assertEqual( c.dpt('Living room temperature'), '9.001' )
+        self.assertEqual( c.dpt('Living room dimmer'), '5' )
+
+    def test_json(self):
+        c = catalog.Catalog.from_json(io.StringIO(json.dumps([
+            {'address': '1/1/71', 'name': 'temperature', 'dpt': '9'},
+            {'address': 2376, 'name': 'light', 'dpt': '1'},
+        ])))
+        self.assertEqual( list(c), [2375, 2376] )
+        c = catalog.Catalog.from_json(io.StringIO(json.dumps({'1/1/71': '9', '1/1/72': {'name': 'light'}})))
+        self.assertEqual( c.dpt('1/1/71'), '9' )
+        self.assertEqual( c.address('light'), 2376 )
+
+    def test_ets(self):
+        c = catalog.Catalog.from_ets(io.StringIO(ETS_XML))
+        self.assertEqual( list(c), [2375, 2376] )
+        self.assertEqual( c.dpt('Living room light'), '1.001' )
+
+    def test_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'project.csv')
+            with open(filename, 'w') as f:
+                f.write(ETS_CSV)
+            self.assertEqual( len(catalog.Catalog.load(filename)), 3 )
+            with self.assertRaises(ValueError):
+                catalog.Catalog.load(os.path.join(directory, 'project.txt'))
+
+
+class TestClient(unittest.TestCase):
+
+    def test_ip(self):
+        c = catalog.Catalog.from_csv(io.StringIO(ETS_CSV))
+        sim = simulator.GatewaySimulator()
+        sim.start()
+        tunnel = ip.KNXIPTunnel(*sim.address, catalog=c)
+        tunnel.connect()
+        try:
+            self.assertTrue( tunnel.group_write('Living room temperature', 22.64) )
+            self.assertEqual( sim.state[2375], [0, 12, 108] )
+            self.assertEqual( tunnel.group_read('Living room temperature'), 22.64 )
+            self.assertEqual( tunnel.group_read('1/1/71', dpt='7'), 3180 )
+            results, timings = tunnel.group_read_many(['Living room temperature', 'Living room light'])
+            self.assertEqual( results, {'Living room temperature': 22.64, 'Living room light': None} )
+        finally:
+            tunnel.data_server.shutdown()
+            tunnel.data_server.server_close()
+            tunnel.control_socket.close()
+            sim.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright (c) 2016 Daniel Matuschek
+#    This file is part of knxpy.
+#    
+#    Permission is hereby granted, free of charge, to any person obtaining a
+#    copy of this software and associated documentation files (the "Software"), 
+#    to deal in the Software without restriction, including without limitation 
+#    the rights to use, copy, modify, merge, publish, distribute, sublicense, 
+#    and/or sell copies of the Software, and to permit persons to whom the 
+#    Software is furnished to do so, subject to the following conditions:
+#    
+#    The above copyright notice and this permission notice shall be included in 
+#    all copies or substantial portions of the Software.
+################################################################################
+import unittest
+
+import knxpy
+from knxpy.core import KNXIPFrame, KNXTunnelingRequest, CEMIMessage
+
+
+def tunnelling_request(cemi, channel=1, seq=0):
+    f = KNXIPFrame(KNXIPFrame.TUNNELING_REQUEST)
+    f.body = bytearray([0x04, channel, seq, 0x00])
+    f.body.extend(cemi.to_body())
+    return bytes(f.to_frame())
+
+
+class TestCore(unittest.TestCase):
+
+    def test_frame_round_trip(self):
+        cemi = CEMIMessage()
+        cemi.init_group_write(knxpy.util.encode_ga('1/1/71'), list(knxpy.util.encode_dpt(22.64, '9')))
+        data = tunnelling_request(cemi, channel=3, seq=7)
+
+        f = KNXIPFrame.from_frame(data)
+        self.assertEqual( f.service_type_id, KNXIPFrame.TUNNELING_REQUEST )
+        self.assertEqual( bytes(f.to_frame()), data )
+
+        req = KNXTunnelingRequest.from_body(f.body)
+        self.assertEqual( req.channel, 3 )
+        self.assertEqual( req.seq, 7 )
+
+        msg = CEMIMessage.from_body(req.cEmi)
+        self.assertEqual( msg.dst_addr, 2375 )
+        self.assertEqual( msg.cmd, CEMIMessage.CMD_GROUP_WRITE )
+        self.assertEqual( knxpy.util.decode_dpt(msg.data, '9'), 22.64 )
+        self.assertEqual( bytes(msg.payload), b'\x0cl' )
+
+    def test_zero_copy(self):
+        cemi = CEMIMessage()
+        cemi.init_group_write(2375, [0, 12, 108])
+        data = tunnelling_request(cemi)
+
+        msg = CEMIMessage.from_body(KNXTunnelingRequest.from_body(KNXIPFrame.from_frame(data).body).cEmi)
+        self.assertIsInstance( msg.data, memoryview )
+        self.assertIs( msg.data.obj, data )
+
+    def test_short_data(self):
+        cemi = CEMIMessage()
+        cemi.init_group_write(2375, 1)
+        msg = CEMIMessage.from_body(bytes(cemi.to_body()))
+        self.assertEqual( msg.cmd, CEMIMessage.CMD_GROUP_WRITE )
+        self.assertEqual( msg.data, 1 )
+        self.assertEqual( len(msg.payload), 0 )
+
+    def test_leading_zero_data(self):
+        cemi = CEMIMessage()
+        cemi.init_group_write(2375, [0, 0, 150])
+        msg = CEMIMessage.from_body(bytes(cemi.to_body()))
+        self.assertEqual( bytes(msg.payload), b'\x00\x96' )
+
+    def test_group_read(self):
+        cemi = CEMIMessage()
+        cemi.init_group_read(2375)
+        msg = CEMIMessage.from_body(bytes(cemi.to_body()))
+        self.assertEqual( msg.cmd, CEMIMessage.CMD_GROUP_READ )
+
+    def test_slots(self):
+        a = CEMIMessage()
+        self.assertFalse( hasattr(a, '__dict__') )
+        with self.assertRaises(AttributeError):
+            a.foo = 1
+
+    def test_too_short(self):
+        with self.assertRaises(ValueError):
+            KNXIPFrame.from_frame(b'\x06\x10\x04')
+        with self.assertRaises(ValueError):
+            KNXIPFrame.from_frame(b'\x06\x10\x04\x20\x00\x20\x00')
+        with self.assertRaises(ValueError):
+            CEMIMessage.from_body(b'\x29\x00\xbc')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright (c) 2016 Daniel Matuschek
+#    This file is part of knxpy.
+#    
+#    Permission is hereby granted, free of charge, to any person obtaining a
+#    copy of this software and associated documentation files (the "Software"), 
+#    to deal in the Software without restriction, including without limitation 
+#    the rights to use, copy, modify, merge, publish, distribute, sublicense, 
+#    and/or sell copies of the Software, and to permit persons to whom the 
+#    Software is furnished to do so, subject to the following conditions:
+#    
+#    The above copyright notice and this permission notice shall be included in 
+#    all copies or substantial portions of the Software.
+################################################################################
+import unittest
+import os
+import queue
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from collector.datastore import SQLiteDatastore, Event, to_epoch_ms, from_epoch_ms
+
+
+class TestSQLiteDatastore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'data.db')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def count(self):
+        conn = sqlite3.connect(self.filename)
+        count = conn.execute('select count(*) from valuelog').fetchone()[0]
+        conn.close()
+        return count
+
+    def test_journal_mode(self):
+        datastore = SQLiteDatastore(self.filename)
+        self.assertEqual( datastore.conn.execute('pragma journal_mode').fetchone()[0], 'wal' )
+        datastore.close()
+
+    def test_flush(self):
+        datastore = SQLiteDatastore(self.filename, flush_interval=60)
+        for i in range(1000):
+            datastore.record_data('knx:1/1/71', i)
+        datastore.record_event(Event('knx', '1/1/72', 22.64))
+        datastore.flush()
+        self.assertEqual( self.count(), 1001 )
+        self.assertEqual( datastore.stats['batches'], 3 )
+        datastore.close()
+
+    def test_flush_interval(self):
+        datastore = SQLiteDatastore(self.filename, flush_interval=0.05)
+        datastore.record_data('knx:1/1/71', 1, datetime(2017, 1, 1))
+        time.sleep(0.3)
+        self.assertEqual( self.count(), 1 )
+        datastore.close()
+
+    def test_close(self):
+        datastore = SQLiteDatastore(self.filename, flush_interval=60)
+        for i in range(10):
+            datastore.record_data('knx:1/1/71', i)
+        datastore.close()
+        self.assertEqual( self.count(), 10 )
+        with self.assertRaises(RuntimeError):
+            datastore.record_data('knx:1/1/71', 1)
+
+    def test_overflow(self):
+        datastore = SQLiteDatastore(self.filename, batch_size=1, max_queue=1, overflow='drop')
+        datastore._lock.acquire()
+        results = [datastore.record_data('knx:1/1/71', i) for i in range(5)]
+        datastore._lock.release()
+        self.assertIn( False, results )
+        self.assertEqual( datastore.stats['dropped'], results.count(False) )
+        datastore.close()
+
+        datastore = SQLiteDatastore(self.filename, batch_size=1, max_queue=1, overflow='raise')
+        datastore._lock.acquire()
+        with self.assertRaises(queue.Full):
+            for i in range(5):
+                datastore.record_data('knx:1/1/71', i)
+        datastore._lock.release()
+        datastore.close()
+
+        with self.assertRaises(ValueError):
+            SQLiteDatastore(self.filename, overflow='wait')
+
+
+    def test_schema(self):
+        datastore = SQLiteDatastore(self.filename)
+        self.assertEqual( datastore.conn.execute('pragma user_version').fetchone()[0], 1 )
+        plan = datastore.conn.execute("explain query plan select ts, value from valuelog "
+                                      "where sensor_id = 1 and ts >= 0 and ts < 1").fetchall()
+        self.assertIn( 'COVERING INDEX valuelog_sensor_ts', plan[0][-1] )
+        datastore.close()
+
+        # reopening does not change the tables
+        datastore = SQLiteDatastore(self.filename)
+        datastore.close()
+
+    def test_migrate(self):
+        conn = sqlite3.connect(self.filename)
+        conn.execute("create table valuelog (sensor, timestamp, value)")
+        conn.executemany("insert into valuelog (sensor, timestamp, value) values (?, ?, ?)", [
+            ('knx:1/1/71', '2017-01-01T00:00:00', 20.0),
+            ('knx:1/1/71', '2017-01-01T00:00:01.500000', 21.0),
+            ('knx:1/1/72', '2017-01-01T00:00:02', 1),
+        ])
+        conn.commit()
+        conn.close()
+
+        datastore = SQLiteDatastore(self.filename)
+        self.assertEqual( datastore.sensors(), ['knx:1/1/71', 'knx:1/1/72'] )
+        self.assertEqual( datastore.latest('knx:1/1/71'), (datetime(2017, 1, 1, 0, 0, 1, 500000), 21.0) )
+        datastore.close()
+
+    def test_migrate_failure(self):
+        # a legacy table without timestamps cannot be migrated
+        conn = sqlite3.connect(self.filename)
+        conn.execute("create table valuelog (sensor, value)")
+        conn.execute("insert into valuelog (sensor, value) values ('knx:1/1/71', 20.0)")
+        conn.commit()
+        conn.close()
+
+        with self.assertRaises(sqlite3.OperationalError):
+            SQLiteDatastore(self.filename)
+
+        conn = sqlite3.connect(self.filename)
+        tables = [row[0] for row in conn.execute("select name from sqlite_master where type = 'table'")]
+        self.assertEqual( tables, ['valuelog'] )
+        self.assertEqual( conn.execute('pragma user_version').fetchone()[0], 0 )
+        self.assertEqual( conn.execute('select count(*) from valuelog').fetchone()[0], 1 )
+        conn.close()
+
+    def test_memory(self):
+        datastore = SQLiteDatastore(':memory:', batch_size=1)
+        t0 = datetime(2017, 1, 1)
+        for i in range(100):
+            datastore.record_data('knx:1/1/71', i, t0 + timedelta(seconds=i))
+            datastore.latest('knx:1/1/71')
+        datastore.flush()
+        self.assertEqual( datastore.latest('knx:1/1/71'), (t0 + timedelta(seconds=99), 99) )
+        self.assertEqual( len(list(datastore.range('knx:1/1/71', t0, t0 + timedelta(seconds=10)))), 10 )
+        datastore.close()
+
+    def test_epoch_ms(self):
+        self.assertEqual( to_epoch_ms(datetime(1970, 1, 1, 0, 0, 1, 500000)), 1500 )
+        self.assertEqual( to_epoch_ms(1.5), 1500 )
+        self.assertEqual( from_epoch_ms(1500), datetime(1970, 1, 1, 0, 0, 1, 500000) )
+
+    def test_queries(self):
+        datastore = SQLiteDatastore(self.filename)
+        t0 = datetime(2017, 1, 1)
+        for i in range(100):
+            datastore.record_data('knx:1/1/71', i, t0 + timedelta(seconds=i))
+        datastore.record_data('knx:1/1/72', 1000, t0)
+        datastore.flush()
+
+        self.assertEqual( datastore.latest('knx:1/1/71'), (t0 + timedelta(seconds=99), 99) )
+        self.assertIsNone( datastore.latest('knx:1/1/73') )
+
+        values = datastore.range('knx:1/1/71', t0 + timedelta(seconds=10), t0 + timedelta(seconds=20))
+        self.assertNotIsInstance( values, list )
+        self.assertEqual( [value for timestamp, value in values], list(range(10, 20)) )
+
+        buckets = list(datastore.downsample('knx:1/1/71', t0, t0 + timedelta(seconds=100), 10))
+        self.assertEqual( len(buckets), 10 )
+        self.assertEqual( buckets[1], (t0 + timedelta(seconds=10), 14.5, 10, 19) )
+        datastore.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright (c) 2016 Daniel Matuschek
+#    This file is part of knxpy.
+#    
+#    Permission is hereby granted, free of charge, to any person obtaining a
+#    copy of this software and associated documentation files (the "Software"), 
+#    to deal in the Software without restriction, including without limitation 
+#    the rights to use, copy, modify, merge, publish, distribute, sublicense, 
+#    and/or sell copies of the Software, and to permit persons to whom the 
+#    Software is furnished to do so, subject to the following conditions:
+#    
+#    The above copyright notice and this permission notice shall be included in 
+#    all copies or substantial portions of the Software.
+################################################################################
+import unittest
+import random
+import struct
+
+import knxpy
+from knxpy import dpts
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class TestRegistry(unittest.TestCase):
+
+    def test_normalize(self):
+        self.assertEqual( dpts.normalize('9'), ('9', None) )
+        self.assertEqual( dpts.normalize('9.1'), ('9', '001') )
+        self.assertEqual( dpts.normalize('9.001'), ('9', '001') )
+        self.assertEqual( dpts.normalize('9001'), ('9', '001') )
+        self.assertEqual( dpts.normalize('16000'), ('16', '000') )
+        self.assertEqual( dpts.normalize(232), ('232', None) )
+
+    def test_get(self):
+        self.assertIs( dpts.registry.get('9').encode, dpts.dpt9.encode )
+        self.assertIs( dpts.registry.get('9.001').decode, dpts.dpt9.decode )
+        self.assertIs( dpts.registry.get('5001').decode, dpts.dpt5001.decode )
+        self.assertIs( dpts.registry.get('5.004').decode, dpts.dpt5.decode )
+        self.assertIs( dpts.registry.get('16').decode, dpts.dpt16000.decode )
+        self.assertIs( dpts.registry.get('16.001').decode, dpts.dpt16001.decode )
+        self.assertIs( dpts.registry.get('4.002').decode, dpts.dpt4002.decode )
+
+    def test_get_cached(self):
+        self.assertIs( dpts.registry.get('9.001'), dpts.registry.get('9.001') )
+
+    def test_get_unknown(self):
+        self.assertIsNone( dpts.registry.get('999') )
+        self.assertIsNone( dpts.registry.get('abc') )
+        self.assertIsNone( knxpy.util.encode_dpt(1, '999') )
+        with self.assertRaises(KeyError):
+            dpts.registry['999']
+
+    def test_register(self):
+        registry = dpts.Registry()
+        registry.register('9', dpts.dpt9)
+        self.assertIs( registry.get('9.001').decode, dpts.dpt9.decode )
+
+        codec = dpts.Codec('9.001', lambda value: [0, 1], lambda data: 'custom')
+        registry.register('9.001', codec)
+        self.assertEqual( registry.get('9.001').decode(b'\x0cl'), 'custom' )
+        self.assertEqual( registry.get('9.002').decode(b'\x0cl'), 22.64 )
+
+        with self.assertRaises(ValueError):
+            registry.register('9', dpts.dpt9)
+        registry.register('9', dpts.dpt7, replace=True)
+        self.assertEqual( registry.get('9.002').decode(b'\x0cl'), 3180 )
+
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class TestArray(unittest.TestCase):
+
+    ranges = {
+        'dpt5': (-10, 300),
+        'dpt6': (-200, 200),
+        'dpt7': (0, 65535),
+        'dpt8': (-40000, 40000),
+        'dpt9': (-600000, 600000),
+        'dpt12': (-5, 5e9),
+        'dpt13': (-3e9, 3e9),
+        'dpt14': (-1e6, 1e6),
+    }
+
+    def test_matches_scalar(self):
+        rand = random.Random(0)
+        for name, (low, high) in self.ranges.items():
+            module = getattr(dpts, name)
+            values = [rand.uniform(low, high) for i in range(1000)] + [low, high, 0, -0.4, 0.4]
+
+            rows = module.encode_array(values)
+            for value, row in zip(values, rows):
+                self.assertEqual( list(row), list(module.encode(value)), name )
+
+            payload = rows[:, 1:]
+            from_rows = module.decode_array(payload)
+            from_buffer = module.decode_array(payload.tobytes())
+            for row, a, b in zip(payload, from_rows, from_buffer):
+                scalar = module.decode(row.tobytes())
+                self.assertEqual( a, scalar, name )
+                self.assertEqual( b, scalar, name )
+
+    def test_decode_dpt9_all_values(self):
+        decoded = dpts.dpt9.decode_array(np.arange(0x10000, dtype='>u2').view(np.uint8))
+        for i in range(0, 0x10000, 7):
+            self.assertEqual( decoded[i], dpts.dpt9.decode(struct.pack('>H', i)) )
+
+    def test_wrong_width(self):
+        with self.assertRaises(ValueError):
+            dpts.dpt9.decode_array(np.zeros((4, 3), dtype=np.uint8))
+
+    def test_codec(self):
+        codec = dpts.registry.get('9.001')
+        self.assertEqual( list(codec.decode_array(b'\x0cl\x0cl')), [22.64, 22.64] )
+        self.assertIsNone( dpts.registry.get('1').decode_array )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,337 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright (c) 2016 Daniel Matuschek
+#    This file is part of knxpy.
+#    
+#    Permission is hereby granted, free of charge, to any person obtaining a
+#    copy of this software and associated documentation files (the "Software"), 
+#    to deal in the Software without restriction, including without limitation 
+#    the rights to use, copy, modify, merge, publish, distribute, sublicense, 
+#    and/or sell copies of the Software, and to permit persons to whom the 
+#    Software is furnished to do so, subject to the following conditions:
+#    
+#    The above copyright notice and this permission notice shall be included in 
+#    all copies or substantial portions of the Software.
+################################################################################
+import time
+import unittest
+import asyncio
+import threading
+
+import knxpy
+from knxpy import ip, ip_async
+from knxpy.core import KNXIPFrame
+
+
+class FakeTunnel(ip.KNXIPTunnel):
+    """
+    Tunnel which answers read requests itself instead of sending them
+
+    """
+
+    def __init__(self, responses, delay=0.05):
+        super().__init__('127.0.0.1', 3671)
+        self.responses = responses
+        self.delay = delay
+        self.sent = []
+
+    def send_tunnelling_request(self, cemi):
+        self.sent.append(cemi)
+        if cemi.dst_addr in self.responses:
+            timer = threading.Timer(self.delay, self.pending_reads.resolve,
+                                    args=(cemi.dst_addr, self.responses[cemi.dst_addr]))
+            timer.start()
+
+
+class FakeSocket(object):
+    """
+    Socket which records sent frames and acknowledges them through ack
+
+    """
+
+    def __init__(self, ack=None):
+        self.ack = ack
+        self.frames = []
+
+    def sendto(self, frame, addr):
+        self.frames.append(bytes(frame))
+        if self.ack is not None:
+            self.ack(KNXIPFrame.from_frame(frame), len(self.frames))
+
+
+class FailingSocket(object):
+
+    def sendto(self, frame, addr):
+        raise OSError('network is unreachable')
+
+
+class FakeDataServer(object):
+
+    def __init__(self, socket):
+        self.socket = socket
+
+
+def ack_tunnel(ack=None, send_window=1):
+    tunnel = ip.KNXIPTunnel('127.0.0.1', 3671, send_window=send_window)
+    tunnel.ack_timeout = 0.05
+    tunnel.data_server = FakeDataServer(FakeSocket(ack))
+    return tunnel
+
+
+class TestPendingReads(unittest.TestCase):
+
+    def test_request(self):
+        pending = ip.PendingReads()
+        future, created = pending.request(1)
+        self.assertTrue( created )
+        self.assertEqual( pending.request(1), (future, False) )
+        self.assertTrue( pending.resolve(1, b'\x0cl') )
+        self.assertEqual( future.result(), b'\x0cl' )
+        self.assertFalse( pending.resolve(1, b'\x0cl') )
+        self.assertEqual( len(pending), 0 )
+
+    def test_discard(self):
+        pending = ip.PendingReads()
+        future, created = pending.request(1)
+        pending.discard(1, future)
+        self.assertNotIn( 1, pending )
+        self.assertTrue( pending.request(1)[1] )
+
+
+class TestKNXIPTunnel(unittest.TestCase):
+
+    def test_group_read(self):
+        tunnel = FakeTunnel({2375: b'\x0cl'})
+        self.assertEqual( tunnel.group_read('1/1/71', dpt='9'), 22.64 )
+        self.assertEqual( len(tunnel.pending_reads), 0 )
+
+    def test_group_read_timeout(self):
+        tunnel = FakeTunnel({})
+        tunnel.read_timeout = 0.05
+        self.assertIsNone( tunnel.group_read('1/1/71') )
+        self.assertEqual( len(tunnel.pending_reads), 0 )
+
+    def test_concurrent_group_read(self):
+        tunnel = FakeTunnel({2375: b'\x0cl'}, delay=0.1)
+        results = []
+
+        def read():
+            results.append(tunnel.group_read('1/1/71', dpt='9'))
+
+        threads = [threading.Thread(target=read) for i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual( results, [22.64]*5 )
+        self.assertEqual( len(tunnel.sent), 1 )
+
+    def test_group_read_many(self):
+        responses = {addr: b'\x0cl' for addr in range(0, 40)}
+        del responses[5]
+        tunnel = FakeTunnel(responses, delay=0.05)
+        tunnel.read_timeout = 0.2
+
+        gas = [knxpy.util.decode_ga(addr) for addr in range(0, 40)]
+        results, timings = tunnel.group_read_many(gas + gas[:3], dpts='9', concurrency=10)
+
+        self.assertEqual( len(tunnel.sent), 40 )
+        self.assertEqual( set(results), set(gas) )
+        self.assertIsNone( results['0/0/5'] )
+        self.assertGreaterEqual( timings['0/0/5'], 0.2 )
+        self.assertEqual( results['0/0/6'], 22.64 )
+        self.assertLess( timings['0/0/6'], 0.2 )
+        self.assertEqual( len(tunnel.pending_reads), 0 )
+
+    def test_group_read_many_unacked(self):
+        # the gateway answers the reads but the acknowledgements are lost
+        def respond(frame, count):
+            addr = (frame.body[10] << 8) | frame.body[11]
+            threading.Timer(0.01, tunnel.pending_reads.resolve, args=(addr, b'\x0cl')).start()
+
+        tunnel = ack_tunnel(respond, send_window=5)
+        tunnel.ack_timeout = 0.3
+        starttime = time.monotonic()
+        results, timings = tunnel.group_read_many(range(5), dpts='9', concurrency=5)
+
+        self.assertLess( time.monotonic() - starttime, 0.3 )
+        self.assertEqual( list(results.values()), [22.64]*5 )
+        self.assertLess( max(timings.values()), 0.3 )
+
+    def test_group_read_many_dpts(self):
+        tunnel = FakeTunnel({1: b'\x0cl', 2: b'\x8c'}, delay=0.01)
+        results, timings = tunnel.group_read_many([1, 2], dpts={1: '9', 2: '5'})
+        self.assertEqual( results, {1: 22.64, 2: 140} )
+
+
+class TestTunnellingAck(unittest.TestCase):
+
+    def test_acked(self):
+        def ack(frame, count):
+            threading.Timer(0.01, tunnel._ack_received, args=(frame.body[1], frame.body[2], 0)).start()
+
+        tunnel = ack_tunnel(ack)
+        self.assertTrue( tunnel.group_write('1/1/71', 1) )
+        self.assertTrue( tunnel.group_write('1/1/71', 0) )
+        self.assertEqual( tunnel.stats, {'sent': 2, 'acked': 2, 'retransmits': 0, 'dropped': 0,
+                                         'heartbeats': 0, 'reconnects': 0, 'reconnect_failures': 0,
+                                         'reconnect_latency': 0.0, 'downtime': 0.0, 'buffered': 0, 'replayed': 0} )
+        self.assertEqual( len(tunnel.data_server.socket.frames), 2 )
+        self.assertEqual( tunnel.seq, 2 )
+
+    def test_retransmit(self):
+        def ack(frame, count):
+            if count > 1:
+                tunnel._ack_received(frame.body[1], frame.body[2], 0)
+
+        tunnel = ack_tunnel(ack)
+        self.assertTrue( tunnel.group_write('1/1/71', 1) )
+        self.assertEqual( tunnel.stats['retransmits'], 1 )
+        self.assertEqual( tunnel.stats['dropped'], 0 )
+        frames = tunnel.data_server.socket.frames
+        self.assertEqual( frames[0], frames[1] )
+
+    def test_dropped(self):
+        tunnel = ack_tunnel()
+        self.assertFalse( tunnel.group_write('1/1/71', 1) )
+        self.assertEqual( tunnel.stats['retransmits'], 1 )
+        self.assertEqual( tunnel.stats['dropped'], 1 )
+        self.assertEqual( len(tunnel._acks), 0 )
+
+    def test_ack_error(self):
+        def ack(frame, count):
+            tunnel._ack_received(frame.body[1], frame.body[2], KNXIPFrame.E_CONNECTION_ID)
+
+        tunnel = ack_tunnel(ack)
+        self.assertFalse( tunnel.group_write('1/1/71', 1) )
+
+    def test_wrong_channel(self):
+        def ack(frame, count):
+            tunnel._ack_received(5, frame.body[2], 0)
+
+        tunnel = ack_tunnel(ack)
+        self.assertFalse( tunnel.group_write('1/1/71', 1) )
+
+    def test_send_window(self):
+        outstanding = []
+
+        def ack(frame, count):
+            outstanding.append(len(tunnel._acks))
+            threading.Timer(0.01, tunnel._ack_received, args=(frame.body[1], frame.body[2], 0)).start()
+
+        tunnel = ack_tunnel(ack, send_window=2)
+        threads = [threading.Thread(target=tunnel.group_write, args=('1/1/71', 1)) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertLessEqual( max(outstanding), 2 )
+        self.assertEqual( tunnel.stats['acked'], 10 )
+
+
+class FakeAsyncTunnel(ip_async.KNXIPTunnel):
+
+    def __init__(self, loop, responses, delay=0.05):
+        super().__init__('127.0.0.1', 3671, loop)
+        self.responses = responses
+        self.delay = delay
+        self.sent = []
+
+    def send_tunnelling_request(self, cemi, sending=None):
+        self.sent.append(cemi)
+        if sending is not None:
+            sending()
+        if cemi.dst_addr in self.responses:
+            self.loop.call_later(self.delay, self.pending_reads.resolve,
+                                 cemi.dst_addr, self.responses[cemi.dst_addr])
+
+
+class TestAsyncKNXIPTunnel(unittest.TestCase):
+
+    def test_concurrent_group_read(self):
+        loop = asyncio.new_event_loop()
+        tunnel = FakeAsyncTunnel(loop, {2375: b'\x0cl'})
+
+        async def main():
+            return await asyncio.gather(*[tunnel.group_read('1/1/71', dpt='9') for i in range(5)])
+
+        self.assertEqual( loop.run_until_complete(main()), [22.64]*5 )
+        self.assertEqual( len(tunnel.sent), 1 )
+        loop.close()
+
+    def test_group_read_many(self):
+        loop = asyncio.new_event_loop()
+        responses = {addr: b'\x0cl' for addr in range(0, 40)}
+        del responses[5]
+        tunnel = FakeAsyncTunnel(loop, responses)
+        tunnel.read_timeout = 0.2
+
+        results, timings = loop.run_until_complete(tunnel.group_read_many(range(0, 40), dpts='9', concurrency=10))
+        self.assertEqual( len(tunnel.sent), 40 )
+        self.assertIsNone( results[5] )
+        self.assertEqual( results[6], 22.64 )
+        self.assertLess( timings[6], 0.2 )
+        loop.close()
+
+    def test_group_read_timeout(self):
+        loop = asyncio.new_event_loop()
+        tunnel = FakeAsyncTunnel(loop, {})
+        tunnel.read_timeout = 0.05
+        self.assertIsNone( loop.run_until_complete(tunnel.group_read('1/1/71')) )
+        self.assertEqual( len(tunnel.pending_reads), 0 )
+        loop.close()
+
+
+    def test_send_tunnelling_request(self):
+        loop = asyncio.new_event_loop()
+        tunnel = ip_async.KNXIPTunnel('127.0.0.1', 3671, loop)
+        tunnel.ack_timeout = 0.05
+
+        def ack(frame, count):
+            if count > 1:
+                loop.call_soon(tunnel._ack_received, frame.body[1], frame.body[2], 0)
+
+        # the data server of the asyncio tunnel is a datagram transport
+        tunnel.data_server = FakeSocket(ack)
+
+        async def main():
+            return await tunnel.group_write('1/1/71', 1)
+
+        self.assertTrue( loop.run_until_complete(main()) )
+        self.assertEqual( tunnel.stats['retransmits'], 1 )
+        loop.close()
+
+    def test_group_write(self):
+        loop = asyncio.new_event_loop()
+        tunnel = ip_async.KNXIPTunnel('127.0.0.1', 3671, loop)
+        tunnel.ack_timeout = 0.01
+        tunnel.data_server = FakeSocket()
+
+        # the result is the acknowledgement, not a task sending the request
+        self.assertIs( loop.run_until_complete(tunnel.group_write('1/1/71', 1)), False )
+        self.assertEqual( tunnel.stats['dropped'], 1 )
+
+        tunnel._down_since = time.monotonic()
+        self.assertIsNone( loop.run_until_complete(tunnel.group_write('1/1/71', 1)) )
+        self.assertEqual( tunnel.stats['buffered'], 1 )
+        loop.close()
+
+    def test_failed_send_discards_read(self):
+        loop = asyncio.new_event_loop()
+        tunnel = ip_async.KNXIPTunnel('127.0.0.1', 3671, loop)
+        tunnel.data_server = FailingSocket()
+
+        async def main():
+            tunnel._request_read(2375)
+            self.assertEqual( len(tunnel.pending_reads), 1 )
+            await asyncio.sleep(0.01)
+
+        loop.run_until_complete(main())
+        self.assertEqual( len(tunnel.pending_reads), 0 )
+        loop.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
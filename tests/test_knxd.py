@@ -0,0 +1,155 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright (c) 2016 Daniel Matuschek
+#    This file is part of knxpy.
+#    
+#    Permission is hereby granted, free of charge, to any person obtaining a
+#    copy of this software and associated documentation files (the "Software"), 
+#    to deal in the Software without restriction, including without limitation 
+#    the rights to use, copy, modify, merge, publish, distribute, sublicense, 
+#    and/or sell copies of the Software, and to permit persons to whom the 
+#    Software is furnished to do so, subject to the following conditions:
+#    
+#    The above copyright notice and this permission notice shall be included in 
+#    all copies or substantial portions of the Software.
+################################################################################
+import socket
+import unittest
+import asyncio
+import threading
+import time
+
+from knxpy import knxd, knxd_simulator, util
+
+
+def telegram(dst, payload=b'\x0c\x6c'):
+    body = bytearray([0x00, 0x27, 0x11, 0x01, (dst >> 8) & 0xff, dst & 0xff, 0x00, 0x80])
+    body.extend(payload)
+    return bytes(bytearray(len(body).to_bytes(2, byteorder='big')) + body)
+
+
+class TestFrameReader(unittest.TestCase):
+
+    def test_burst(self):
+        reader = knxd.FrameReader()
+        reader.feed(b''.join(telegram(i) for i in range(50)))
+        frames = list(reader.frames())
+        self.assertEqual( [util.decode_telegram(f)._dst for f in frames], list(range(50)) )
+        self.assertEqual( (reader.start, reader.end), (0, 0) )
+
+    def test_split(self):
+        reader = knxd.FrameReader()
+        data = telegram(1) + telegram(2)
+        frames = []
+        for i in range(len(data)):
+            reader.feed(data[i:i + 1])
+            frames.extend(reader.frames())
+        self.assertEqual( frames, [telegram(1), telegram(2)] )
+
+    def test_compact(self):
+        reader = knxd.FrameReader(0)
+        data = telegram(1)
+        frames = []
+        for i in range(10000):
+            reader.feed(data[:5])
+            frames.extend(reader.frames())
+            reader.feed(data[5:])
+            frames.extend(reader.frames())
+        self.assertEqual( len(frames), 10000 )
+        self.assertEqual( len(reader.buffer), 2 + 0xffff )
+
+    def test_resync(self):
+        reader = knxd.FrameReader()
+        reader.feed(b'\x00\x01\xff' + telegram(1))
+        self.assertEqual( list(reader.frames()), [] )
+        self.assertEqual( reader.resyncs, 1 )
+        reader.feed(telegram(2))
+        self.assertEqual( list(reader.frames()), [telegram(2)] )
+
+
+class TestListen(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.sim = knxd_simulator.KNXDSimulator()
+        self.loop.run_until_complete(self.sim.start())
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.run_until_complete(self.sim.stop())
+        self.loop.close()
+
+    def call(self, func, *args):
+        self.loop.call_soon_threadsafe(func, *args)
+
+    def wait_for(self, condition, timeout=2):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return condition()
+
+    def test_listen(self):
+        received = []
+        client = knxd.KNXD(*self.sim.address)
+        client.connect()
+        client.listen(received.append)
+        self.assertTrue( self.wait_for(lambda: len(self.sim.clients) == 2) )
+
+        records = [(0, 0x1101, i, bytes([0, 0x80, 12, 108])) for i in range(500)]
+        self.loop.call_soon_threadsafe(self.loop.create_task, self.sim.replay(records, speed=None))
+        self.assertTrue( self.wait_for(lambda: len(received) == 500) )
+        client.close()
+
+        self.assertEqual( [m._dst for m in received], list(range(500)) )
+        self.assertEqual( client.stats['frames'], 500 )
+        self.assertEqual( client.stats['resyncs'], 0 )
+
+    def test_reconnect(self):
+        received = []
+        client = knxd.KNXD(*self.sim.address, min_backoff=0.01)
+        client.listen(received.append)
+        self.assertTrue( self.wait_for(lambda: len(self.sim.clients) == 1) )
+
+        self.call(self.sim.drop_clients)
+        self.assertTrue( self.wait_for(lambda: client.stats['reconnects'] == 1 and len(self.sim.clients) == 1) )
+
+        self.call(self.sim.group_write, '1/1/71', 22.64, '9')
+        self.assertTrue( self.wait_for(lambda: len(received) == 1) )
+        client.close()
+        self.assertEqual( received[0].dst, '1/1/71' )
+
+    def test_backoff(self):
+        # a server which acknowledges the group connection and hangs up
+        server = socket.create_server(('127.0.0.1', 0))
+        server.settimeout(0.05)
+        stop = threading.Event()
+
+        def serve():
+            while not stop.is_set():
+                try:
+                    conn, _addr = server.accept()
+                except socket.timeout:
+                    continue
+                conn.sendall(b'\x00\x02\x00\x26')
+                conn.close()
+
+        thread = threading.Thread(target=serve)
+        thread.start()
+        client = knxd.KNXD(*server.getsockname(), min_backoff=0.02, max_backoff=1.0)
+        client.listen()
+        time.sleep(0.5)
+        client.close()
+        stop.set()
+        thread.join()
+        server.close()
+
+        # 0.02 + 0.04 + 0.08 + 0.16 + 0.32 s
+        self.assertLessEqual( client.stats['reconnects'], 5 )
+        self.assertEqual( client.recv_socket.fileno(), -1 )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright (c) 2016 Daniel Matuschek
+#    This file is part of knxpy.
+#    
+#    Permission is hereby granted, free of charge, to any person obtaining a
+#    copy of this software and associated documentation files (the "Software"), 
+#    to deal in the Software without restriction, including without limitation 
+#    the rights to use, copy, modify, merge, publish, distribute, sublicense, 
+#    and/or sell copies of the Software, and to permit persons to whom the 
+#    Software is furnished to do so, subject to the following conditions:
+#    
+#    The above copyright notice and this permission notice shall be included in 
+#    all copies or substantial portions of the Software.
+################################################################################
+import unittest
+import asyncio
+
+from knxpy import knxd_async, knxd_simulator, util
+
+
+class TestKNXD(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.sim = knxd_simulator.KNXDSimulator()
+        self.loop.run_until_complete(self.sim.start())
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.sim.stop())
+        self.loop.close()
+
+    def connect(self, **kwargs):
+        kwargs.setdefault('callback', lambda message: None)
+        client = knxd_async.KNXD(*self.sim.address, loop=self.loop, **kwargs)
+        self.loop.run_until_complete(client.connect())
+        return client
+
+    def test_group_write(self):
+        client = self.connect()
+        self.loop.run_until_complete(client.group_write('1/1/71', 22.64, dpt='9'))
+        self.loop.run_until_complete(client.group_write('1/1/72', 1))
+        self.loop.run_until_complete(asyncio.sleep(0.05))
+        client.close()
+        self.assertEqual( self.sim.state[util.encode_ga('1/1/71')], b'\x00\x80\x0c\x6c' )
+        self.assertEqual( self.sim.state[util.encode_ga('1/1/72')], b'\x00\x81' )
+
+    def test_group_read(self):
+        self.sim.group_write('1/1/71', 22.64, dpt='9')
+        client = self.connect()
+        self.assertEqual( self.loop.run_until_complete(client.group_read('1/1/71', dpt='9')), 22.64 )
+        client.close()
+
+    def test_group_read_timeout(self):
+        client = self.connect(read_timeout=0.05)
+        self.assertIsNone( self.loop.run_until_complete(client.group_read('1/1/71')) )
+        self.assertEqual( len(client.pending_reads), 0 )
+        client.close()
+
+    def test_telegrams(self):
+        records = [(0, 0x1101, i, bytes([0, 0x80, 12, 108])) for i in range(200)]
+        messages = []
+        client = self.connect(callback=messages.append)
+
+        async def main():
+            received = []
+            async for message in client.telegrams():
+                received.append(message)
+                if len(received) == len(records):
+                    return received
+
+        task = self.loop.create_task(main())
+        self.loop.run_until_complete(self.sim.replay(records, speed=None))
+        received = self.loop.run_until_complete(asyncio.wait_for(task, 2))
+        client.close()
+
+        self.assertEqual( [m._dst for m in received], list(range(200)) )
+        self.assertEqual( bytes(received[0].val), b'\x0c\x6c' )
+        self.assertEqual( received[0].flg, knxd_async.KNXD.KNXWRITE )
+        self.assertEqual( len(messages), 200 )
+
+    def test_telegrams_end_when_closed(self):
+        client = self.connect()
+
+        async def main():
+            return [message async for message in client.telegrams()]
+
+        task = self.loop.create_task(main())
+        self.loop.run_until_complete(asyncio.sleep(0.01))
+        self.sim.drop_clients()
+        self.assertEqual( self.loop.run_until_complete(asyncio.wait_for(task, 1)), [] )
+        client.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
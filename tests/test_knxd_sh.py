@@ -0,0 +1,178 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright (c) 2016 Daniel Matuschek
+#    This file is part of knxpy.
+#    
+#    Permission is hereby granted, free of charge, to any person obtaining a
+#    copy of this software and associated documentation files (the "Software"), 
+#    to deal in the Software without restriction, including without limitation 
+#    the rights to use, copy, modify, merge, publish, distribute, sublicense, 
+#    and/or sell copies of the Software, and to permit persons to whom the 
+#    Software is furnished to do so, subject to the following conditions:
+#    
+#    The above copyright notice and this permission notice shall be included in 
+#    all copies or substantial portions of the Software.
+################################################################################
+import unittest
+import socket
+
+from knxpy import knxd_sh
+
+
+class CountingEpoll(object):
+    """
+    Wraps an epoll object and counts the modify calls
+
+    """
+
+    def __init__(self, epoll):
+        self.epoll = epoll
+        self.modified = []
+
+    def modify(self, fileno, mask):
+        self.modified.append(mask)
+        self.epoll.modify(fileno, mask)
+
+    def __getattr__(self, name):
+        return getattr(self.epoll, name)
+
+
+def telegram(dst):
+    body = bytearray([0x00, 0x27, 0x11, 0x01, (dst >> 8) & 0xff, dst & 0xff, 0x00, 0x80, 0x0c, 0x6c])
+    return bytes(bytearray(len(body).to_bytes(2, byteorder='big')) + body)
+
+
+class TestConnections(unittest.TestCase):
+
+    def setUp(self):
+        self.client = knxd_sh.KNXD()
+        self.client.alive = True
+        self.connections = self.client.connections
+        self.epoll = self.connections._epoll = CountingEpoll(self.connections._epoll)
+        self.sock, self.peer = socket.socketpair()
+        self.sock.setblocking(False)
+        self.client.socket = self.sock
+        self.client._connected()
+        self.fileno = self.sock.fileno()
+
+    def tearDown(self):
+        self.client.alive = False
+        self.client.close()
+        self.peer.close()
+        self.epoll.close()
+
+    def test_arm_on_send(self):
+        # handle_connect queued the cache enable and group connection requests
+        self.assertIn( self.fileno, self.connections._armed )
+        self.connections.poll(timeout=0.1)
+        self.assertNotIn( self.fileno, self.connections._armed )
+        self.assertEqual( self.peer.recv(100), b'\x00\x02\x00\x70\x00\x05\x00\x26\x00\x00\x00' )
+        self.assertEqual( self.epoll.modified, [self.connections._rw, self.connections._ro] )
+
+    def test_idle(self):
+        self.connections.poll(timeout=0.1)
+        del self.epoll.modified[:]
+        for i in range(5):
+            self.connections.poll(timeout=0.01)
+        self.assertEqual( self.epoll.modified, [] )
+        self.assertEqual( self.connections.stats['iterations'], 6 )
+
+    def test_stats(self):
+        received = []
+        self.connections.poll(timeout=0.1)
+        self.peer.sendall(b''.join(telegram(i) for i in range(10)))
+        self.connections.poll(callback=received.append, timeout=1)
+        self.assertEqual( len(received), 10 )
+        self.assertGreaterEqual( self.connections.stats['wakeups'], 2 )
+        self.assertGreater( self.connections.stats['callback_time'], 0 )
+
+
+class TestStream(unittest.TestCase):
+
+    def setUp(self):
+        self.client = knxd_sh.KNXD()
+        self.client.alive = True
+        self.sock, self.peer = socket.socketpair()
+        self.sock.setblocking(False)
+        self.client.socket = self.sock
+        self.client._connected()
+        self.client._out()
+        self.peer.recv(100)
+
+    def tearDown(self):
+        self.client.alive = False
+        self.client.close()
+        self.peer.close()
+
+    def test_many_telegrams(self):
+        received = []
+        self.peer.sendall(b''.join(telegram(i) for i in range(1000)))
+        while len(received) < 1000:
+            self.client._in(callback=received.append)
+        self.assertEqual( [m.dst for m in received[:3]], ['0/0/0', '0/0/1', '0/0/2'] )
+        self.assertEqual( received[-1].dst, '0/3/231' )
+        self.assertEqual( self.client.inbuffer, b'' )
+        self.assertTrue( self.client.inbuffer.readonly )
+
+    def test_split_telegram(self):
+        received = []
+        data = telegram(1) + telegram(2)
+        self.peer.sendall(data[:5])
+        self.client._in(callback=received.append)
+        self.assertEqual( received, [] )
+        self.peer.sendall(data[5:15])
+        self.client._in(callback=received.append)
+        self.assertEqual( len(received), 1 )
+        self.assertEqual( self.client.inbuffer, data[14:15] )
+        self.peer.sendall(data[15:])
+        self.client._in(callback=received.append)
+        self.assertEqual( [m.dst for m in received], ['0/0/1', '0/0/2'] )
+
+    def test_compact(self):
+        self.client._inbuf[:4] = b'abcd'
+        self.client._instart, self.client._inend = 1, 4
+        self.client._compact()
+        self.assertEqual( self.client.inbuffer, b'bcd' )
+        self.assertEqual( self.client._instart, 0 )
+
+        # a partial frame larger than the buffer grows it
+        size = len(self.client._inbuf)
+        self.client._inend = size
+        self.client._compact()
+        self.assertGreater( len(self.client._inbuf), size )
+        self.assertEqual( len(self.client.inbuffer), size )
+
+    def test_balance(self):
+        found = []
+        self.client.terminator = 0
+        self.client.balance('{', '}')
+        self.client.found_balance = found.append
+        self.peer.sendall(b'{"a": {"b": 1}}{"c": 2}{"d"')
+        self.client._in()
+        self.assertEqual( found, [b'{"a": {"b": 1}}', b'{"c": 2}'] )
+        self.assertEqual( self.client.inbuffer, b'{"d"' )
+
+    def test_unbalanced(self):
+        self.client.terminator = 0
+        self.client.balance('{', '}')
+        self.peer.sendall(b'}{')
+        self.client._in()
+        self.assertFalse( self.client.connected )
+
+    def test_sendmsg(self):
+        self.client.send(b'ab')
+        self.client.send(b'')
+        self.client.send(b'cd')
+        self.client.send(b'ef')
+        self.client._out()
+        self.assertEqual( self.peer.recv(100), b'abcdef' )
+        self.assertEqual( len(self.client.outbuffer), 0 )
+
+    def test_unsent(self):
+        frames = [b'ab', b'cd', b'ef']
+        self.assertEqual( list(knxd_sh.Stream._unsent(frames, 3)), [b'ef', b'd'] )
+        self.assertEqual( list(knxd_sh.Stream._unsent(frames, 0)), [b'ef', b'cd', b'ab'] )
+
+
+if __name__ == '__main__':
+    unittest.main()
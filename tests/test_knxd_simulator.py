@@ -0,0 +1,141 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright (c) 2016 Daniel Matuschek
+#    This file is part of knxpy.
+#    
+#    Permission is hereby granted, free of charge, to any person obtaining a
+#    copy of this software and associated documentation files (the "Software"), 
+#    to deal in the Software without restriction, including without limitation 
+#    the rights to use, copy, modify, merge, publish, distribute, sublicense, 
+#    and/or sell copies of the Software, and to permit persons to whom the 
+#    Software is furnished to do so, subject to the following conditions:
+#    
+#    The above copyright notice and this permission notice shall be included in 
+#    all copies or substantial portions of the Software.
+################################################################################
+import unittest
+import asyncio
+import struct
+import threading
+import time
+
+from knxpy import knxd, knxd_simulator, util
+
+
+async def open_client(sim):
+    reader, writer = await asyncio.open_connection(*sim.address)
+    writer.write(util.encode_data('HHB', [0x26, 0, 0]))
+    ack = await reader.readexactly(4)
+    return reader, writer, ack
+
+
+async def read_packet(reader):
+    length = await reader.readexactly(2)
+    return length + await reader.readexactly(struct.unpack('>H', length)[0])
+
+
+class TestKNXDSimulator(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.sim = knxd_simulator.KNXDSimulator()
+        self.loop.run_until_complete(self.sim.start())
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.sim.stop())
+        self.loop.close()
+
+    def test_open_groupcon(self):
+        async def main():
+            reader, writer, ack = await open_client(self.sim)
+            writer.close()
+            return ack
+
+        self.assertEqual( self.loop.run_until_complete(main()), b'\x00\x02\x00\x26' )
+
+    def test_fan_out(self):
+        async def main():
+            clients = [await open_client(self.sim) for i in range(3)]
+            writer = clients[0][1]
+            writer.write(util.encode_data('HHBBBB', [0x27, 2375, 0, 0x80, 12, 108]))
+            packets = [await read_packet(reader) for reader, _w, _a in clients[1:]]
+            for _r, w, _a in clients:
+                w.close()
+            return packets
+
+        for packet in self.loop.run_until_complete(main()):
+            msg = util.decode_telegram(packet)
+            self.assertEqual( msg.dst, '1/1/71' )
+            self.assertEqual( bytes(msg.val), b'\x0c\x6c' )
+        self.assertEqual( self.sim.state[2375], b'\x00\x80\x0c\x6c' )
+
+    def test_group_read(self):
+        self.sim.group_write('1/1/71', 22.64, dpt='9')
+
+        async def main():
+            reader, writer, ack = await open_client(self.sim)
+            writer.write(util.encode_data('HHBB', [0x27, 2375, 0, 0x00]))
+            packet = await read_packet(reader)
+            writer.close()
+            return packet
+
+        packet = self.loop.run_until_complete(main())
+        self.assertEqual( packet[9] & 0xc0, knxd_simulator.KNXRESP )
+        self.assertEqual( util.decode_dpt(packet[10:], '9'), 22.64 )
+
+    def test_replay(self):
+        records = [(i * 0.1, 0x1101, i, bytes([0, 0x80, i])) for i in range(10)]
+
+        async def main():
+            reader, writer, ack = await open_client(self.sim)
+            starttime = time.monotonic()
+            count = await self.sim.replay(records, speed=10)
+            elapsed = time.monotonic() - starttime
+            packets = [await read_packet(reader) for i in range(count)]
+            writer.close()
+            return elapsed, packets
+
+        elapsed, packets = self.loop.run_until_complete(main())
+        self.assertEqual( [util.decode_telegram(p)._dst for p in packets], list(range(10)) )
+        self.assertGreaterEqual( elapsed, 0.08 )
+        self.assertLess( elapsed, 0.5 )
+
+    def test_drop_clients(self):
+        async def main():
+            reader, writer, ack = await open_client(self.sim)
+            self.sim.drop_clients()
+            data = await reader.read()
+            writer.close()
+            return data
+
+        self.assertEqual( self.loop.run_until_complete(main()), b'' )
+        self.assertEqual( len(self.sim.clients), 0 )
+
+
+class TestKNXDClient(unittest.TestCase):
+
+    def test_group_write(self):
+        loop = asyncio.new_event_loop()
+        sim = knxd_simulator.KNXDSimulator()
+        loop.run_until_complete(sim.start())
+        thread = threading.Thread(target=loop.run_forever)
+        thread.start()
+        try:
+            client = knxd.KNXD(*sim.address)
+            client.connect()
+            client.group_write('1/1/71', 22.64, dpt='9')
+            deadline = time.monotonic() + 1
+            while 2375 not in sim.state and time.monotonic() < deadline:
+                time.sleep(0.01)
+            client.close()
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.run_until_complete(sim.stop())
+            loop.close()
+
+        self.assertEqual( sim.state[2375], b'\x00\x80\x0c\x6c' )
+
+
+if __name__ == '__main__':
+    unittest.main()
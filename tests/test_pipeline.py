@@ -0,0 +1,98 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright (c) 2016 Daniel Matuschek
+#    This file is part of knxpy.
+#    
+#    Permission is hereby granted, free of charge, to any person obtaining a
+#    copy of this software and associated documentation files (the "Software"), 
+#    to deal in the Software without restriction, including without limitation 
+#    the rights to use, copy, modify, merge, publish, distribute, sublicense, 
+#    and/or sell copies of the Software, and to permit persons to whom the 
+#    Software is furnished to do so, subject to the following conditions:
+#    
+#    The above copyright notice and this permission notice shall be included in 
+#    all copies or substantial portions of the Software.
+################################################################################
+import unittest
+import functools
+import multiprocessing
+import threading
+import time
+
+from knxpy import pipeline, util
+from knxpy.core import CEMIMessage
+
+
+def record(q, message):
+    q.put((message.dst_addr, bytes(message.data)))
+
+
+def make_message(dst, data):
+    cemi = CEMIMessage()
+    cemi.init_group_write(dst, [0] + list(data))
+    return CEMIMessage.from_body(bytes(cemi.to_body()))
+
+
+class TestPipeline(unittest.TestCase):
+
+    def test_thread(self):
+        received = []
+        p = pipeline.Pipeline(received.append, workers=2)
+        for i in range(100):
+            p(util.Message(0x1101, i % 3, 0x80, i))
+        p.stop()
+        self.assertEqual( len(received), 100 )
+        for dst in range(3):
+            self.assertEqual( [m.val for m in received if m._dst == dst], list(range(dst, 100, 3)) )
+        self.assertEqual( p.stats['processed'], 100 )
+        self.assertEqual( p.stats['depth'], 0 )
+
+    def test_slow_callback(self):
+        event = threading.Event()
+        p = pipeline.Pipeline(lambda message: event.wait(), workers=1)
+        starttime = time.monotonic()
+        for i in range(10):
+            p(util.Message(0x1101, 1, 0x80, i))
+        self.assertLess( time.monotonic() - starttime, 0.5 )
+        self.assertGreater( p.stats['depth'], 0 )
+        event.set()
+        p.stop()
+        self.assertGreater( p.stats['latency_max'], 0 )
+
+    def test_drop(self):
+        event = threading.Event()
+        p = pipeline.Pipeline(lambda message: event.wait(), workers=1, maxsize=2, policy='drop')
+        results = [p(util.Message(0x1101, 1, 0x80, i)) for i in range(10)]
+        event.set()
+        p.stop()
+        self.assertIn( False, results )
+        self.assertEqual( p.stats['dropped'], results.count(False) )
+        self.assertEqual( p.stats['processed'], results.count(True) )
+
+    def test_errors(self):
+        p = pipeline.Pipeline(lambda message: 1 / 0, workers=1)
+        p(util.Message(0x1101, 1, 0x80, 0))
+        p.stop()
+        self.assertEqual( p.stats['errors'], 1 )
+
+    def test_detach(self):
+        message = make_message(2375, b'\x0c\x6c')
+        self.assertIsInstance( message.data, memoryview )
+        detached = pipeline.detach(message)
+        self.assertEqual( detached.data, b'\x0c\x6c' )
+        self.assertIsInstance( message.data, memoryview )
+
+    def test_process(self):
+        q = multiprocessing.Queue()
+        p = pipeline.Pipeline(functools.partial(record, q), workers=2, mode='process')
+        for i in range(20):
+            p(make_message(i % 4, bytes([i, 0xff])))
+        p.stop()
+        received = [q.get(timeout=5) for i in range(20)]
+        for dst in range(4):
+            self.assertEqual( [data for d, data in received if d == dst], [bytes([i, 0xff]) for i in range(dst, 20, 4)] )
+        self.assertEqual( p.stats['processed'], 20 )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright (c) 2016 Daniel Matuschek
+#    This file is part of knxpy.
+#    
+#    Permission is hereby granted, free of charge, to any person obtaining a
+#    copy of this software and associated documentation files (the "Software"), 
+#    to deal in the Software without restriction, including without limitation 
+#    the rights to use, copy, modify, merge, publish, distribute, sublicense, 
+#    and/or sell copies of the Software, and to permit persons to whom the 
+#    Software is furnished to do so, subject to the following conditions:
+#    
+#    The above copyright notice and this permission notice shall be included in 
+#    all copies or substantial portions of the Software.
+################################################################################
+import unittest
+import os
+import tempfile
+
+from knxpy import recorder, util
+from knxpy.core import CEMIMessage
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def cemi_message(dst, data):
+    cemi = CEMIMessage()
+    cemi.init_group_write(dst, data)
+    cemi.src_addr = 0x1102
+    return CEMIMessage.from_body(bytes(cemi.to_body()))
+
+
+class TestRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = self.directory.name
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def record(self, **kwargs):
+        r = recorder.Recorder(self.path, **kwargs)
+        for i in range(10):
+            r.record(util.Message(0x1101, 2375 + i % 2, 0x80, b'\x0c\x6c'), timestamp=1000.0 + i)
+        r.record(util.Message('1.1.3', 2377, 'response', 1), timestamp=1010.0)
+        r.record(cemi_message(2378, [0, 12, 108]), timestamp=1011.0)
+        r.close()
+        return r
+
+    def test_records(self):
+        self.record()
+        records = list(recorder.Reader(self.path).records())
+        self.assertEqual( len(records), 12 )
+        self.assertEqual( records[0], recorder.Record(1000.0, 0x1101, 2375, 0x80, b'\x0c\x6c') )
+        self.assertEqual( records[10], recorder.Record(1010.0, 0x1103, 2377, 0x41, b'') )
+        self.assertEqual( records[11], recorder.Record(1011.0, 0x1102, 2378, 0x80, b'\x0c\x6c') )
+
+    def test_filter(self):
+        self.record()
+        reader = recorder.Reader(self.path)
+        self.assertEqual( [r.ts for r in reader.records(ga='1/1/72')], [1001.0, 1003.0, 1005.0, 1007.0, 1009.0] )
+        self.assertEqual( [r.ts for r in reader.records(t0=1002, t1=1004)], [1002.0, 1003.0] )
+
+    def test_rotate(self):
+        r = self.record(segment_records=4)
+        self.assertEqual( r.stats, {'records': 12, 'segments': 3} )
+        self.assertEqual( len(recorder.segments(self.path)), 3 )
+        self.assertEqual( len(list(recorder.Reader(self.path).records())), 12 )
+
+        # a new recorder continues after the existing segments
+        self.record(segment_records=4, max_segments=4)
+        filenames = [os.path.basename(f) for f in recorder.segments(self.path)]
+        self.assertEqual( filenames, ['bus-000002.rec', 'bus-000003.rec', 'bus-000004.rec', 'bus-000005.rec'] )
+
+    def test_partial_record(self):
+        self.record()
+        with open(recorder.segments(self.path)[0], 'ab') as f:
+            f.write(b'\x00' * 10)
+        self.assertEqual( len(list(recorder.Reader(self.path).records())), 12 )
+
+    def test_telegrams(self):
+        self.record()
+        telegrams = list(recorder.Reader(self.path).telegrams(ga=2377))
+        self.assertEqual( telegrams, [(1010.0, 0x1103, 2377, b'\x00\x41')] )
+
+    @unittest.skipIf(np is None, 'numpy is not installed')
+    def test_array(self):
+        self.record()
+        reader = recorder.Reader(self.path)
+        arrays = reader.arrays()
+        self.assertEqual( len(arrays), 1 )
+        self.assertFalse( arrays[0].flags.owndata )
+        self.assertEqual( arrays[0].dtype.itemsize, 32 )
+
+        a = reader.array(ga='1/1/71', t0=1002)
+        self.assertEqual( list(a['ts']), [1002.0, 1004.0, 1006.0, 1008.0] )
+        self.assertEqual( bytes(a['payload'][0][:a['len'][0]]), b'\x0c\x6c' )
+        del arrays, a
+        reader.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
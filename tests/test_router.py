@@ -0,0 +1,97 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright (c) 2016 Daniel Matuschek
+#    This file is part of knxpy.
+#    
+#    Permission is hereby granted, free of charge, to any person obtaining a
+#    copy of this software and associated documentation files (the "Software"), 
+#    to deal in the Software without restriction, including without limitation 
+#    the rights to use, copy, modify, merge, publish, distribute, sublicense, 
+#    and/or sell copies of the Software, and to permit persons to whom the 
+#    Software is furnished to do so, subject to the following conditions:
+#    
+#    The above copyright notice and this permission notice shall be included in 
+#    all copies or substantial portions of the Software.
+################################################################################
+import unittest
+from unittest import mock
+
+from knxpy import router, util
+
+
+def message(ga, val, flg=0x80):
+    return util.Message(0x1101, util.encode_ga(ga), flg, val)
+
+
+class TestPatterns(unittest.TestCase):
+
+    def test_wildcard(self):
+        match = router.compile_pattern('1/2/*')
+        self.assertTrue( match(util.encode_ga('1/2/0')) )
+        self.assertTrue( match(util.encode_ga('1/2/255')) )
+        self.assertFalse( match(util.encode_ga('1/3/0')) )
+
+    def test_short(self):
+        match = router.compile_pattern('1')
+        self.assertTrue( match(util.encode_ga('1/7/255')) )
+        self.assertFalse( match(util.encode_ga('2/0/0')) )
+
+    def test_range(self):
+        match = router.compile_pattern('1/2/10-20')
+        self.assertEqual( [i for i in range(256) if match(util.encode_ga('1/2/{}'.format(i)))], list(range(10, 21)) )
+
+    def test_tuple(self):
+        match = router.compile_pattern(('1/2/250', '1/3/5'))
+        self.assertTrue( match(util.encode_ga('1/2/255')) )
+        self.assertTrue( match(util.encode_ga('1/3/0')) )
+        self.assertFalse( match(util.encode_ga('1/3/6')) )
+
+
+class TestRouter(unittest.TestCase):
+
+    def test_dispatch(self):
+        received = []
+        passed = []
+        r = router.Router(callback=passed.append)
+        r.subscribe('1/1/71', lambda value, msg: received.append(('temperature', value)), dpt='9')
+        r.subscribe('1/1/*', lambda value, msg: received.append(('raw', value)))
+        r.subscribe(2376, lambda value, msg: received.append(('other', value)), dpt='9')
+
+        r(message('1/1/71', b'\x0c\x6c'))
+        r(message('1/2/71', b'\x0c\x6c'))
+        r(message('1/1/71', 0, flg=0x00))
+
+        self.assertEqual( received, [('temperature', 22.64), ('raw', b'\x0c\x6c')] )
+        self.assertEqual( len(passed), 3 )
+
+    def test_decode_once(self):
+        r = router.Router()
+        values = []
+        for i in range(30):
+            r.subscribe('1/1/71', lambda value, msg: values.append(value), dpt='9')
+        with mock.patch('knxpy.util.decode_dpt', wraps=util.decode_dpt) as decode:
+            r(message('1/1/71', b'\x0c\x6c'))
+        self.assertEqual( decode.call_count, 1 )
+        self.assertEqual( values, [22.64] * 30 )
+
+    def test_unsubscribe(self):
+        r = router.Router()
+        received = []
+        subscription = r.subscribe('1/*', lambda value, msg: received.append(value))
+        r(message('1/1/71', 1))
+        r.unsubscribe(subscription)
+        r(message('1/1/71', 1))
+        self.assertEqual( received, [1] )
+
+    def test_handler_error(self):
+        r = router.Router()
+        received = []
+        r.subscribe('1/1/71', lambda value, msg: 1 / 0)
+        r.subscribe('1/1/71', lambda value, msg: received.append(value))
+        r(message('1/1/71', 1))
+        self.assertEqual( received, [1] )
+        self.assertEqual( r.stats['errors'], 1 )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright (c) 2016 Daniel Matuschek
+#    This file is part of knxpy.
+#    
+#    Permission is hereby granted, free of charge, to any person obtaining a
+#    copy of this software and associated documentation files (the "Software"), 
+#    to deal in the Software without restriction, including without limitation 
+#    the rights to use, copy, modify, merge, publish, distribute, sublicense, 
+#    and/or sell copies of the Software, and to permit persons to whom the 
+#    Software is furnished to do so, subject to the following conditions:
+#    
+#    The above copyright notice and this permission notice shall be included in 
+#    all copies or substantial portions of the Software.
+################################################################################
+import time
+import random
+import socket
+import unittest
+import threading
+
+from knxpy import routing, util
+from knxpy.core import KNXIPFrame
+
+
+PORT = random.randint(40000, 50000)
+
+
+def multicast_available():
+    try:
+        server = routing.RoutingServer((routing.MULTICAST_GROUP, PORT), routing.RoutingRequestHandler,
+                                       local_ip='127.0.0.1')
+    except OSError:
+        return False
+    server.server_close()
+    return True
+
+
+@unittest.skipIf(not multicast_available(), 'loopback multicast is not available')
+class TestKNXIPRouter(unittest.TestCase):
+
+    def setUp(self):
+        self.received = []
+        self.event = threading.Event()
+
+        def callback(msg):
+            self.received.append(msg)
+            self.event.set()
+
+        self.a = routing.KNXIPRouter(port=PORT, individual_address='1.1.250', local_ip='127.0.0.1')
+        self.b = routing.KNXIPRouter(port=PORT, individual_address='1.1.251', local_ip='127.0.0.1',
+                                     callback=callback)
+        self.a.connect()
+        self.b.connect()
+
+    def tearDown(self):
+        self.a.disconnect()
+        self.b.disconnect()
+
+    def test_group_write(self):
+        self.a.group_write('1/1/71', 22.64, dpt='9')
+        self.assertTrue( self.event.wait(1) )
+        msg = self.received[0]
+        self.assertEqual( util.decode_ga(msg.dst_addr), '1/1/71' )
+        self.assertEqual( msg.src_addr, util.encode_pa('1.1.250') )
+        self.assertEqual( util.decode_dpt(msg.data, '9'), 22.64 )
+        self.assertEqual( self.a.stats['sent'], 1 )
+        self.assertEqual( self.b.stats['received'], 1 )
+
+    def test_ignore_own(self):
+        self.b.group_write('1/1/71', 1, dpt='1')
+        time.sleep(0.1)
+        self.assertEqual( self.received, [] )
+        self.assertEqual( self.b.stats['ignored'], 1 )
+
+    def test_group_read(self):
+        def respond(msg):
+            if msg.cmd == msg.CMD_GROUP_READ:
+                cemi = routing.CEMIMessage()
+                cemi.init_group_write(msg.dst_addr, util.encode_dpt(22.64, '9'))
+                cemi.tpci_apci = 0x40
+                self.b.send_routing_indication(cemi)
+
+        self.b.callback = respond
+        self.assertEqual( self.a.group_read('1/1/71', dpt='9'), 22.64 )
+
+    def test_group_read_timeout(self):
+        self.a.read_timeout = 0.05
+        self.assertIsNone( self.a.group_read('1/1/71') )
+        self.assertEqual( len(self.a.pending_reads), 0 )
+
+    def test_busy(self):
+        busy = KNXIPFrame(KNXIPFrame.ROUTING_BUSY, bytearray([0x06, 0x00, 0x00, 0x64, 0x00, 0x00]))
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton('127.0.0.1'))
+        sock.sendto(busy.to_frame(), (routing.MULTICAST_GROUP, PORT))
+        sock.close()
+        deadline = time.monotonic() + 1
+        while self.a.stats['busy'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual( self.a.stats['busy'], 1 )
+        starttime = time.monotonic()
+        self.a.group_write('1/1/71', 1, dpt='1')
+        self.assertGreater( time.monotonic() - starttime, 0.05 )
+
+    def test_lost_message(self):
+        lost = KNXIPFrame(KNXIPFrame.ROUTING_LOST_MESSAGE, bytearray([0x04, 0x00, 0x00, 0x03]))
+        self.a.handle_frame(lost.to_frame())
+        self.assertEqual( self.a.stats['lost'], 3 )
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_rate(self):
+        limiter = routing.RateLimiter(rate=100, burst=5)
+        waits = [limiter.delay() for i in range(10)]
+        self.assertEqual( waits[:5], [0.0]*5 )
+        self.assertAlmostEqual( waits[9], 0.05, delta=0.01 )
+
+    def test_busy(self):
+        limiter = routing.RateLimiter()
+        limiter.busy(0.1)
+        self.assertGreaterEqual( limiter.delay(), 0.09 )
+        self.assertLess( limiter.delay(), 0.16 )
+
+
+if __name__ == '__main__':
+    unittest.main()
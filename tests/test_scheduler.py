@@ -0,0 +1,108 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright (c) 2016 Daniel Matuschek
+#    This file is part of knxpy.
+#    
+#    Permission is hereby granted, free of charge, to any person obtaining a
+#    copy of this software and associated documentation files (the "Software"), 
+#    to deal in the Software without restriction, including without limitation 
+#    the rights to use, copy, modify, merge, publish, distribute, sublicense, 
+#    and/or sell copies of the Software, and to permit persons to whom the 
+#    Software is furnished to do so, subject to the following conditions:
+#    
+#    The above copyright notice and this permission notice shall be included in 
+#    all copies or substantial portions of the Software.
+################################################################################
+import unittest
+import time
+
+from knxpy.catalog import Catalog
+from knxpy.scheduler import WriteScheduler
+
+
+class FakeClient(object):
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.writes = []
+
+    def group_write(self, ga, data, dpt=None):
+        self.writes.append((time.monotonic(), ga, data, dpt))
+        time.sleep(self.delay)
+
+
+class TestWriteScheduler(unittest.TestCase):
+
+    def test_coalesce(self):
+        client = FakeClient(delay=0.05)
+        scheduler = WriteScheduler(client)
+        for value in range(20):
+            scheduler.group_write('1/1/64', value, dpt='5')
+        self.assertTrue( scheduler.flush(timeout=1) )
+        scheduler.stop()
+
+        values = [data for t, ga, data, dpt in client.writes]
+        self.assertLess( len(values), 20 )
+        self.assertEqual( values[-1], 19 )
+        self.assertEqual( client.writes[-1][3], '5' )
+        self.assertEqual( scheduler.stats['submitted'], 20 )
+        self.assertEqual( scheduler.stats['sent'] + scheduler.stats['coalesced'], 20 )
+
+    def test_min_interval(self):
+        client = FakeClient()
+        scheduler = WriteScheduler(client, min_interval=0.05)
+        scheduler.group_write('1/1/64', 0)
+        time.sleep(0.01)
+        scheduler.group_write('1/1/64', 1)
+        scheduler.group_write('1/1/65', 2)
+        scheduler.flush(timeout=1)
+        scheduler.stop()
+
+        times = {data: t for t, ga, data, dpt in client.writes}
+        self.assertEqual( sorted(times), [0, 1, 2] )
+        self.assertGreaterEqual( times[1] - times[0], 0.05 )
+        self.assertLess( times[2] - times[0], 0.05 )
+
+    def test_max_rate(self):
+        client = FakeClient()
+        scheduler = WriteScheduler(client, max_rate=100)
+        for addr in range(10):
+            scheduler.group_write(addr, 1)
+        scheduler.flush(timeout=1)
+        scheduler.stop()
+
+        self.assertEqual( len(client.writes), 10 )
+        self.assertGreaterEqual( client.writes[-1][0] - client.writes[0][0], 0.08 )
+
+    def test_catalog(self):
+        client = FakeClient(delay=0.05)
+        client.catalog = Catalog()
+        client.catalog.add('1/1/64', 'Dimmer', '5')
+        scheduler = WriteScheduler(client)
+        scheduler.group_write('1/1/65', 0)
+        scheduler.group_write('Dimmer', 1)
+        scheduler.group_write('1/1/64', 2)
+        scheduler.flush(timeout=1)
+        scheduler.stop()
+
+        # the name and the address of a group address share the pending write
+        self.assertEqual( scheduler.stats['coalesced'], 1 )
+        self.assertEqual( client.writes[-1][1:3], ('1/1/64', 2) )
+
+    def test_error(self):
+        class FailingClient(object):
+            def group_write(self, ga, data, dpt=None):
+                raise Exception('failed')
+
+        scheduler = WriteScheduler(FailingClient())
+        scheduler.group_write(1, 1)
+        scheduler.flush(timeout=1)
+        scheduler.stop()
+        self.assertEqual( scheduler.stats['errors'], 1 )
+
+        with self.assertRaises(RuntimeError):
+            scheduler.group_write(1, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
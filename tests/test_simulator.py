@@ -0,0 +1,286 @@
+#!/usr/bin/env/ python
+################################################################################
+#    Copyright (c) 2016 Daniel Matuschek
+#    This file is part of knxpy.
+#    
+#    Permission is hereby granted, free of charge, to any person obtaining a
+#    copy of this software and associated documentation files (the "Software"), 
+#    to deal in the Software without restriction, including without limitation 
+#    the rights to use, copy, modify, merge, publish, distribute, sublicense, 
+#    and/or sell copies of the Software, and to permit persons to whom the 
+#    Software is furnished to do so, subject to the following conditions:
+#    
+#    The above copyright notice and this permission notice shall be included in 
+#    all copies or substantial portions of the Software.
+################################################################################
+import time
+import unittest
+import asyncio
+import threading
+
+from knxpy import ip, ip_async, simulator, util
+from knxpy.core import KNXIPFrame
+
+
+class TestGatewaySimulator(unittest.TestCase):
+
+    def setUp(self):
+        self.sim = simulator.GatewaySimulator(seed=1)
+        self.sim.start()
+        self.messages = []
+        self.tunnel = ip.KNXIPTunnel(*self.sim.address, callback=self.messages.append)
+        self.tunnel.connect()
+
+    def tearDown(self):
+        self.tunnel.disconnect()
+        self.sim.stop()
+
+    def test_connect(self):
+        self.assertEqual( list(self.sim.connections), [self.tunnel.channel] )
+
+    def test_group_read(self):
+        self.sim.state[util.encode_ga('1/1/71')] = [0, 12, 108]
+        self.assertEqual( self.tunnel.group_read('1/1/71', dpt='9'), 22.64 )
+
+    def test_group_read_unknown(self):
+        self.assertEqual( self.tunnel.group_read('1/1/72'), None )
+
+    def test_group_write(self):
+        self.assertEqual( self.tunnel.group_write('1/1/71', [0, 12, 108]), True )
+        self.assertEqual( self.tunnel.group_read('1/1/71', dpt='9'), 22.64 )
+        self.assertEqual( self.sim.stats['writes'], 1 )
+
+    def test_stream(self):
+        event = threading.Event()
+        received = []
+
+        def callback(msg):
+            received.append(msg)
+            if len(received) >= 10:
+                event.set()
+
+        self.tunnel.callback = callback
+        self.sim.start_stream(200, ['1/1/1', '1/1/2'], weights=[1, 0], dpts={'1/1/1': '5'})
+        self.assertTrue(event.wait(2))
+        self.sim.stop_stream()
+        self.assertEqual( set(util.decode_ga(msg.dst_addr) for msg in received), {'1/1/1'} )
+
+    def test_loss(self):
+        self.sim.state[1] = [0, 12, 108]
+        self.sim.loss = 0.3
+        self.tunnel.ack_timeout = 0.05
+        self.tunnel.read_timeout = 0.1
+        for i in range(20):
+            self.tunnel.group_read(1)
+        self.assertGreater( self.sim.stats['dropped'], 0 )
+        self.assertGreater( self.tunnel.stats['retransmits'], 0 )
+
+    def test_disconnect(self):
+        self.tunnel.disconnect()
+        self.assertEqual( self.sim.connections, {} )
+        self.assertIsNone( self.tunnel.data_server )
+
+
+class TestReconnect(unittest.TestCase):
+
+    def setUp(self):
+        self.sim = simulator.GatewaySimulator(seed=1)
+        self.sim.start()
+        self.tunnel = ip.KNXIPTunnel(*self.sim.address)
+        self.tunnel.heartbeat_interval = 0.05
+        self.tunnel.heartbeat_timeout = 0.05
+        self.tunnel.min_backoff = 0.01
+        self.tunnel.connect()
+
+    def tearDown(self):
+        self.tunnel.disconnect()
+        self.sim.stop()
+
+    def wait_for(self, condition, timeout=2):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return condition()
+
+    def test_heartbeat(self):
+        self.assertTrue( self.wait_for(lambda: self.tunnel.stats['heartbeats'] >= 2) )
+        self.assertEqual( self.tunnel.stats['reconnects'], 0 )
+
+    def test_reconnect_after_heartbeat(self):
+        self.sim.drop_connections()
+        self.assertTrue( self.wait_for(lambda: self.tunnel.stats['reconnects'] == 1) )
+        self.assertEqual( list(self.sim.connections), [self.tunnel.channel] )
+        self.assertGreater( self.tunnel.stats['downtime'], 0 )
+        self.assertGreater( self.tunnel.stats['reconnect_latency'], 0 )
+
+    def test_reconnect_unreachable(self):
+        self.sim.loss = 1.0
+        self.assertTrue( self.wait_for(lambda: self.tunnel.stats['reconnect_failures'] >= 1, timeout=5) )
+        self.sim.loss = 0.0
+        self.assertTrue( self.wait_for(lambda: self.tunnel.stats['reconnects'] == 1, timeout=5) )
+
+    def test_disconnect_during_backoff(self):
+        self.tunnel.min_backoff = 5.0
+        self.sim.loss = 1.0
+        self.assertTrue( self.wait_for(lambda: self.tunnel.stats['reconnect_failures'] >= 1, timeout=5) )
+        starttime = time.monotonic()
+        self.tunnel.disconnect()
+        self.assertLess( time.monotonic() - starttime, 0.5 )
+
+    def test_replay_writes(self):
+        self.tunnel.heartbeat_interval = 60
+        self.sim.drop_connections()
+        # the gateway answers with E_CONNECTION_ID and the write is buffered
+        self.assertIsNone( self.tunnel.group_write('1/1/71', [0, 12, 108]) )
+        self.assertIsNone( self.tunnel.group_write('1/1/72', [0, 12, 26]) )
+        self.assertTrue( self.wait_for(lambda: self.tunnel.stats['replayed'] == 2) )
+        self.assertEqual( self.tunnel.stats['buffered'], 2 )
+        self.assertEqual( self.sim.state[util.encode_ga('1/1/71')], [0, 12, 108] )
+        self.assertEqual( self.sim.state[util.encode_ga('1/1/72')], [0, 12, 26] )
+
+
+class TestAsyncTunnel(unittest.TestCase):
+
+    def setUp(self):
+        self.sim = simulator.GatewaySimulator(seed=1)
+        self.sim.start()
+        self.loop = asyncio.new_event_loop()
+        self.tunnel = ip_async.KNXIPTunnel(*self.sim.address, self.loop)
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.tunnel.disconnect())
+        self.loop.close()
+        self.sim.stop()
+
+    def test_connect(self):
+        self.loop.run_until_complete(self.tunnel.connect())
+        self.assertEqual( list(self.sim.connections), [self.tunnel.channel] )
+
+    def test_connect_refused(self):
+        self.sim.max_connections = 0
+        with self.assertRaises(Exception):
+            self.loop.run_until_complete(self.tunnel.connect())
+
+    def test_connect_does_not_block(self):
+        self.sim.loss = 1.0
+        self.tunnel.connect_timeout = 0.2
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(self.loop.time())
+                await asyncio.sleep(0.01)
+
+        async def main():
+            task = self.loop.create_task(tick())
+            try:
+                await self.tunnel.connect()
+            finally:
+                task.cancel()
+
+        with self.assertRaises(Exception):
+            self.loop.run_until_complete(main())
+        self.assertGreater( len(ticks), 5 )
+
+    def test_group_read(self):
+        self.sim.state[util.encode_ga('1/1/71')] = [0, 12, 108]
+        self.sim.state[util.encode_ga('1/1/72')] = [0, 12, 26]
+
+        async def main():
+            await self.tunnel.connect()
+            return await asyncio.gather(self.tunnel.group_read('1/1/71', dpt='9'),
+                                        self.tunnel.group_read('1/1/72', dpt='9'))
+
+        self.assertEqual( self.loop.run_until_complete(main()), [22.64, 21.0] )
+
+    def test_group_read_many_loss(self):
+        for addr in range(100):
+            self.sim.state[addr] = [0, 12, 108]
+        self.tunnel.ack_timeout = 0.3
+        self.tunnel.read_timeout = 0.2
+
+        async def main():
+            await self.tunnel.connect()
+            self.sim.loss = 0.05
+            return await self.tunnel.group_read_many(range(100), dpts='9', concurrency=10)
+
+        results, timings = self.loop.run_until_complete(main())
+        sent = self.tunnel.stats['sent']
+        self.loop.run_until_complete(asyncio.sleep(0.1))
+        self.sim.loss = 0.0
+
+        # every read is sent once and no request is sent after the call returned
+        self.assertEqual( sent, 100 )
+        self.assertEqual( self.tunnel.stats['sent'], sent )
+        self.assertLess( list(results.values()).count(None), 20 )
+        self.assertLess( max(timings.values()), self.tunnel.read_timeout + 0.1 )
+
+    def test_coroutine_callback(self):
+        received = []
+
+        async def callback(msg):
+            received.append(msg)
+
+        self.tunnel.callback = callback
+        self.loop.run_until_complete(self.tunnel.connect())
+        self.sim.group_write('1/1/71', 22.64, dpt='9')
+        deadline = time.monotonic() + 1
+        while not received and time.monotonic() < deadline:
+            self.loop.run_until_complete(asyncio.sleep(0.01))
+        self.assertEqual( util.decode_ga(received[0].dst_addr), '1/1/71' )
+
+    def test_connection_state(self):
+        self.loop.run_until_complete(self.tunnel.connect())
+        self.assertEqual( self.loop.run_until_complete(self.tunnel.connection_state()), KNXIPFrame.E_NO_ERROR )
+        self.sim.drop_connections()
+        self.assertEqual( self.loop.run_until_complete(self.tunnel.connection_state()), KNXIPFrame.E_CONNECTION_ID )
+
+    def test_heartbeat(self):
+        self.tunnel.heartbeat_interval = 0.02
+        self.loop.run_until_complete(self.tunnel.connect())
+        self.loop.run_until_complete(asyncio.sleep(0.15))
+        self.assertGreater( self.tunnel.stats['heartbeats'], 2 )
+        self.assertEqual( self.tunnel.stats['heartbeat_errors'], 0 )
+
+    def run_until(self, condition, timeout=2):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            self.loop.run_until_complete(asyncio.sleep(0.01))
+        return condition()
+
+    def test_reconnect_after_heartbeat(self):
+        self.tunnel.heartbeat_interval = 0.05
+        self.tunnel.heartbeat_timeout = 0.05
+        self.tunnel.min_backoff = 0.01
+        self.loop.run_until_complete(self.tunnel.connect())
+        self.sim.drop_connections()
+        self.assertTrue( self.run_until(lambda: self.tunnel.stats['reconnects'] == 1) )
+        self.assertEqual( list(self.sim.connections), [self.tunnel.channel] )
+        self.assertGreater( self.tunnel.stats['heartbeat_errors'], 0 )
+
+    def test_reconnect_after_disconnect_request(self):
+        self.loop.run_until_complete(self.tunnel.connect())
+        channel = self.tunnel.channel
+        request = KNXIPFrame(KNXIPFrame.DISCONNECT_REQUEST, bytearray([channel, 0]))
+        self.tunnel._control.datagram_received(request.to_frame(), self.sim.address)
+        self.assertTrue( self.run_until(lambda: self.tunnel.stats['reconnects'] == 1) )
+        self.assertEqual( list(self.sim.connections), [self.tunnel.channel] )
+        self.assertEqual( self.loop.run_until_complete(self.tunnel.group_write('1/1/71', [0, 12, 108])), True )
+
+    def test_disconnect(self):
+        self.loop.run_until_complete(self.tunnel.connect())
+        self.loop.run_until_complete(self.tunnel.disconnect())
+        self.assertEqual( self.sim.connections, {} )
+
+
+class TestLoadTest(unittest.TestCase):
+
+    def test_load_test(self):
+        report = simulator.load_test(reads=50, gas=10, concurrency=5, jitter=0.002, seed=1)
+        self.assertEqual( report['unanswered'], 0 )
+        self.assertGreater( report['throughput'], 0 )
+        self.assertLessEqual( report['p50'], report['p99'] )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -14,7 +14,6 @@
 #    all copies or substantial portions of the Software.
 ################################################################################
 import unittest
-import asyncio
 
 import knxpy
 
@@ -28,6 +27,22 @@ class TestUtil(unittest.TestCase):
     def test_decode_ga(self):
         self.assertEqual( knxpy.util.decode_ga(2375), '1/1/71' )
 
+    def test_decode_ga_interned(self):
+        self.assertIs( knxpy.util.decode_ga(2375), knxpy.util.decode_ga(2375) )
+
+    def test_encode_pa(self):
+        self.assertEqual( knxpy.util.encode_pa('1.1.12'), 0x110c )
+
+    def test_decode_pa(self):
+        self.assertEqual( knxpy.util.decode_pa(b'\x11\x0c'), '1.1.12' )
+        self.assertEqual( knxpy.util.decode_pa(0x110c), '1.1.12' )
+        self.assertIsNone( knxpy.util.decode_pa(b'\x11') )
+
+    def test_message_slots(self):
+        message = knxpy.util.Message(0x1101, 2375, 0x80, 1)
+        self.assertFalse( hasattr(message, '__dict__') )
+        self.assertEqual( message.dst, '1/1/71' )
+
     def test_encode_dpt_1(self):
         self.assertEqual( knxpy.util.encode_dpt(0,'1'), [0] )
 
@@ -46,6 +61,12 @@ class TestUtil(unittest.TestCase):
     def test_decode_dpt_9(self):
         self.assertEqual( knxpy.util.decode_dpt(b'\x0cl','9'), 22.64 )
 
+    def test_decode_telegram_debug(self):
+        telegram = bytes([0x00, 0x0a, 0x00, 0x27, 0x11, 0x01, 0x09, 0x47, 0x00, 0x80, 0x0c, 0x6c])
+        with self.assertLogs('knxpy.util', 'DEBUG') as logs:
+            knxpy.util.decode_telegram(telegram)
+        self.assertIn( '00 0a 00 27 11 01 09 47 00 80 0c 6c', logs.output[0] )
+
 
 if __name__ == '__main__':
     unittest.main()